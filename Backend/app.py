@@ -6,37 +6,42 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from redis import Redis
-from flask_caching import Cache
 from logging.config import dictConfig
 from dotenv import load_dotenv
 from datetime import timedelta
 from models import db, User
-from db import close_db_connection
-from resources.users import UsersResource, UserResource
+from db import close_db_connection, database_uri, pool_stats, replica_binds, replica_engines, init_replica_routing, TimedQueuePool
+from serialization import output_json
+from services import reference, travel_matrix
+from services.ratings import repair_review_aggregates
+import query_stats
+from resources.users import UsersResource, UserResource, UserRecommendationsResource
 from resources.user_preferences import UserPreferencesResource, UserPreferenceResource
 from resources.user_sessions import UserSessionsResource, UserSessionResource
 from resources.user_audits import UserAuditsResource
 from resources.login import UserLogin, UserLogout
 from resources.emergency_contacts import EmergencyContactsResource, EmergencyContactResource
 from resources.entertainment_types import EntertainmentTypesResource, EntertainmentTypeResource
-from resources.places import PlacesResource, PlaceResource
+from resources.places import PlacesResource, PlaceResource, PlacesNearbyResource, PlacesSearchResource, PlaceAvailabilityResource
 from resources.place_categories import PlaceCategoriesResource, PlaceCategoryResource
 from resources.place_translations import PlaceTranslationsResource, PlaceTranslationResource
-from resources.reviews import ReviewsResource, ReviewResource
+from resources.reviews import ReviewsResource, ReviewResource, PlaceReviewsResource
 from resources.review_medias import ReviewMediasResource, ReviewMediaResource
 from resources.companies import CompaniesResource, CompanyResource
-from resources.drivers import DriversResource, DriverResource
+from resources.drivers import DriversResource, DriverResource, DriverAvailabilityResource
 from resources.languages import LanguagesResource, LanguageResource
 from resources.assignments import AssignmentsResource, AssignmentResource
-from resources.bookings import BookingsResource, BookingResource
+from resources.bookings import BookingsResource, BookingResource, BookingDriversResource, BookingsDispatchResource
 from resources.booking_transactions import BookingTransactionsResource, BookingTransactionResource
 from resources.currencies import CurrenciesResource, CurrencyResource
 from resources.pricing_rules import PricingRulesResource, PricingRuleResource
-from resources.promotions import PromotionsResource, PromotionResource
+from resources.promotions import PromotionsResource, PromotionResource, PromotionValidationResource
+from resources.quotes import PlaceQuoteResource, QuotesBatchResource
 from resources.payments import PaymentsResource, PaymentResource
 from resources.transportations import TransportationsResource, TransportationResource
 from resources.route_segments import RouteSegmentsResource, RouteSegmentResource
+from resources.routes import RoutePlanResource, RouteMatrixResource
+from resources.exports import ExportResource
 import os
 
 # Role-based access control decorator
@@ -54,13 +59,6 @@ def role_required(role):
 # Initializing the Flask app
 app = Flask(__name__)
 
-# Initialize Redis client
-redis_client = Redis(
-    host='localhost',
-    port=6379,
-    db=0
-)
-
 # Limiter
 limiter = Limiter(
     get_remote_address,
@@ -79,7 +77,31 @@ def index():
 load_dotenv()
 
 # Database, JWT and Migration setup
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'mysql+pymysql://root:@localhost/mekan')
+# DB_DRIVER=mysqlclient switches to the C-based MySQLdb driver
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(
+    os.getenv('DATABASE_URI', 'mysql+pymysql://root:@localhost/mekan'),
+    os.getenv('DB_DRIVER')
+)
+# One pooled engine per process; every database access goes through it
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': TimedQueuePool,
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+    'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+    # Recycle before MySQL's wait_timeout drops idle connections
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True
+}
+# Read replicas, comma separated; GET requests read from them
+app.config['SQLALCHEMY_BINDS'] = replica_binds(
+    os.getenv('DATABASE_REPLICA_URIS', ''),
+    os.getenv('DB_DRIVER'),
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']
+)
+app.config['REPLICA_STICKY_SECONDS'] = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+# Statements repeated this often in one request are flagged as N+1; SQL_STRICT=1 fails such requests (CI)
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))
+app.config['SQL_STRICT'] = os.getenv('SQL_STRICT') == '1'
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt_secret_key')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
 app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
@@ -88,6 +110,8 @@ jwt = JWTManager(app)
 
 db.init_app(app)
 migrate = Migrate(app, db)
+init_replica_routing(app)
+query_stats.init_app(app)
 
 # Setting up logging
 dictConfig({
@@ -120,10 +144,10 @@ if env == 'development':
 else:
     app.config.from_object('config.production.Config')
 
-# CORS, Cache
+# CORS
 CORS(app)
-cache = Cache(app, config={'CACHE_TYPE': 'simple'})
 rest_api = Api(app, doc='/docs', title='Tourism Project API', description='API documentation for Tourism Project')
+rest_api.representation('application/json')(output_json)
 
 # Error handling
 @app.errorhandler(429)
@@ -144,6 +168,7 @@ def not_found_error(error):
 # Registering resources
 rest_api.add_resource(UsersResource, '/users')
 rest_api.add_resource(UserResource, '/users/<int:user_id>')
+rest_api.add_resource(UserRecommendationsResource, '/users/<int:user_id>/recommendations')
 rest_api.add_resource(UserPreferencesResource, '/user_preferences')
 rest_api.add_resource(UserPreferenceResource, '/user_preferences/<int:preference_id>')
 rest_api.add_resource(UserSessionsResource, '/user_sessions')
@@ -157,24 +182,31 @@ rest_api.add_resource(EntertainmentTypesResource, '/entertainment_types')
 rest_api.add_resource(EntertainmentTypeResource, '/entertainment_types/<int:etype_id>')
 rest_api.add_resource(PlacesResource, '/places')
 rest_api.add_resource(PlaceResource, '/places/<int:place_id>')
+rest_api.add_resource(PlacesNearbyResource, '/places/nearby')
+rest_api.add_resource(PlacesSearchResource, '/places/search')
+rest_api.add_resource(PlaceAvailabilityResource, '/places/<int:place_id>/availability')
 rest_api.add_resource(PlaceCategoriesResource, '/place_categories')
 rest_api.add_resource(PlaceCategoryResource, '/place_categories/<int:category_id>')
 rest_api.add_resource(PlaceTranslationsResource, '/place_translations')
 rest_api.add_resource(PlaceTranslationResource, '/place_translations/<int:translation_id>')
 rest_api.add_resource(ReviewsResource, '/reviews')
 rest_api.add_resource(ReviewResource, '/reviews/<int:review_id>')
+rest_api.add_resource(PlaceReviewsResource, '/places/<int:place_id>/reviews')
 rest_api.add_resource(ReviewMediasResource, '/review_medias')
 rest_api.add_resource(ReviewMediaResource, '/review_medias/<int:media_id>')
 rest_api.add_resource(CompaniesResource, '/companies')
 rest_api.add_resource(CompanyResource, '/companies/<int:company_id>')
 rest_api.add_resource(DriversResource, '/drivers')
 rest_api.add_resource(DriverResource, '/drivers/<int:driver_id>')
+rest_api.add_resource(DriverAvailabilityResource, '/drivers/<int:driver_id>/availability')
 rest_api.add_resource(LanguagesResource, '/languages')
 rest_api.add_resource(LanguageResource, '/languages/<int:language_id>')
 rest_api.add_resource(AssignmentsResource, '/assignments')
 rest_api.add_resource(AssignmentResource, '/assignments/<int:assignment_id>')
 rest_api.add_resource(BookingsResource, '/bookings')
 rest_api.add_resource(BookingResource, '/bookings/<int:booking_id>')
+rest_api.add_resource(BookingDriversResource, '/bookings/<int:booking_id>/drivers')
+rest_api.add_resource(BookingsDispatchResource, '/bookings/dispatch')
 rest_api.add_resource(BookingTransactionsResource, '/booking_transactions')
 rest_api.add_resource(BookingTransactionResource, '/booking_transactions/<int:transaction_id>')
 rest_api.add_resource(CurrenciesResource, '/currencies')
@@ -183,12 +215,24 @@ rest_api.add_resource(PricingRulesResource, '/pricing_rules')
 rest_api.add_resource(PricingRuleResource, '/pricing_rules/<int:rule_id>')
 rest_api.add_resource(PromotionsResource, '/promotions')
 rest_api.add_resource(PromotionResource, '/promotions/<int:promotion_id>')
+rest_api.add_resource(PromotionValidationResource, '/promotions/validate')
+rest_api.add_resource(PlaceQuoteResource, '/places/<int:place_id>/quote')
+rest_api.add_resource(QuotesBatchResource, '/quotes:batch')
 rest_api.add_resource(PaymentsResource, '/payments')
 rest_api.add_resource(PaymentResource, '/payments/<int:payment_id>')
 rest_api.add_resource(TransportationsResource, '/transportations')
 rest_api.add_resource(TransportationResource, '/transportations/<int:transportation_id>')
 rest_api.add_resource(RouteSegmentsResource, '/route_segments')
 rest_api.add_resource(RouteSegmentResource, '/route_segments/<int:segment_id>')
+rest_api.add_resource(RoutePlanResource, '/routes/plan')
+rest_api.add_resource(RouteMatrixResource, '/routes/matrix')
+rest_api.add_resource(ExportResource, '/export/<string:resource>')
+
+# In-memory snapshot of the reference tables
+reference.init_app(app)
+
+# Background builder of the precomputed travel matrix
+travel_matrix.init_app(app)
 
 @app.before_request
 def log_request_info():
@@ -216,6 +260,16 @@ def list_routes():
         output.append(line)
     return jsonify(output)
 
+# Database connection pool metrics
+@app.route('/metrics/db')
+@jwt_required()
+def db_metrics():
+    user = db.session.get(User, get_jwt_identity())
+    if user is None or user.role != 'admin':
+        return jsonify(message='Only administrators can read database metrics.'), 403
+    replicas = {key: pool_stats(engine) for key, engine in replica_engines().items()}
+    return jsonify({**pool_stats(db.engine), 'replicas': replicas})
+
 # Refresh route
 @app.route('/refresh', methods=['POST'])
 @jwt_required(refresh = True)
@@ -224,6 +278,20 @@ def refresh():
     new_access_token = create_access_token(identity=current_user)
     return jsonify(access_token=new_access_token), 200
 
+# Recompute the review aggregates of every place: flask repair-review-aggregates
+@app.cli.command('repair-review-aggregates')
+def repair_review_aggregates_command():
+    """Recompute every place's review count, rating and histogram from its reviews."""
+    count = repair_review_aggregates()
+    app.logger.info('Repaired review aggregates of %d places', count)
+
+# Rebuild the travel matrix now instead of waiting for the builder: flask build-travel-matrix
+@app.cli.command('build-travel-matrix')
+def build_travel_matrix_command():
+    """Compute the travel time and cost matrices between the most reviewed places."""
+    if not travel_matrix.matrix_builder.build(full=True):
+        app.logger.warning('Travel matrix is already being built by another process')
+
 # with app.app_context():
     # db.create_all()
     # user = User(username="user0", email="user0@postman.com")
@@ -0,0 +1,59 @@
+"""
+Time flask_restx's `marshal` against the compiled serializer on place responses.
+
+    python benchmarks/serialization.py [rows] [repeat]
+
+Rows are transient Place instances, so attribute reads go through the ORM's
+instrumentation as they do in the endpoints, without a database. Each
+timing is the best of `repeat` runs; both outputs are checked to be equal
+before anything is timed.
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_restx import marshal  # noqa: E402
+from models import Place, PlaceCategory, PlaceTranslation  # noqa: E402
+from resources.places import place_detail_dto, place_page_dto  # noqa: E402
+from serialization import compile_model  # noqa: E402
+
+
+def make_places(count):
+    category = PlaceCategory(id=1, name='Museums')
+    places = []
+    for i in range(count):
+        place = Place(
+            id=i, name=f'Place {i}', description='A place to visit', location='Fountain Square', city='Baku',
+            latitude=40.37 + i / 1e4, longitude=49.83, rating=4.25, review_count=i % 50, entertainment_type_id=1,
+            category_id=1, default_price=12.5, images=[f'https://example.com/{i}/{n}.jpg' for n in range(3)],
+            rating_1_count=0, rating_2_count=1, rating_3_count=4, rating_4_count=9, rating_5_count=7,
+            last_review_at=datetime(2027, 1, 1)
+        )
+        place.category = category
+        place.translations = [PlaceTranslation(id=i * 2 + n, language_id=n, translated_name=f'Place {i}', translated_description='...') for n in range(2)]
+        places.append(place)
+    return places
+
+
+def compare(label, model, data, repeat):
+    serialize = compile_model(model)
+    assert serialize(data) == marshal(data, model), f'{label}: outputs differ'
+    marshal_time = min(timeit.repeat(lambda: marshal(data, model), number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(lambda: serialize(data), number=1, repeat=repeat))
+    print(f'{label:<22} marshal {marshal_time * 1000:9.1f} ms   compiled {compiled_time * 1000:9.1f} ms   '
+          f'{marshal_time / compiled_time:5.1f}x')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    places = make_places(rows)
+    compare(f'{rows} place page', place_page_dto, {'data': places, 'next': None}, repeat)
+    compare(f'{rows} place details', place_detail_dto, places, repeat)
+
+
+if __name__ == '__main__':
+    main()
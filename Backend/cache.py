@@ -0,0 +1,146 @@
+import json
+from functools import wraps
+from urllib.parse import urlencode
+from flask import g, request, current_app as app
+from flask_restx.reqparse import RequestParser
+from flask_restx.utils import unpack
+from redis import Redis
+from redis.exceptions import RedisError
+from services.sync import on_commit
+
+# Initialize Redis client
+redis_client = Redis(
+    host='localhost',
+    port=6379,
+    db=0
+)
+
+# Seconds a cached response lives, in case an invalidation is ever missed
+CACHE_TTL = 3600
+# Query parameter every marshalled GET accepts (see serialization.marshal_with)
+FIELDS_ARG = 'fields'
+
+# Reads the versions of the given tags and the entry stored under them in one round trip.
+# KEYS: tag names, ARGV[1]: request key. Returns {cached value or false, version, ...}
+_LOOKUP = redis_client.register_script("""
+local versions = {}
+for i, tag in ipairs(KEYS) do
+    versions[i] = redis.call('GET', 'cache:version:' .. tag) or '0'
+end
+local key = 'cache:response:' .. ARGV[1] .. '|' .. table.concat(versions, ',')
+return {redis.call('GET', key) or false, unpack(versions)}
+""")
+
+# Stores an entry only if none of its tags were invalidated while it was being built.
+# KEYS: tag names, ARGV[1]: request key, ARGV[2]: value, ARGV[3]: TTL, ARGV[4..]: tag versions seen on lookup
+_STORE = redis_client.register_script("""
+for i, tag in ipairs(KEYS) do
+    if (redis.call('GET', 'cache:version:' .. tag) or '0') ~= ARGV[i + 3] then
+        return 0
+    end
+end
+local key = 'cache:response:' .. ARGV[1] .. '|' .. table.concat(ARGV, ',', 4)
+redis.call('SET', key, ARGV[2], 'EX', ARGV[3])
+for _, tag in ipairs(KEYS) do
+    redis.call('SADD', 'cache:keys:' .. tag, key)
+    -- The key sets outlive their entries by no more than the entries live
+    redis.call('EXPIRE', 'cache:keys:' .. tag, ARGV[3])
+end
+return 1
+""")
+
+# Bumps the version of every tag and deletes all entries stored under it.
+# KEYS: tag names
+_INVALIDATE = redis_client.register_script("""
+for _, tag in ipairs(KEYS) do
+    redis.call('INCR', 'cache:version:' .. tag)
+    local keys = redis.call('SMEMBERS', 'cache:keys:' .. tag)
+    for i = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+    redis.call('DEL', 'cache:keys:' .. tag)
+end
+return 1
+""")
+
+
+def _param_names(params):
+    names = {FIELDS_ARG}
+    for param in params:
+        if isinstance(param, RequestParser):
+            names.update(argument.name for argument in param.args)
+        else:
+            names.add(param)
+    return frozenset(names)
+
+
+def _request_key(names):
+    # Only the parameters the response depends on, so unknown ones cannot multiply the entries
+    args = sorted((name, value) for name, value in request.args.items(multi=True) if name in names)
+    return f'{request.path}?{urlencode(args)}' if args else request.path
+
+
+def cached_response(*tags, params=()):
+    """
+    Cache the successful responses of a GET method in Redis.
+
+    Each tag may reference view arguments, e.g. 'place:{place_id}'. Entries
+    live until one of their tags is invalidated, or for CACHE_TTL seconds.
+    `params` are the query parameters the response depends on, as names or
+    RequestParsers; `fields` always is, and other parameters are left out
+    of the key. Requests with an `X-Fields` mask are not cached. Apply it
+    above the marshalling decorator so the marshalled body is what is cached.
+    """
+    names = _param_names(params)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if request.headers.get(app.config.get('RESTX_MASK_HEADER', 'X-Fields')):
+                return func(*args, **kwargs)
+            entry_tags = [tag.format(**kwargs) for tag in tags]
+            key = _request_key(names)
+            try:
+                cached, *versions = _LOOKUP(keys=entry_tags, args=[key])
+            except RedisError as e:
+                app.logger.warning('Response cache unavailable: %s', str(e))
+                return func(*args, **kwargs)
+            if cached is not None:
+                return json.loads(cached), 200, {'X-Cache': 'HIT'}
+
+            # The body is stored under the tag versions just read, so it is built from
+            # the primary database rather than a replica that may lag behind them
+            g.read_from_replica = False
+            data, code, headers = unpack(func(*args, **kwargs))
+            if code == 200:
+                try:
+                    _STORE(keys=entry_tags, args=[key, json.dumps(data, default=str), CACHE_TTL, *versions])
+                except RedisError as e:
+                    app.logger.warning('Failed to store cached response: %s', str(e))
+            return data, code, {**headers, 'X-Cache': 'MISS'}
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Drop every cached response carrying any of the given tags."""
+    try:
+        _INVALIDATE(keys=list(tags))
+    except RedisError as e:
+        app.logger.error('Failed to invalidate cached responses %s: %s', tags, str(e))
+
+
+def invalidate_on_commit(model, *tags):
+    """Invalidate the given tags whenever rows of `model` are written.
+
+    Tags may reference the written row's columns, e.g. 'place:{id}'.
+    """
+    @on_commit(model)
+    def _invalidate(changes):
+        invalidate(*{tag.format_map(_Columns(values)) for values, _ in changes for tag in tags})
+    return _invalidate
+
+
+class _Columns(dict):
+    def __missing__(self, key):
+        return ''
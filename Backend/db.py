@@ -1,17 +1,206 @@
-import mysql.connector
-from flask import g
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, current_app, has_request_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from flask_sqlalchemy.session import Session
+from redis.exceptions import RedisError
+from sqlalchemy import exc, Select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from cache import redis_client
+
+# Driver used when DB_DRIVER=mysqlclient is set: the C-based MySQLdb instead of pure-Python pymysql
+MYSQLCLIENT_DRIVER = 'mysql+mysqldb'
+
+# Binds whose key starts with this are read replicas of the primary database
+REPLICA_BIND_PREFIX = 'replica_'
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+# How long a client keeps reading from the primary after a write, so it sees its own changes
+DEFAULT_STICKY_SECONDS = 5
+
+
+def database_uri(uri, driver=None):
+    """Return `uri` switched to the requested MySQL driver, if any."""
+    if driver == 'mysqlclient':
+        return make_url(uri).set(drivername=MYSQLCLIENT_DRIVER).render_as_string(hide_password=False)
+    return uri
+
+
+def replica_binds(uris, driver=None, engine_options=None):
+    """Build SQLALCHEMY_BINDS entries from a comma-separated list of replica URIs.
+
+    Bind engines do not inherit SQLALCHEMY_ENGINE_OPTIONS, so they are given
+    `engine_options` explicitly.
+    """
+    uris = [uri.strip() for uri in uris.split(',') if uri.strip()]
+    return {
+        f'{REPLICA_BIND_PREFIX}{i}': {**(engine_options or {}), 'url': database_uri(uri, driver)}
+        for i, uri in enumerate(uris, 1)
+    }
+
+
+def replica_engines():
+    """Return the engines of the configured read replicas, by bind key."""
+    engines = current_app.extensions['sqlalchemy'].engines
+    return {key: engine for key, engine in engines.items() if key and key.startswith(REPLICA_BIND_PREFIX)}
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of read-only requests to a read replica.
+
+    Flushes, locking reads and anything that is not a plain SELECT go to the
+    primary, and once a session has used the primary every later statement
+    does too, so it never reads around its own writes. A session keeps to one
+    replica for its whole lifetime.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._replica = None
+        self._use_primary = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+        if self._use_primary or not (has_request_context() and g.get('read_from_replica')):
+            return engine
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            self._use_primary = True
+            return engine
+        if self._replica is None:
+            replicas = replica_engines()
+            if not replicas:
+                return engine
+            self._replica = random.choice(list(replicas.values()))
+        return self._replica
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary database within the block, even in a read-only request.
+
+    For reads kept beyond the request under a version read from Redis, such
+    as in-process indexes: built from a lagging replica, they would keep
+    old data under the new version until the next change.
+    """
+    routed = has_request_context() and g.get('read_from_replica')
+    if routed:
+        g.read_from_replica = False
+    try:
+        yield
+    finally:
+        if routed:
+            g.read_from_replica = True
+
+
+def init_replica_routing(app):
+    """
+    Route the reads of GET requests to the read replicas, if any are configured.
+
+    A client that made a successful write keeps reading from the primary for
+    REPLICA_STICKY_SECONDS afterwards. Clients are told apart by their JWT
+    identity, or by address when they are not logged in.
+    """
+    if not any(key.startswith(REPLICA_BIND_PREFIX) for key in app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+    @app.before_request
+    def route_reads():
+        g.replica_client = _client_key()
+        g.read_from_replica = request.method in READ_METHODS and not _is_sticky(g.replica_client)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            try:
+                redis_client.set(f'replica:sticky:{g.replica_client}', 1, ex=sticky_seconds)
+            except RedisError as e:
+                app.logger.warning('Failed to pin client to the primary database: %s', str(e))
+        return response
+
+
+def _client_key():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f'user:{identity}' if identity is not None else f'addr:{get_remote_address()}'
+
+
+def _is_sticky(client):
+    try:
+        return bool(redis_client.exists(f'replica:sticky:{client}'))
+    except RedisError as e:
+        current_app.logger.warning('Replica stickiness unavailable, reading from the primary: %s', str(e))
+        return True
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def pool_stats(engine):
+    """Return a snapshot of the engine's connection pool usage."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats.update({
+            'checkouts': pool.checkouts,
+            'timeouts': pool.timeouts,
+            'total_wait_seconds': round(pool.total_wait, 6),
+            'max_wait_seconds': round(pool.max_wait, 6),
+            'avg_wait_seconds': round(pool.total_wait / pool.checkouts, 6) if pool.checkouts else 0.0
+        })
+    return stats
+
 
 def get_db_connection():
+    """Borrow a raw DBAPI connection from the SQLAlchemy pool for this request."""
     if 'db' not in g:
-        g.db = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="mekan"
-        )
+        g.db = current_app.extensions['sqlalchemy'].engine.raw_connection()
     return g.db
 
 def close_db_connection(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
\ No newline at end of file
+        # Returns the connection to the pool rather than closing the socket
+        db.close()
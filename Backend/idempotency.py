@@ -0,0 +1,83 @@
+import hashlib
+import json
+from functools import wraps
+from flask import request, current_app as app
+from flask_jwt_extended import get_jwt_identity
+from flask_restx.utils import unpack
+from redis.exceptions import RedisError
+from cache import redis_client
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# How long a completed response is replayed for retries of the same key
+IDEMPOTENCY_TTL = 24 * 60 * 60
+# How long a key stays claimed by a request that never finishes, e.g. a crashed worker
+IN_PROGRESS_TTL = 60
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint():
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def idempotent(scope):
+    """
+    Make a write endpoint safe to retry with an Idempotency-Key header.
+
+    The first request with a key claims it in Redis and its response is
+    stored for IDEMPOTENCY_TTL seconds; retries with the same key and body get
+    that response replayed instead of running the endpoint again. Keys are
+    per user, and a key reused with a different body is rejected. Requests
+    without the header are not affected. Apply it below `jwt_required`.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return func(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return {'message': f'{IDEMPOTENCY_HEADER} cannot be longer than {MAX_KEY_LENGTH} characters.'}, 400
+
+            redis_key = f'idempotency:{scope}:{get_jwt_identity()}:{key}'
+            fingerprint = _fingerprint()
+            try:
+                claimed = redis_client.set(redis_key, json.dumps({'fingerprint': fingerprint}), nx=True, ex=IN_PROGRESS_TTL)
+                stored = None if claimed else redis_client.get(redis_key)
+            except RedisError as e:
+                app.logger.warning('Idempotency store unavailable: %s', str(e))
+                return func(*args, **kwargs)
+
+            if not claimed:
+                if stored is None:
+                    return {'message': 'The previous request with this key has just expired, please retry.'}, 409
+                entry = json.loads(stored)
+                if entry['fingerprint'] != fingerprint:
+                    return {'message': f'{IDEMPOTENCY_HEADER} was already used for a different request.'}, 422
+                if 'status' not in entry:
+                    return {'message': 'A request with this key is still being processed.'}, 409
+                return entry['body'], entry['status'], {'Idempotent-Replayed': 'true'}
+
+            try:
+                data, code, headers = unpack(func(*args, **kwargs))
+            except Exception:
+                _release(redis_key)
+                raise
+            if code >= 500:
+                # Failed requests may be retried with the same key
+                _release(redis_key)
+            else:
+                try:
+                    entry = {'fingerprint': fingerprint, 'status': code, 'body': data}
+                    redis_client.set(redis_key, json.dumps(entry, default=str), ex=IDEMPOTENCY_TTL)
+                except RedisError as e:
+                    app.logger.error('Failed to store idempotent response: %s', str(e))
+            return data, code, headers
+        return wrapper
+    return decorator
+
+
+def _release(redis_key):
+    try:
+        redis_client.delete(redis_key)
+    except RedisError as e:
+        app.logger.error('Failed to release idempotency key: %s', str(e))
@@ -0,0 +1,33 @@
+"""Add place filter indexes
+
+Revision ID: 4f1c2a9d7e31
+Revises: b12400b23ead
+Create Date: 2026-10-17 10:12:31.418207
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2a9d7e31'
+down_revision = 'b12400b23ead'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('places', schema=None) as batch_op:
+        batch_op.create_index('ix_places_city_rating', ['city', 'rating'], unique=False)
+        batch_op.create_index('ix_places_entertainment_type_id_rating', ['entertainment_type_id', 'rating'], unique=False)
+        batch_op.create_index('ix_places_category_id_rating', ['category_id', 'rating'], unique=False)
+        batch_op.create_index('ix_places_rating', ['rating'], unique=False)
+        batch_op.create_index('ix_places_default_price', ['default_price'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('places', schema=None) as batch_op:
+        batch_op.drop_index('ix_places_default_price')
+        batch_op.drop_index('ix_places_rating')
+        batch_op.drop_index('ix_places_category_id_rating')
+        batch_op.drop_index('ix_places_entertainment_type_id_rating')
+        batch_op.drop_index('ix_places_city_rating')
@@ -0,0 +1,41 @@
+"""Add place review aggregates
+
+Revision ID: 9a3e5b7c1d24
+Revises: 4f1c2a9d7e31
+Create Date: 2026-10-17 11:05:48.203114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3e5b7c1d24'
+down_revision = '4f1c2a9d7e31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('places', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_1_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_2_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_3_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_4_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_5_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_review_at', sa.DateTime(), nullable=True))
+    # Existing reviews are counted with `flask repair-review-aggregates`
+
+
+def downgrade():
+    with op.batch_alter_table('places', schema=None) as batch_op:
+        batch_op.drop_column('last_review_at')
+        batch_op.drop_column('rating_5_count')
+        batch_op.drop_column('rating_4_count')
+        batch_op.drop_column('rating_3_count')
+        batch_op.drop_column('rating_2_count')
+        batch_op.drop_column('rating_1_count')
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('review_count')
@@ -0,0 +1,25 @@
+"""Add review feed index
+
+Revision ID: c5d8e2f14a67
+Revises: 9a3e5b7c1d24
+Create Date: 2026-10-17 11:42:16.570392
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d8e2f14a67'
+down_revision = '9a3e5b7c1d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_place_id_publish_date_id', ['place_id', 'publish_date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_place_id_publish_date_id')
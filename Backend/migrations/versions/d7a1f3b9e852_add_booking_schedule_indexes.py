@@ -0,0 +1,27 @@
+"""Add booking schedule indexes
+
+Revision ID: d7a1f3b9e852
+Revises: c5d8e2f14a67
+Create Date: 2026-10-17 12:20:37.914655
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a1f3b9e852'
+down_revision = 'c5d8e2f14a67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_place_id_booking_date', ['place_id', 'booking_date'], unique=False)
+        batch_op.create_index('ix_bookings_driver_id_booking_date', ['driver_id', 'booking_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_driver_id_booking_date')
+        batch_op.drop_index('ix_bookings_place_id_booking_date')
@@ -1,10 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask import g, has_request_context
+from collections import namedtuple
 from datetime import datetime, timezone
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, event
+from sqlalchemy.orm import joinedload, selectinload, load_only
 from werkzeug.security import generate_password_hash
 import os
+from db import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Company(db.Model):
     __tablename__ = 'companies'
@@ -93,7 +97,7 @@ class UserAudit(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     action = db.Column(db.String(50), nullable=False)
     changed_data = db.Column(db.JSON)
-    action_timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    action_timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     user = db.relationship('User', back_populates='audits', lazy=True)
 
 
@@ -121,6 +125,15 @@ class Place(db.Model):
     default_price = db.Column(db.Numeric(10, 2))
     images = db.Column(db.JSON, nullable=False)
     description = db.Column(db.String(255), nullable=False)
+    # Aggregates of the place's reviews, maintained by services.ratings
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_review_at = db.Column(db.DateTime)
     entertainment_type = db.relationship('EntertainmentType', back_populates='places', lazy=True)
     category = db.relationship('PlaceCategory', back_populates='places', lazy=True)
     bookings = db.relationship('Booking', back_populates='place', lazy=True)
@@ -134,8 +147,18 @@ class Place(db.Model):
     destination_routes = db.relationship('Transportation', foreign_keys='Transportation.destination_place_id', back_populates='destination_place', lazy=True)
     __table_args__ = (
         CheckConstraint('rating BETWEEN 1 AND 5', name='check_rating_between_1_and_5'),
+        db.Index('ix_places_city_rating', 'city', 'rating'),
+        db.Index('ix_places_entertainment_type_id_rating', 'entertainment_type_id', 'rating'),
+        db.Index('ix_places_category_id_rating', 'category_id', 'rating'),
+        db.Index('ix_places_rating', 'rating'),
+        db.Index('ix_places_default_price', 'default_price'),
     )
 
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating, from 1 to 5."""
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
 
 class PricingRule(db.Model):
     __tablename__ = 'pricing_rules'
@@ -182,7 +205,7 @@ class Assignment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     driver_id = db.Column(db.Integer, db.ForeignKey('drivers.id'), nullable=False)
     place_id = db.Column(db.Integer, db.ForeignKey('places.id'), nullable=False)
-    assigned_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    assigned_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     driver = db.relationship('Driver', back_populates='assignments', lazy=True)
     place = db.relationship('Place', back_populates='assignments', lazy=True)
 
@@ -198,13 +221,17 @@ class Booking(db.Model):
     total_cost = db.Column(db.Numeric(10, 2))
     pricing_snapshot = db.Column(db.JSON)
     payment_status = db.Column(db.Enum('unpaid', 'paid', 'refunded'), default='unpaid')
-    updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     transactions = db.relationship('BookingTransaction', back_populates='booking', lazy=True)
     payments = db.relationship('Payment', back_populates='booking', lazy=True)
     emergency_contacts = db.relationship('EmergencyContact', back_populates='booking', lazy=True)
     user = db.relationship("User", back_populates="bookings", lazy=True)
     place = db.relationship("Place", back_populates="bookings", lazy=True)
     driver = db.relationship("Driver", back_populates="bookings", lazy=True)
+    __table_args__ = (
+        db.Index('ix_bookings_place_id_booking_date', 'place_id', 'booking_date'),
+        db.Index('ix_bookings_driver_id_booking_date', 'driver_id', 'booking_date'),
+    )
 
 
 class BookingTransaction(db.Model):
@@ -225,7 +252,7 @@ class Payment(db.Model):
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     payment_method = db.Column(db.Enum('credit_card', 'paypal', 'bank_transfer'))
     transaction_status = db.Column(db.Enum('completed', 'pending', 'failed'))
-    transaction_date = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    transaction_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     booking = db.relationship("Booking", back_populates="payments", lazy=True)
     currency = db.relationship("Currency", back_populates="payments", lazy=True)
 
@@ -263,6 +290,7 @@ class Review(db.Model):
     user = db.relationship("User", back_populates="reviews", lazy=True)
     __table_args__ = (
         CheckConstraint('rating BETWEEN 1 AND 5', name='check_rating_between_1_and_5'),
+        db.Index('ix_reviews_place_id_publish_date_id', 'place_id', 'publish_date', 'id'),
     )
 
 
@@ -321,3 +349,71 @@ class RouteSegment(db.Model):
     duration_minutes = db.Column(db.Integer)
     transport_mode = db.Column(db.Enum('bus', 'train', 'car', 'plane', 'boat', 'walking'))
     transportation = db.relationship("Transportation", back_populates="segments", lazy=True)
+
+
+# Named eager-loading strategies: the relationships an endpoint marshals, loaded
+# with a fixed number of queries however many rows it returns.
+LoadProfile = namedtuple('LoadProfile', ['model', 'options'])
+
+LOAD_PROFILES = {
+    'user_detail': LoadProfile(User, (
+        selectinload(User.preferences),
+    )),
+    'booking_detail': LoadProfile(Booking, (
+        joinedload(Booking.place),
+        joinedload(Booking.driver),
+        joinedload(Booking.user),
+        selectinload(Booking.payments),
+        selectinload(Booking.transactions)
+    )),
+    'place_card': LoadProfile(Place, (
+        selectinload(Place.translations),
+        selectinload(Place.category),
+        selectinload(Place.entertainment_type)
+    )),
+    'review_detail': LoadProfile(Review, (
+        selectinload(Review.media),
+    ))
+}
+
+
+def _selects_entity(execute_state, model):
+    """Tell whether a top-level query loads instances of `model`, not just some of its columns."""
+    if not execute_state.is_select or execute_state.is_column_load or execute_state.is_relationship_load:
+        return False
+    descriptions = execute_state.statement.column_descriptions
+    # Loader options only apply to entities; selecting `Place.id` alone would make them raise
+    return bool(descriptions) and descriptions[0].get('expr') is model
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _apply_load_profile(execute_state):
+    """
+    Add the request's load profile to every top-level query for its model.
+
+    When the request narrows the model's fields, only the loaders of the
+    selected relationships are added.
+    """
+    profile = g.get('load_profile') if has_request_context() else None
+    if profile is None or not _selects_entity(execute_state, profile.model):
+        return
+    options = profile.options
+    selection = g.get('field_selection')
+    if selection is not None and selection.model is profile.model:
+        # Each loader's path is (model, relationship, related model)
+        options = [option for option in options if option.path[1].key in selection.relationships]
+    if options:
+        execute_state.statement = execute_state.statement.options(*options)
+
+
+# Columns and relationships of `model` an endpoint marshals, when the request narrows them with `?fields=`
+FieldSelection = namedtuple('FieldSelection', ['model', 'columns', 'relationships'])
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _apply_field_selection(execute_state):
+    """Load only the request's selected columns in every top-level query for its model."""
+    selection = g.get('field_selection') if has_request_context() else None
+    if selection is not None and _selects_entity(execute_state, selection.model):
+        columns = [getattr(selection.model, key) for key in selection.columns]
+        execute_state.statement = execute_state.statement.options(load_only(*columns))
@@ -0,0 +1,121 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+from flask import request
+from flask_restx import abort, fields
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import undefer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Query parameters accepted by every paginated collection endpoint
+PAGINATION_PARAMS = {
+    'after': 'Opaque cursor returned in the `next` link of the previous page',
+    'limit': f'Number of items per page (1-{MAX_PAGE_SIZE}, default {DEFAULT_PAGE_SIZE})'
+}
+
+Page = namedtuple('Page', ['items', 'next'])
+
+
+def page_model(api, dto, envelope='data'):
+    """Build the response model for one page of `dto` items."""
+    model = api.model(f'{dto.name}Page', {
+        envelope: fields.List(fields.Nested(dto)),
+        'next': fields.String(description='Link to the next page, null on the last page')
+    })
+    # The field holding the items, which `?fields=` selects from
+    model.item_field = envelope
+    return model
+
+
+def link_header(page):
+    """Return the `Link` header for endpoints that respond with a bare list."""
+    return {'Link': f'<{page.next}>; rel="next"'} if page.next else {}
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    raw = json.dumps([_to_json(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into sort key values typed after `columns`."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('cursor does not match the sort key')
+        return [_from_json(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError, ArithmeticError):
+        abort(400, 'Invalid pagination cursor.')
+
+
+def page_limit():
+    """Read and validate the `limit` query parameter."""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if not (1 <= limit <= MAX_PAGE_SIZE):
+        abort(400, f'Limit must be between 1 and {MAX_PAGE_SIZE}.')
+    return limit
+
+
+def paginate(query, sort_column=None, descending=False, limit=None):
+    """
+    Fetch one page of `query` using keyset pagination.
+
+    Rows are ordered by `sort_column` (if given) and then by primary key, and
+    the next page starts strictly after the last row of this one, so deep
+    pages are served from the index instead of an OFFSET scan.
+    """
+    limit = limit or page_limit()
+    entity = query.column_descriptions[0]['entity']
+    key_columns = [entity.id] if sort_column is None else [sort_column, entity.id]
+
+    after = request.args.get('after')
+    if after:
+        query = query.filter(_after(key_columns, decode_cursor(after, key_columns), descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in key_columns]
+    # The cursor reads the sort key even when `?fields=` leaves it out
+    rows = query.options(*(undefer(column) for column in key_columns)).order_by(*ordering).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+
+    rows = rows[:limit]
+    cursor = encode_cursor([getattr(rows[-1], column.key) for column in key_columns])
+    args = request.args.to_dict()
+    args.update(after=cursor, limit=limit)
+    return Page(rows, f'{request.path}?{urlencode(args)}')
+
+
+def _after(key_columns, values, descending):
+    """Build `(k1, k2, ...) > (v1, v2, ...)` as an index-friendly OR chain."""
+    clauses = []
+    for i, (column, value) in enumerate(zip(key_columns, values)):
+        bound = column < value if descending else column > value
+        equal = [key_columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, bound))
+    return or_(*clauses)
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(value, column):
+    python_type = column.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
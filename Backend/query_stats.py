@@ -0,0 +1,101 @@
+import re
+import time
+from collections import Counter
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Identical statements run this many times in one request are reported as a likely N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+# Expanded IN lists differ in length between calls, but are the same statement shape
+_IN_LIST = re.compile(r'\((?:\s*(?:%s|\?|:\w+)\s*,)+\s*(?:%s|\?|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request repeats a statement too often."""
+
+
+class RequestQueryStats:
+    """SQL statements run while handling one request, and the time spent on them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """Return the statement shapes run at least `threshold` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def statement_shape(statement):
+    """Normalize a statement so repeated runs with different parameters compare equal."""
+    return _IN_LIST.sub('(...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context, so a statement that fails leaves nothing behind
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'query_start', None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    # Only requests are measured; background writers and listeners run outside of one
+    if has_request_context() and 'query_stats' in g:
+        g.query_stats.record(statement, duration)
+
+
+def init_app(app):
+    """
+    Count the SQL statements and database time of every request.
+
+    The totals are sent in a Server-Timing header and logged with each
+    request. Statements repeated SQL_N_PLUS_ONE_THRESHOLD times or more are
+    logged as likely N+1 queries; with SQL_STRICT set, they fail the request
+    instead, which makes them fail tests.
+    """
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    strict = app.config.get('SQL_STRICT', False)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = RequestQueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        duration_ms = stats.duration * 1000
+        response.headers.add('Server-Timing', f'db;dur={duration_ms:.2f};desc="{stats.count} queries"')
+        app.logger.info(
+            'SQL: %s %s ran %d queries in %.2f ms', request.method, request.path, stats.count, duration_ms,
+            extra={'sql_queries': stats.count, 'sql_time_ms': round(duration_ms, 2)}
+        )
+
+        repeated = stats.repeated(threshold)
+        for shape, count in repeated:
+            app.logger.warning(
+                'Likely N+1 in %s %s: statement ran %d times: %s', request.method, request.path, count, shape,
+                extra={'sql_repeated_statement': shape, 'sql_repeat_count': count}
+            )
+        if strict and repeated:
+            shape, count = repeated[0]
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} ran the same statement {count} times '
+                f'(threshold {threshold}): {shape}'
+            )
+        return response
@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, Assignment, Driver, Place
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('assignments', description='Operations related to assignments')
@@ -28,16 +30,19 @@ update_assignment_dto = api.model('UpdateAssignment', {
     'assigned_at': fields.String(description='Timestamp of the assignment (YYYY-MM-DD HH:MM:SS)')
 })
 
+assignment_page_dto = page_model(api, assignment_dto)
+
 
 class AssignmentsResource(Resource):
     @log_user_activity('view_assignments')
     @jwt_required()
-    @api.marshal_list_with(assignment_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, assignment_page_dto)
     def get(self):
-        """Fetch all assignments"""
+        """Fetch a page of assignments"""
         try:
-            assignments = Assignment.query.all()
-            return assignments, 200
+            page = paginate(Assignment.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching assignments: %s', str(e))
             return {'message': 'Error fetching assignments. Please try again later.'}, 500
@@ -85,7 +90,7 @@ class AssignmentsResource(Resource):
 
 class AssignmentResource(Resource):
     @jwt_required()
-    @api.marshal_with(assignment_dto, envelope='data')
+    @marshal_with(api, assignment_dto, envelope='data')
     def get(self, assignment_id):
         """Fetch a specific assignment"""
         try:
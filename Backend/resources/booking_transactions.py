@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, BookingTransaction
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('booking_transactions', description='Operations related to booking transactions')
@@ -29,16 +31,19 @@ update_booking_transaction_dto = api.model('UpdateBookingTransaction', {
     'status': fields.String(description='Status of the transaction')
 })
 
+booking_transaction_page_dto = page_model(api, booking_transaction_dto)
+
 
 class BookingTransactionsResource(Resource):
     @log_user_activity('view_booking_transactions')
     @jwt_required()
-    @api.marshal_list_with(booking_transaction_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, booking_transaction_page_dto)
     def get(self):
-        """Fetch all booking transactions"""
+        """Fetch a page of booking transactions"""
         try:
-            transactions = BookingTransaction.query.all()
-            return transactions, 200
+            page = paginate(BookingTransaction.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching booking transactions: %s', str(e))
             return {'message': 'Error fetching transactions. Please try again.'}, 500
@@ -71,7 +76,7 @@ class BookingTransactionsResource(Resource):
 
 class BookingTransactionResource(Resource):
     @jwt_required()
-    @api.marshal_with(booking_transaction_dto, envelope='data')
+    @marshal_with(api, booking_transaction_dto, envelope='data')
     def get(self, transaction_id):
         """Fetch a specific booking transaction"""
         try:
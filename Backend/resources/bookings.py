@@ -1,9 +1,17 @@
 from flask import current_app as app
 from flask_restx import Resource, Namespace, fields
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
-from models import db, Booking, User, Place
-from utils import log_user_activity
+from models import db, Booking, User, Place, Promotion
+from utils import log_user_activity, load_profile
+from idempotency import idempotent
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
+from services.availability import is_open, has_conflicting_booking, parse_booking_date, BOOKING_DURATION
+from services.pricing import quote
+from services.currency import convert_currency, CURRENCY_PARAM
+from services.dispatch import assign_driver, dispatch_bookings, pending_bookings, preferred_languages, score_drivers, MAX_BATCH_SIZE
 
 # Namespace
 api = Namespace('bookings', description='Operations related to bookings')
@@ -21,9 +29,9 @@ booking_dto = api.model('Booking', {
 create_booking_dto = api.model('CreateBooking', {
     'user_id': fields.Integer(required=True, description='ID of the user making the booking'),
     'place_id': fields.Integer(required=True, description='ID of the place being booked'),
-    'total_cost': fields.Float(required=True, description='Total cost of the booking'),
     'booking_date': fields.String(required=True, description='Date of the booking'),
-    'status': fields.String(required=True, description='Status of the booking')
+    'status': fields.String(required=True, description='Status of the booking'),
+    'promotion_code': fields.String(description='Promotion code to apply to the price')
 })
 
 update_booking_dto = api.model('UpdateBooking', {
@@ -33,16 +41,127 @@ update_booking_dto = api.model('UpdateBooking', {
     'status': fields.String(description='Status of the booking')
 })
 
+booking_place_dto = api.model('BookingPlace', {
+    'id': fields.Integer(description='Unique ID of the place'),
+    'name': fields.String(description='Name of the place'),
+    'city': fields.String(description='City of the place')
+})
+
+booking_driver_dto = api.model('BookingDriver', {
+    'id': fields.Integer(description='Unique ID of the driver'),
+    'name': fields.String(description='Name of the driver'),
+    'surname': fields.String(description='Surname of the driver')
+})
+
+booking_user_dto = api.model('BookingUser', {
+    'id': fields.Integer(description='Unique ID of the user'),
+    'username': fields.String(description='Username of the user')
+})
+
+booking_payment_dto = api.model('BookingPayment', {
+    'id': fields.Integer(description='Unique ID of the payment'),
+    'amount': fields.Float(description='Amount of the payment'),
+    'payment_method': fields.String(description='Payment method'),
+    'transaction_status': fields.String(description='Status of the payment'),
+    'transaction_date': fields.DateTime(description='Date of the payment')
+})
+
+booking_transaction_dto = api.model('BookingTransactionSummary', {
+    'id': fields.Integer(description='Unique ID of the transaction'),
+    'amount': fields.Float(description='Amount of the transaction'),
+    'status': fields.String(description='Status of the transaction'),
+    'transaction_date': fields.DateTime(description='Date of the transaction')
+})
+
+booking_detail_dto = api.inherit('BookingDetail', booking_dto, {
+    'place': fields.Nested(booking_place_dto, description='The booked place'),
+    'driver': fields.Nested(booking_driver_dto, description='Driver assigned to the booking', allow_null=True),
+    'user': fields.Nested(booking_user_dto, description='User who made the booking'),
+    'payments': fields.List(fields.Nested(booking_payment_dto), description='Payments for the booking'),
+    'transactions': fields.List(fields.Nested(booking_transaction_dto), description='Transactions of the booking'),
+    'pricing_snapshot': fields.Raw(description='Price breakdown the total cost was computed from')
+})
+
+booking_page_dto = page_model(api, booking_dto)
+
+driver_candidate_dto = api.model('BookingDriverCandidate', {
+    'driver_id': fields.Integer(description='ID of the driver'),
+    'score': fields.Float(description='Dispatch score, lower is better'),
+    'language_match': fields.Boolean(description="Whether the driver speaks the user's preferred language"),
+    'load': fields.Integer(description='Bookings the driver already has in the coming week'),
+    'distance_km': fields.Float(description="Distance from the driver's latest assignment to the place")
+})
+
+dispatch_dto = api.model('BookingDispatch', {
+    'booking_ids': fields.List(fields.Integer, description=f'Bookings to assign drivers to, by default the {MAX_BATCH_SIZE} soonest pending ones'),
+    'company_id': fields.Integer(description='Only assign drivers of this company')
+})
+
+dispatch_result_dto = api.model('BookingDispatchResult', {
+    'assigned': fields.Raw(description='Driver ID assigned to each booking, by booking ID'),
+    'unassigned': fields.List(fields.Integer, description='Bookings no driver could be assigned to')
+})
+
+booking_filter_parser = api.parser()
+booking_filter_parser.add_argument('user_id', type=int, location='args', help='Only bookings of this user')
+
+driver_candidates_parser = api.parser()
+driver_candidates_parser.add_argument('limit', type=int, default=5, location='args', help='Number of candidates (max 50)')
+driver_candidates_parser.add_argument('company_id', type=int, location='args', help='Only rank drivers of this company')
+
+
+def lock_places(*place_ids):
+    """
+    Lock the rows of the given places until the transaction ends.
+
+    Bookings of the same place wait for each other between their
+    availability check and their commit, while bookings of other places are
+    not held up. Rows are locked in id order so two requests can never
+    deadlock. Returns the ids of the places that exist.
+    """
+    place_ids = sorted(set(place_ids))
+    return set(db.session.scalars(
+        select(Place.id).where(Place.id.in_(place_ids)).order_by(Place.id).with_for_update()
+    ))
+
+
+def place_is_free(place_id, booking_date, booking_id=None):
+    """
+    Check that the place is open and not booked for the slot starting at `booking_date`.
+
+    Bookings are only checked against the database, which sees those other
+    processes have just made, cancelled or moved.
+    """
+    if not is_open('place', place_id, booking_date, booking_date + BOOKING_DURATION):
+        return False
+    return not has_conflicting_booking(booking_date, place_id=place_id, exclude_booking=booking_id)
+
+
+def booked_promotion_code(booking):
+    """Return the code of the promotion applied to a booking's price, if it still exists."""
+    for adjustment in (booking.pricing_snapshot or {}).get('adjustments', []):
+        if adjustment.get('source') == 'promotion':
+            promotion = db.session.get(Promotion, adjustment['id'])
+            return promotion.code if promotion else None
+    return None
+
 
 class BookingsResource(Resource):
     @log_user_activity('view_bookings')
     @jwt_required()
-    @api.marshal_list_with(booking_dto, envelope='data')
+    @convert_currency('total_cost')
+    @api.doc(params={**PAGINATION_PARAMS, **CURRENCY_PARAM})
+    @api.expect(booking_filter_parser)
+    @marshal_with(api, booking_page_dto)
     def get(self):
-        """Fetch all bookings"""
+        """Fetch a page of bookings, optionally only those of one user"""
+        args = booking_filter_parser.parse_args()
         try:
-            bookings = Booking.query.all()
-            return bookings, 200
+            query = Booking.query
+            if args['user_id'] is not None:
+                query = query.filter(Booking.user_id == args['user_id'])
+            page = paginate(query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching bookings: %s', str(e))
             return {'message': 'Error fetching bookings. Please try again later.'}, 500
@@ -50,26 +169,44 @@ class BookingsResource(Resource):
     @log_user_activity('create_booking')
     @jwt_required()
     @api.expect(create_booking_dto, validate=True)
+    @api.doc(params={'Idempotency-Key': {'in': 'header', 'description': 'Unique key of this booking attempt; retries with the same key return the original response'}})
+    @idempotent('create_booking')
     def post(self):
         """Create a new booking"""
         data = api.payload
 
         if not User.query.get(data['user_id']):
             return {'message': 'User does not exist.'}, 400
-        if not Place.query.get(data['place_id']):
-            return {'message': 'Place does not exist.'}, 400
+        try:
+            booking_date = parse_booking_date(data['booking_date'])
+        except ValueError:
+            return {'message': 'Booking date must be an ISO 8601 date and time.'}, 400
 
         try:
+            if not lock_places(data['place_id']):
+                db.session.rollback()
+                return {'message': 'Place does not exist.'}, 400
+            if data['status'] != 'cancelled' and not place_is_free(data['place_id'], booking_date):
+                db.session.rollback()
+                return {'message': 'Place is not available at this time.'}, 409
+            try:
+                pricing = quote(data['place_id'], booking_date, data.get('promotion_code'))
+            except ValueError as e:
+                db.session.rollback()
+                return {'message': str(e)}, 400
             new_booking = Booking(
                 user_id=data['user_id'],
                 place_id=data['place_id'],
-                booking_date=data['booking_date'],
+                booking_date=booking_date,
                 status=data['status'],
-                total_cost=data['total_cost']
+                total_cost=pricing['total'],
+                pricing_snapshot=pricing
             )
             db.session.add(new_booking)
+            if new_booking.status != 'cancelled':
+                assign_driver(new_booking)
             db.session.commit()
-            return {'message': 'Booking created successfully', 'data': {'id': new_booking.id}}, 201
+            return {'message': 'Booking created successfully', 'data': {'id': new_booking.id, 'driver_id': new_booking.driver_id}}, 201
         except IntegrityError as e:
             app.logger.error('Integrity error while creating booking: %s', str(e))
             db.session.rollback()
@@ -81,7 +218,8 @@ class BookingsResource(Resource):
 
 class BookingResource(Resource):
     @jwt_required()
-    @api.marshal_with(booking_dto, envelope='data')
+    @marshal_with(api, booking_detail_dto, envelope='data')
+    @load_profile('booking_detail')
     def get(self, booking_id):
         """Fetch a specific booking"""
         try:
@@ -99,21 +237,49 @@ class BookingResource(Resource):
 
         if 'user_id' in data and not User.query.get(data['user_id']):
             return {'message': 'User does not exist.'}, 400
-        if 'place_id' in data and not Place.query.get(data['place_id']):
-            return {'message': 'Place does not exist.'}, 400
+        try:
+            booking_date = parse_booking_date(data['booking_date']) if 'booking_date' in data else None
+        except ValueError:
+            return {'message': 'Booking date must be an ISO 8601 date and time.'}, 400
 
         try:
             booking = Booking.query.get_or_404(booking_id)
+            place_id = data.get('place_id', booking.place_id)
+            booking_date = booking_date or booking.booking_date
+            status = data.get('status', booking.status)
+            relocated = place_id != booking.place_id or booking_date != booking.booking_date
+            moved = relocated or booking.status == 'cancelled'
+            if moved and status != 'cancelled':
+                if place_id not in lock_places(place_id, booking.place_id):
+                    db.session.rollback()
+                    return {'message': 'Place does not exist.'}, 400
+                if not place_is_free(place_id, booking_date, booking.id):
+                    db.session.rollback()
+                    return {'message': 'Place is not available at this time.'}, 409
+            elif 'place_id' in data and not Place.query.get(place_id):
+                return {'message': 'Place does not exist.'}, 400
+            if relocated:
+                # The price depends on the place and the date, so it is quoted again with the same promotion
+                try:
+                    pricing = quote(place_id, booking_date, booked_promotion_code(booking))
+                except (LookupError, ValueError) as e:
+                    db.session.rollback()
+                    return {'message': str(e)}, 400
+                booking.total_cost = pricing['total']
+                booking.pricing_snapshot = pricing
             if 'user_id' in data:
                 booking.user_id = data['user_id']
             if 'place_id' in data:
                 booking.place_id = data['place_id']
             if 'booking_date' in data:
-                booking.booking_date = data['booking_date']
+                booking.booking_date = booking_date
             if 'status' in data:
                 booking.status = data['status']
+            if moved and status != 'cancelled' and booking.driver_id is not None:
+                # The driver was only checked for the old slot: keep them if still free, else find another
+                assign_driver(booking)
             db.session.commit()
-            return {'message': 'Booking updated successfully'}, 200
+            return {'message': 'Booking updated successfully', 'data': {'driver_id': booking.driver_id}}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error updating booking: %s', str(e))
             return {'message': 'Failed to update booking. Please try again later.'}, 500
@@ -129,3 +295,49 @@ class BookingResource(Resource):
         except SQLAlchemyError as e:
             app.logger.error('Error deleting booking: %s', str(e))
             return {'message': 'Failed to delete booking. Please try again later.'}, 500
+
+
+class BookingDriversResource(Resource):
+    @jwt_required()
+    @api.expect(driver_candidates_parser)
+    @marshal_with(api, driver_candidate_dto, envelope='data', as_list=True)
+    def get(self, booking_id):
+        """Rank the drivers that could take a booking"""
+        args = driver_candidates_parser.parse_args()
+        if not 1 <= args['limit'] <= 50:
+            api.abort(400, 'Limit must be between 1 and 50')
+        try:
+            booking = Booking.query.get_or_404(booking_id)
+            language_id = preferred_languages([booking.user_id]).get(booking.user_id)
+            candidates = score_drivers(booking, language_id, args['company_id'])
+            return [candidate._asdict() for candidate in candidates[:args['limit']]], 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error ranking drivers: %s', str(e))
+            api.abort(500, 'Failed to rank drivers. Please try again later.')
+
+
+class BookingsDispatchResource(Resource):
+    @log_user_activity('dispatch_bookings')
+    @jwt_required()
+    @api.expect(dispatch_dto)
+    @marshal_with(api, dispatch_result_dto, envelope='data')
+    def post(self):
+        """Assign drivers to many pending bookings at once"""
+        booking_ids = (api.payload or {}).get('booking_ids')
+        company_id = (api.payload or {}).get('company_id')
+        if booking_ids is not None and (not isinstance(booking_ids, list) or len(booking_ids) > MAX_BATCH_SIZE):
+            api.abort(400, f'Booking IDs must be a list of at most {MAX_BATCH_SIZE} IDs')
+        if company_id is not None and not isinstance(company_id, int):
+            api.abort(400, 'Company ID must be an integer')
+        try:
+            bookings = pending_bookings(booking_ids)
+            assigned = dispatch_bookings(bookings, company_id)
+            db.session.commit()
+            return {
+                'assigned': {str(booking_id): driver_id for booking_id, driver_id in assigned.items()},
+                'unassigned': [booking.id for booking in bookings if booking.id not in assigned]
+            }, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error dispatching bookings: %s', str(e))
+            db.session.rollback()
+            api.abort(500, 'Failed to dispatch bookings. Please try again later.')
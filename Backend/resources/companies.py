@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, Company
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('companies', description='Operations related to companies')
@@ -22,16 +24,19 @@ update_company_dto = api.model('UpdateCompany', {
     'name': fields.String(description='Name of the company (3-100 characters)')
 })
 
+company_page_dto = page_model(api, company_dto)
+
 
 class CompaniesResource(Resource):
     @log_user_activity('view_companies')
     @jwt_required()
-    @api.marshal_list_with(company_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, company_page_dto)
     def get(self):
-        """Fetch all companies"""
+        """Fetch a page of companies"""
         try:
-            companies = Company.query.all()
-            return companies, 200
+            page = paginate(Company.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching companies: %s', str(e))
             return {'message': 'Error fetching companies. Please try again later.'}, 500
@@ -65,7 +70,7 @@ class CompaniesResource(Resource):
 
 class CompanyResource(Resource):
     @jwt_required()
-    @api.marshal_with(company_dto, envelope='data')
+    @marshal_with(api, company_dto, envelope='data')
     def get(self, company_id):
         """Fetch a specific company"""
         try:
@@ -4,6 +4,9 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, Currency
 from utils import log_user_activity
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('currencies', description='Operations related to currencies')
@@ -25,16 +28,22 @@ update_currency_dto = api.model('UpdateCurrency', {
     'symbol': fields.String(description='Updated symbol of the currency')
 })
 
+currency_page_dto = page_model(api, currency_dto)
+
+invalidate_on_commit(Currency, 'currencies')
+
 
 class CurrenciesResource(Resource):
     @log_user_activity('view_currencies')
     @jwt_required()
-    @api.marshal_list_with(currency_dto, envelope='data')
+    @cached_response('currencies', params=PAGINATION_PARAMS)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, currency_page_dto)
     def get(self):
-        """Fetch all currencies"""
+        """Fetch a page of currencies"""
         try:
-            currencies = Currency.query.all()
-            return currencies, 200
+            page = paginate(Currency.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching currencies: %s', str(e))
             return {'message': 'Error fetching currencies. Please try again later.'}, 500
@@ -65,7 +74,7 @@ class CurrenciesResource(Resource):
 
 class CurrencyResource(Resource):
     @jwt_required()
-    @api.marshal_with(currency_dto, envelope='data')
+    @marshal_with(api, currency_dto, envelope='data')
     def get(self, currency_id):
         """Fetch a specific currency"""
         try:
@@ -1,9 +1,14 @@
 from flask import current_app as app
-from flask_restx import Resource, Namespace, fields
+from flask_restx import Resource, Namespace, fields, inputs
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
-from models import db, Driver
+from models import db, Driver, Company, Language
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
+from services.reference import reference_data
+from services.availability import is_available, free_slots, naive_utc, MAX_RANGE
+from datetime import datetime, timedelta
 
 # Namespace
 api = Namespace('drivers', description='Operations related to drivers')
@@ -37,6 +42,25 @@ update_driver_dto = api.model('UpdateDriver', {
     'status': fields.String(description='Status of the driver (active/inactive)')
 })
 
+driver_page_dto = page_model(api, driver_dto)
+
+availability_slot_dto = api.model('DriverAvailabilitySlot', {
+    'start': fields.DateTime(description='Start of the free interval'),
+    'end': fields.DateTime(description='End of the free interval (exclusive)')
+})
+
+availability_dto = api.model('DriverAvailability', {
+    'start': fields.DateTime(description='Start of the checked range'),
+    'end': fields.DateTime(description='End of the checked range (exclusive)'),
+    'free': fields.Boolean(description='Whether the driver is free for the whole range'),
+    'slots': fields.List(fields.Nested(availability_slot_dto), description='Free intervals within the range')
+})
+
+# Query parameters for availability lookups
+availability_parser = api.parser()
+availability_parser.add_argument('start', type=inputs.datetime_from_iso8601, location='args', help='Start of the range (ISO 8601), defaults to now')
+availability_parser.add_argument('end', type=inputs.datetime_from_iso8601, location='args', help='End of the range (ISO 8601, exclusive), defaults to 7 days after start')
+
 def validate_age(age):
     if not (18 <= age <= 100):
         return {'message': 'Age must be between 18 and 100.'}, 400
@@ -46,12 +70,13 @@ def validate_age(age):
 class DriversResource(Resource):
     @log_user_activity('view_drivers')
     @jwt_required()
-    @api.marshal_list_with(driver_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, driver_page_dto)
     def get(self):
-        """Fetch all drivers"""
+        """Fetch a page of drivers"""
         try:
-            drivers = Driver.query.all()
-            return drivers, 200
+            page = paginate(Driver.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching drivers: %s', str(e))
             return {'message': 'Error fetching drivers. Please try again later.'}, 500
@@ -67,6 +92,11 @@ class DriversResource(Resource):
         if age_validation:
             return age_validation
 
+        if not reference_data.exists(Company, data['company_id']):
+            return {'message': 'Invalid company ID'}, 404
+        if not reference_data.exists(Language, data['language_id']):
+            return {'message': 'Invalid language ID'}, 404
+
         if Driver.query.filter_by(name=data['name'], company_id=data['company_id']).first():
             return {'message': 'Driver with this name already exists in the specified company.'}, 400
 
@@ -93,7 +123,7 @@ class DriversResource(Resource):
 
 class DriverResource(Resource):
     @jwt_required()
-    @api.marshal_with(driver_dto, envelope='data')
+    @marshal_with(api, driver_dto, envelope='data')
     def get(self, driver_id):
         """Fetch a specific driver"""
         try:
@@ -114,6 +144,11 @@ class DriverResource(Resource):
             if age_validation:
                 return age_validation
 
+        if 'company_id' in data and not reference_data.exists(Company, data['company_id']):
+            return {'message': 'Invalid company ID'}, 404
+        if 'language_id' in data and not reference_data.exists(Language, data['language_id']):
+            return {'message': 'Invalid language ID'}, 404
+
         try:
             driver = Driver.query.get_or_404(driver_id)
 
@@ -147,3 +182,31 @@ class DriverResource(Resource):
         except SQLAlchemyError as e:
             app.logger.error('Error deleting driver: %s', str(e))
             return {'message': 'Failed to delete driver. Please try again later.'}, 500
+
+
+class DriverAvailabilityResource(Resource):
+    @jwt_required()
+    @api.expect(availability_parser)
+    @marshal_with(api, availability_dto, envelope='data')
+    def get(self, driver_id):
+        """Check when a driver is free within a time range"""
+        args = availability_parser.parse_args()
+        start = naive_utc(args['start']) if args['start'] else datetime.utcnow().replace(microsecond=0)
+        end = naive_utc(args['end']) if args['end'] else start + timedelta(days=7)
+        if end <= start:
+            api.abort(400, 'End must be after start')
+        if end - start > MAX_RANGE:
+            api.abort(400, f'Range cannot be longer than {MAX_RANGE.days} days')
+
+        try:
+            if not db.session.get(Driver, driver_id):
+                api.abort(404, 'Driver not found')
+            return {
+                'start': start,
+                'end': end,
+                'free': is_available('driver', driver_id, start, end),
+                'slots': [slot._asdict() for slot in free_slots('driver', driver_id, start, end)]
+            }, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error fetching driver availability: %s', str(e))
+            api.abort(500, 'Failed to fetch driver availability. Please try again later.')
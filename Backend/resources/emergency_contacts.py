@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, EmergencyContact
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('emergency_contacts', description='Operations related to emergency contacts')
@@ -30,16 +32,19 @@ update_emergency_contact_dto = api.model('UpdateEmergencyContact', {
     'relation': fields.String(description='Updated relation to the user')
 })
 
+emergency_contact_page_dto = page_model(api, emergency_contact_dto)
+
 
 class EmergencyContactsResource(Resource):
     @log_user_activity('view_emergency_contacts')
     @jwt_required()
-    @api.marshal_list_with(emergency_contact_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, emergency_contact_page_dto)
     def get(self):
-        """Fetch all emergency contacts"""
+        """Fetch a page of emergency contacts"""
         try:
-            contacts = EmergencyContact.query.all()
-            return contacts, 200
+            page = paginate(EmergencyContact.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching emergency contacts: %s', str(e))
             return {'message': 'Error fetching contacts. Please try again.'}, 500
@@ -68,7 +73,7 @@ class EmergencyContactsResource(Resource):
 
 class EmergencyContactResource(Resource):
     @jwt_required()
-    @api.marshal_with(emergency_contact_dto, envelope='data')
+    @marshal_with(api, emergency_contact_dto, envelope='data')
     def get(self, contact_id):
         """Fetch a specific emergency contact"""
         try:
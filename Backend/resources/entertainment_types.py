@@ -4,6 +4,9 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, EntertainmentType
 from utils import log_user_activity
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('entertainment_types', description='Operations related to entertainment types')
@@ -18,16 +21,22 @@ create_entertainment_type_dto = api.model('CreateEntertainmentType', {
     'name': fields.String(required=True, description='Name of the entertainment type')
 })
 
+entertainment_type_page_dto = page_model(api, entertainment_type_dto)
+
+invalidate_on_commit(EntertainmentType, 'entertainment_types')
+
 
 class EntertainmentTypesResource(Resource):
     @log_user_activity('view_entertainment_types')
     @jwt_required()
-    @api.marshal_list_with(entertainment_type_dto, envelope='data')
+    @cached_response('entertainment_types', params=PAGINATION_PARAMS)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, entertainment_type_page_dto)
     def get(self):
-        """Fetch all entertainment types"""
+        """Fetch a page of entertainment types"""
         try:
-            types = EntertainmentType.query.all()
-            return types, 200
+            page = paginate(EntertainmentType.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching entertainment types: %s', str(e))
             return {'message': 'Error fetching entertainment types. Please try again.'}, 500
@@ -53,7 +62,7 @@ class EntertainmentTypesResource(Resource):
 
 class EntertainmentTypeResource(Resource):
     @jwt_required()
-    @api.marshal_with(entertainment_type_dto, envelope='data')
+    @marshal_with(api, entertainment_type_dto, envelope='data')
     def get(self, etype_id):
         """Fetch a specific entertainment type"""
         try:
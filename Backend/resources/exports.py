@@ -0,0 +1,49 @@
+from flask import Response, request, stream_with_context, current_app as app
+from flask_restx import Resource, Namespace, inputs
+from sqlalchemy.exc import SQLAlchemyError
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User
+from utils import log_user_activity
+from services.availability import naive_utc
+from services.exports import EXPORTS, FORMATS, ENCODERS, export_columns, export_rows, gzip_chunks
+
+# Namespace
+api = Namespace('exports', description='Bulk export operations')
+
+# Query parameters for an export
+export_parser = api.parser()
+export_parser.add_argument('format', type=str, default='ndjson', choices=tuple(FORMATS), location='args', help='ndjson (default) or csv')
+export_parser.add_argument('since', type=inputs.datetime_from_iso8601, location='args', help='Only rows written at or after this time (ISO 8601)')
+
+
+class ExportResource(Resource):
+    @log_user_activity('export_data')
+    @jwt_required()
+    @api.expect(export_parser)
+    def get(self, resource):
+        """Stream every row of bookings, payments or user_audits as NDJSON or CSV"""
+        user = db.session.get(User, get_jwt_identity())
+        if user is None or user.role != 'admin':
+            return {'message': 'Only administrators can export data.'}, 403
+        if resource not in EXPORTS:
+            return {'message': f'Unknown export {resource}. Available exports: {", ".join(EXPORTS)}.'}, 404
+        args = export_parser.parse_args()
+        since = naive_utc(args['since']) if args['since'] else None
+
+        keys = [column.key for column in export_columns(resource)]
+        chunks = _logged(ENCODERS[args['format']](keys, export_rows(resource, since)), resource)
+        headers = {'Content-Disposition': f'attachment; filename={resource}.{args["format"]}'}
+        if request.accept_encodings['gzip']:
+            chunks = gzip_chunks(chunks)
+            headers.update({'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+        # The request context, and with it the session and its cursor, stays open while streaming
+        return Response(stream_with_context(chunks), mimetype=FORMATS[args['format']], headers=headers)
+
+
+def _logged(chunks, resource):
+    # The response has started by the time rows are read, so errors can only end the stream
+    try:
+        yield from chunks
+    except SQLAlchemyError as e:
+        app.logger.error('Error streaming %s export: %s', resource, str(e))
+        raise
@@ -4,6 +4,9 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, Language
 from utils import log_user_activity
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('languages', description='Operations related to languages')
@@ -22,6 +25,10 @@ update_language_dto = api.model('UpdateLanguage', {
     'name': fields.String(description='Updated name of the language')
 })
 
+language_page_dto = page_model(api, language_dto)
+
+invalidate_on_commit(Language, 'languages')
+
 def check_existing_language(name):
     """Check if a language with the given name already exists"""
     return Language.query.filter_by(name=name).first()
@@ -30,12 +37,14 @@ def check_existing_language(name):
 class LanguagesResource(Resource):
     @log_user_activity('view_languages')
     @jwt_required()
-    @api.marshal_list_with(language_dto, envelope='data')
+    @cached_response('languages', params=PAGINATION_PARAMS)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, language_page_dto)
     def get(self):
-        """Fetch all languages"""
+        """Fetch a page of languages"""
         try:
-            languages = Language.query.all()
-            return languages, 200
+            page = paginate(Language.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching languages: %s', str(e))
             return {'message': 'Error fetching languages. Please try again later.'}, 500
@@ -66,7 +75,7 @@ class LanguagesResource(Resource):
 
 class LanguageResource(Resource):
     @jwt_required()
-    @api.marshal_with(language_dto, envelope='data')
+    @marshal_with(api, language_dto, envelope='data')
     def get(self, language_id):
         """Fetch a specific language"""
         try:
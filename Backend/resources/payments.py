@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, Payment
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('payments', description='Operations related to payments')
@@ -31,16 +33,19 @@ update_payment_dto = api.model('UpdatePayment', {
     'status': fields.String(description='Updated status of the payment')
 })
 
+payment_page_dto = page_model(api, payment_dto)
+
 
 class PaymentsResource(Resource):
     @log_user_activity('view_payments')
     @jwt_required()
-    @api.marshal_list_with(payment_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, payment_page_dto)
     def get(self):
-        """Fetch all payments"""
+        """Fetch a page of payments"""
         try:
-            payments = Payment.query.all()
-            return payments, 200
+            page = paginate(Payment.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching payments: %s', str(e))
             return {'message': 'Failed to fetch payments. Please try again later.'}, 500
@@ -70,7 +75,7 @@ class PaymentsResource(Resource):
 
 class PaymentResource(Resource):
     @jwt_required()
-    @api.marshal_with(payment_dto, envelope='data')
+    @marshal_with(api, payment_dto, envelope='data')
     def get(self, payment_id):
         """Fetch a specific payment by ID"""
         try:
@@ -4,6 +4,9 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, PlaceCategory
 from utils import log_user_activity
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('place_categories', description='Operations related to place categories')
@@ -18,16 +21,22 @@ create_place_category_dto = api.model('CreatePlaceCategory', {
     'name': fields.String(required=True, description='Name of the category')
 })
 
+place_category_page_dto = page_model(api, place_category_dto)
+
+invalidate_on_commit(PlaceCategory, 'place_categories')
+
 
 class PlaceCategoriesResource(Resource):
     @log_user_activity('view_place_categories')
     @jwt_required()
-    @api.marshal_list_with(place_category_dto, envelope='data')
+    @cached_response('place_categories', params=PAGINATION_PARAMS)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, place_category_page_dto)
     def get(self):
-        """Fetch all place categories"""
+        """Fetch a page of place categories"""
         try:
-            categories = PlaceCategory.query.all()
-            return categories, 200
+            page = paginate(PlaceCategory.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching place categories: %s', str(e))
             return {'message': 'Error fetching categories. Please try again.'}, 500
@@ -54,7 +63,7 @@ class PlaceCategoriesResource(Resource):
 
 class PlaceCategoryResource(Resource):
     @jwt_required()
-    @api.marshal_with(place_category_dto, envelope='data')
+    @marshal_with(api, place_category_dto, envelope='data')
     def get(self, category_id):
         """Fetch a specific place category"""
         try:
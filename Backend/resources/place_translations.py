@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 from models import db, PlaceTranslation
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('place_translations', description='Operations related to place translations')
@@ -29,16 +31,19 @@ update_place_translation_dto = api.model('UpdatePlaceTranslation', {
     'description': fields.String(description='Updated translated description of the place')
 })
 
+place_translation_page_dto = page_model(api, place_translation_dto)
+
 
 class PlaceTranslationsResource(Resource):
     @log_user_activity('view_place_translations')
     @jwt_required()
-    @api.marshal_list_with(place_translation_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, place_translation_page_dto)
     def get(self):
-        """Fetch all place translations"""
+        """Fetch a page of place translations"""
         try:
-            translations = PlaceTranslation.query.all()
-            return translations, 200
+            page = paginate(PlaceTranslation.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching place translations: %s', str(e))
             return {'message': 'Error fetching translations. Please try again.'}, 500
@@ -71,7 +76,7 @@ class PlaceTranslationsResource(Resource):
 
 class PlaceTranslationResource(Resource):
     @jwt_required()
-    @api.marshal_with(place_translation_dto, envelope='data')
+    @marshal_with(api, place_translation_dto, envelope='data')
     def get(self, translation_id):
         """Fetch a specific place translation"""
         try:
@@ -1,9 +1,19 @@
 from flask import current_app as app
-from flask_restx import Resource, Namespace, fields
+from flask_restx import Resource, Namespace, fields, inputs
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
-from models import db, Place, EntertainmentType, PlaceCategory
-from utils import log_user_activity
+from models import db, Place, EntertainmentType, PlaceCategory, PlaceTranslation, Language
+from utils import log_user_activity, load_profile
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
+from services.geo import nearby_places
+from services.search import search_places
+from services.reference import reference_data
+from services.availability import is_available, free_slots, naive_utc, MAX_RANGE
+from services.currency import convert_currency, CURRENCY_PARAM
+from datetime import datetime, timedelta
 
 # Namespace
 api = Namespace('places', description='Operations related to places')
@@ -17,7 +27,8 @@ place_dto = api.model('Place', {
     'city': fields.String(required=True, description='City of the place'),
     'latitude': fields.Float(description='Latitude of the place'),
     'longitude': fields.Float(description='Longitude of the place'),
-    'rating': fields.Float(required=True, description='Rating of the place (1.0 to 5.0)'),
+    'rating': fields.Float(required=True, description='Rating of the place (1.0 to 5.0), the average of its reviews once it has any'),
+    'review_count': fields.Integer(description='Number of reviews of the place'),
     'entertainment_type_id': fields.Integer(required=True, description='Entertainment type ID linked to the place'),
     'category_id': fields.Integer(description='Category ID linked to the place'),
     'default_price': fields.Float(description='Default price for the place'),
@@ -31,16 +42,127 @@ create_place_dto = api.model('CreatePlace', {
     'entertainment_type_id': fields.Integer(required=True, description='Entertainment type ID linked to the place')
 })
 
+place_reference_dto = api.model('PlaceReference', {
+    'id': fields.Integer(description='Unique ID'),
+    'name': fields.String(description='Name')
+})
+
+place_translation_summary_dto = api.model('PlaceTranslationSummary', {
+    'language_id': fields.Integer(description='ID of the language'),
+    'translated_name': fields.String(description='Name in this language'),
+    'translated_description': fields.String(description='Description in this language')
+})
+
+place_detail_dto = api.inherit('PlaceDetail', place_dto, {
+    'category': fields.Nested(place_reference_dto, description='Category of the place', allow_null=True),
+    'entertainment_type': fields.Nested(place_reference_dto, description='Entertainment type of the place', allow_null=True),
+    'translations': fields.List(fields.Nested(place_translation_summary_dto), description='Translations of the place'),
+    'rating_histogram': fields.Raw(description='Number of reviews per star rating, from 1 to 5'),
+    'last_review_at': fields.DateTime(description='Date of the latest review')
+})
+
+place_page_dto = page_model(api, place_dto)
+
+invalidate_on_commit(Place, 'places', 'place:{id}')
+invalidate_on_commit(PlaceTranslation, 'place:{place_id}')
+
+# Query parameters for filtering and sorting the place list
+place_filter_parser = api.parser()
+place_filter_parser.add_argument('city', type=str, location='args', help='Only places in this city')
+place_filter_parser.add_argument('entertainment_type_id', type=int, location='args', help='Only places of this entertainment type')
+place_filter_parser.add_argument('category_id', type=int, location='args', help='Only places in this category')
+place_filter_parser.add_argument('min_rating', type=float, location='args', help='Minimum rating (inclusive)')
+place_filter_parser.add_argument('max_rating', type=float, location='args', help='Maximum rating (inclusive)')
+place_filter_parser.add_argument('min_price', type=float, location='args', help='Minimum default price (inclusive)')
+place_filter_parser.add_argument('max_price', type=float, location='args', help='Maximum default price (inclusive)')
+place_filter_parser.add_argument('sort', type=str, location='args', default='id', choices=('id', '-id', 'name', '-name', 'rating', '-rating', 'default_price', '-default_price'),
+                                 help='Sort key, prefix with "-" for descending. Places without a price are skipped when sorting by price.')
+
+nearby_place_dto = api.inherit('NearbyPlace', place_dto, {
+    'distance_km': fields.Float(description='Distance from the search point in kilometres')
+})
+
+# Query parameters for the proximity search
+nearby_parser = api.parser()
+nearby_parser.add_argument('lat', type=float, required=True, location='args', help='Latitude of the search point')
+nearby_parser.add_argument('lon', type=float, required=True, location='args', help='Longitude of the search point')
+nearby_parser.add_argument('radius_km', type=float, default=10.0, location='args', help='Search radius in kilometres (max 100)')
+nearby_parser.add_argument('limit', type=int, default=20, location='args', help='Maximum number of places (max 100)')
+
+place_search_dto = api.inherit('PlaceSearchResult', place_dto, {
+    'score': fields.Float(description='Relevance score of the match'),
+    'translated_name': fields.String(description='Name in the requested language, if translated'),
+    'translated_description': fields.String(description='Description in the requested language, if translated')
+})
+
+# Query parameters for the text search
+search_parser = api.parser()
+search_parser.add_argument('q', type=str, required=True, location='args', help='Search text, the last word is matched as a prefix')
+search_parser.add_argument('lang', type=str, location='args', help='Language name to return translations in')
+search_parser.add_argument('limit', type=int, default=10, location='args', help='Maximum number of places (max 50)')
+
+availability_slot_dto = api.model('PlaceAvailabilitySlot', {
+    'start': fields.DateTime(description='Start of the free interval'),
+    'end': fields.DateTime(description='End of the free interval (exclusive)')
+})
+
+availability_dto = api.model('PlaceAvailability', {
+    'start': fields.DateTime(description='Start of the checked range'),
+    'end': fields.DateTime(description='End of the checked range (exclusive)'),
+    'free': fields.Boolean(description='Whether the place is free for the whole range'),
+    'slots': fields.List(fields.Nested(availability_slot_dto), description='Free intervals within the range')
+})
+
+# Query parameters for availability lookups
+availability_parser = api.parser()
+availability_parser.add_argument('start', type=inputs.datetime_from_iso8601, location='args', help='Start of the range (ISO 8601), defaults to now')
+availability_parser.add_argument('end', type=inputs.datetime_from_iso8601, location='args', help='End of the range (ISO 8601, exclusive), defaults to 7 days after start')
+
+# Whitelisted sort keys mapped to their columns
+PLACE_SORT_COLUMNS = {
+    'id': None,
+    'name': Place.name,
+    'rating': Place.rating,
+    'default_price': Place.default_price
+}
+
+def filter_places(query, args):
+    """Apply the parsed place filters to a Place query."""
+    if args['city']:
+        query = query.filter(Place.city == args['city'])
+    if args['entertainment_type_id'] is not None:
+        query = query.filter(Place.entertainment_type_id == args['entertainment_type_id'])
+    if args['category_id'] is not None:
+        query = query.filter(Place.category_id == args['category_id'])
+    if args['min_rating'] is not None:
+        query = query.filter(Place.rating >= args['min_rating'])
+    if args['max_rating'] is not None:
+        query = query.filter(Place.rating <= args['max_rating'])
+    if args['min_price'] is not None:
+        query = query.filter(Place.default_price >= args['min_price'])
+    if args['max_price'] is not None:
+        query = query.filter(Place.default_price <= args['max_price'])
+    return query
 
 
 class PlacesResource(Resource):
     @log_user_activity('view_places')
-    @api.marshal_list_with(place_dto, envelope='data')
+    @cached_response('places', 'currencies', params=(*PAGINATION_PARAMS, *CURRENCY_PARAM, place_filter_parser))
+    @convert_currency('default_price')
+    @api.doc(params={**PAGINATION_PARAMS, **CURRENCY_PARAM})
+    @api.expect(place_filter_parser)
+    @marshal_with(api, place_page_dto)
     def get(self):
-        """Fetch all places"""
+        """Fetch a page of places, optionally filtered and sorted"""
+        args = place_filter_parser.parse_args()
+        descending = args['sort'].startswith('-')
+        sort_column = PLACE_SORT_COLUMNS[args['sort'].lstrip('-')]
         try:
-            places = Place.query.all()
-            return places, 200
+            query = filter_places(Place.query, args)
+            if sort_column is not None and sort_column.expression.nullable:
+                query = query.filter(sort_column.isnot(None))
+            page = paginate(query, sort_column=sort_column, descending=descending)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching places: %s', str(e))
             return {'message': 'Failed to fetch places. Please try again.'}, 500
@@ -59,12 +181,10 @@ class PlacesResource(Resource):
             if not (1.0 <= data['rating'] <= 5.0):
                 return {'message': 'Rating must be between 1.0 and 5.0'}, 400
 
-            entertainment_type = EntertainmentType.query.get(data['entertainment_type_id'])
-            if not entertainment_type:
+            if not reference_data.exists(EntertainmentType, data['entertainment_type_id']):
                 return {'message': 'Invalid entertainment type ID'}, 404
 
-            place_category = PlaceCategory.query.get(data['category_id'])
-            if not place_category:
+            if not reference_data.exists(PlaceCategory, data['category_id']):
                 return {'message': 'Invalid category ID'}, 404
 
             default_price_ = data['default_price'] if 'default_price' in data else None
@@ -90,7 +210,9 @@ class PlacesResource(Resource):
 
 
 class PlaceResource(Resource):
-    @api.marshal_with(place_dto, envelope='data')
+    @cached_response('place:{place_id}', 'place_categories', 'entertainment_types')
+    @marshal_with(api, place_detail_dto, envelope='data')
+    @load_profile('place_card')
     def get(self, place_id):
         """Fetch a specific place"""
         try:
@@ -109,15 +231,11 @@ class PlaceResource(Resource):
             if 'rating' in data and not (1.0 <= data['rating'] <= 5.0):
                 return {'message': 'Rating must be between 1.0 and 5.0'}, 400
 
-            if 'entertainment_type_id' in data:
-                entertainment_type = EntertainmentType.query.get(data['entertainment_type_id'])
-                if not entertainment_type:
-                    return {'message': 'Invalid entertainment type ID'}, 404
+            if 'entertainment_type_id' in data and not reference_data.exists(EntertainmentType, data['entertainment_type_id']):
+                return {'message': 'Invalid entertainment type ID'}, 404
 
-            if 'category_id' in data:
-                place_category = PlaceCategory.query.get(data['category_id'])
-                if not place_category:
-                    return {'message': 'Invalid category ID'}, 404
+            if 'category_id' in data and not reference_data.exists(PlaceCategory, data['category_id']):
+                return {'message': 'Invalid category ID'}, 404
 
             place = Place.query.get_or_404(place_id)
             if 'name' in data:
@@ -158,3 +276,95 @@ class PlaceResource(Resource):
         except SQLAlchemyError as e:
             app.logger.error('Error deleting place: %s', str(e))
             return {'message': 'Failed to delete place. Please try again.'}, 500
+
+
+class PlacesNearbyResource(Resource):
+    @log_user_activity('view_places_nearby')
+    @api.expect(nearby_parser)
+    @marshal_with(api, nearby_place_dto, as_list=True, envelope='data')
+    def get(self):
+        """Fetch the places closest to a point, nearest first"""
+        args = nearby_parser.parse_args()
+        if not (-90 <= args['lat'] <= 90 and -180 <= args['lon'] <= 180):
+            api.abort(400, 'Latitude must be between -90 and 90 and longitude between -180 and 180.')
+        if not (0 < args['radius_km'] <= 100):
+            api.abort(400, 'Radius must be between 0 and 100 km.')
+        if not (1 <= args['limit'] <= 100):
+            api.abort(400, 'Limit must be between 1 and 100.')
+
+        try:
+            matches = nearby_places(args['lat'], args['lon'], args['radius_km'], args['limit'])
+            places = {place.id: place for place in Place.query.filter(Place.id.in_([place_id for place_id, _ in matches]))}
+            result = []
+            for place_id, distance in matches:
+                place = places.get(place_id)
+                if place is not None:
+                    place.distance_km = round(distance, 3)
+                    result.append(place)
+            return result, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error fetching nearby places: %s', str(e))
+            return {'message': 'Failed to fetch nearby places. Please try again.'}, 500
+
+
+class PlacesSearchResource(Resource):
+    @api.expect(search_parser)
+    @marshal_with(api, place_search_dto, as_list=True, envelope='data')
+    def get(self):
+        """Search places by name and description, including their translations"""
+        args = search_parser.parse_args()
+        if not (1 <= args['limit'] <= 50):
+            api.abort(400, 'Limit must be between 1 and 50.')
+
+        try:
+            matches = search_places(args['q'], args['limit'])
+            if not matches:
+                return [], 200
+
+            language_id = select(Language.id).where(Language.name == args['lang']).scalar_subquery()
+            rows = db.session.query(Place, PlaceTranslation).outerjoin(
+                PlaceTranslation,
+                and_(PlaceTranslation.place_id == Place.id, PlaceTranslation.language_id == language_id)
+            ).filter(Place.id.in_([place_id for place_id, _ in matches]))
+            found = {place.id: (place, translation) for place, translation in rows}
+
+            result = []
+            for place_id, score in matches:
+                if place_id not in found:
+                    continue
+                place, translation = found[place_id]
+                place.score = round(score, 4)
+                place.translated_name = translation.translated_name if translation else None
+                place.translated_description = translation.translated_description if translation else None
+                result.append(place)
+            return result, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error searching places: %s', str(e))
+            return {'message': 'Failed to search places. Please try again.'}, 500
+
+
+class PlaceAvailabilityResource(Resource):
+    @api.expect(availability_parser)
+    @marshal_with(api, availability_dto, envelope='data')
+    def get(self, place_id):
+        """Check when a place is free within a time range"""
+        args = availability_parser.parse_args()
+        start = naive_utc(args['start']) if args['start'] else datetime.utcnow().replace(microsecond=0)
+        end = naive_utc(args['end']) if args['end'] else start + timedelta(days=7)
+        if end <= start:
+            api.abort(400, 'End must be after start')
+        if end - start > MAX_RANGE:
+            api.abort(400, f'Range cannot be longer than {MAX_RANGE.days} days')
+
+        try:
+            if not db.session.get(Place, place_id):
+                api.abort(404, 'Place not found')
+            return {
+                'start': start,
+                'end': end,
+                'free': is_available('place', place_id, start, end),
+                'slots': [slot._asdict() for slot in free_slots('place', place_id, start, end)]
+            }, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error fetching place availability: %s', str(e))
+            api.abort(500, 'Failed to fetch place availability. Please try again later.')
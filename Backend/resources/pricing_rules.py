@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, PricingRule
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('pricing_rules', description='Operations related to pricing rules')
@@ -26,6 +28,8 @@ create_pricing_rule_dto = api.model('CreatePricingRule', {
     'end_date': fields.String(required=True, description='End date of the pricing rule')
 })
 
+pricing_rule_page_dto = page_model(api, pricing_rule_dto)
+
 def format_pricing_rule(rule):
     """Helper function to format a PricingRule object into a dictionary."""
     return {
@@ -41,12 +45,13 @@ def format_pricing_rule(rule):
 class PricingRulesResource(Resource):
     @log_user_activity('view_pricing_rules')
     @jwt_required()
-    @api.marshal_list_with(pricing_rule_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, pricing_rule_page_dto)
     def get(self):
-        """Fetch all pricing rules."""
+        """Fetch a page of pricing rules."""
         try:
-            rules = PricingRule.query.all()
-            return rules, 200
+            page = paginate(PricingRule.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching pricing rules: %s', str(e))
             return {'message': 'Error fetching rules. Please try again.'}, 500
@@ -77,7 +82,7 @@ class PricingRulesResource(Resource):
 class PricingRuleResource(Resource):
     @log_user_activity('view_pricing_rule')
     @jwt_required()
-    @api.marshal_with(pricing_rule_dto, envelope='data')
+    @marshal_with(api, pricing_rule_dto, envelope='data')
     def get(self, rule_id):
         """Fetch a specific pricing rule by ID."""
         try:
@@ -1,9 +1,13 @@
+from decimal import Decimal
 from flask import current_app as app
 from flask_restx import Resource, Namespace, fields
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, Promotion
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
+from services.promotion_codes import validate_code
 
 # Namespace
 api = Namespace('promotions', description='Operations related to promotions')
@@ -24,6 +28,23 @@ create_promotion_dto = api.model('CreatePromotion', {
     'valid_to': fields.String(required=True, description='End date of the promotion')
 })
 
+promotion_page_dto = page_model(api, promotion_dto)
+
+promotion_validation_dto = api.model('PromotionValidation', {
+    'code': fields.String(description='The checked promotion code'),
+    'valid': fields.Boolean(description='Whether the code can be used'),
+    'reason': fields.String(description='Why the code cannot be used'),
+    'discount_type': fields.String(description='percentage or fixed_amount'),
+    'value': fields.Float(description='Discount percentage or amount'),
+    'min_purchase_amount': fields.Float(description='Smallest purchase the code applies to'),
+    'place_id': fields.Integer(description='Place the code is limited to, if any')
+})
+
+validation_parser = api.parser()
+validation_parser.add_argument('code', type=str, required=True, location='args', help='Promotion code to check')
+validation_parser.add_argument('place_id', type=int, location='args', help='Place the code would be used for')
+validation_parser.add_argument('amount', type=float, location='args', help='Purchase amount the code would be used for')
+
 def format_promotion(promotion):
     """Helper function to format a Promotion object into a dictionary."""
     return {
@@ -38,12 +59,13 @@ def format_promotion(promotion):
 class PromotionsResource(Resource):
     @log_user_activity('view_promotions')
     @jwt_required()
-    @api.marshal_list_with(promotion_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, promotion_page_dto)
     def get(self):
-        """Fetch all promotions."""
+        """Fetch a page of promotions."""
         try:
-            promotions = Promotion.query.all()
-            return promotions, 200
+            page = paginate(Promotion.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching promotions: %s', str(e))
             return {'message': 'Error fetching promotions. Please try again.'}, 500
@@ -73,7 +95,7 @@ class PromotionsResource(Resource):
 class PromotionResource(Resource):
     @log_user_activity('view_promotion')
     @jwt_required()
-    @api.marshal_with(promotion_dto, envelope='data')
+    @marshal_with(api, promotion_dto, envelope='data')
     def get(self, promo_id):
         """Fetch a specific promotion by ID."""
         try:
@@ -119,3 +141,29 @@ class PromotionResource(Resource):
         except SQLAlchemyError as e:
             app.logger.error('Error deleting promotion: %s', str(e))
             return {'message': 'Failed to delete promotion. Please try again.'}, 500
+
+
+class PromotionValidationResource(Resource):
+    @jwt_required()
+    @api.expect(validation_parser)
+    @marshal_with(api, promotion_validation_dto, envelope='data')
+    def get(self):
+        """Check whether a promotion code can be used, without querying the promotions table."""
+        args = validation_parser.parse_args()
+        amount = Decimal(str(args['amount'])) if args['amount'] is not None else None
+        try:
+            promotion, place_id, reason = validate_code(args['code'], args['place_id'], amount)
+        except SQLAlchemyError as e:
+            app.logger.error('Error validating promotion code: %s', str(e))
+            api.abort(500, 'Error validating promotion code. Please try again.')
+        if promotion is None:
+            return {'code': args['code'], 'valid': False, 'reason': reason}, 200
+        return {
+            'code': promotion.code,
+            'valid': reason is None,
+            'reason': reason,
+            'discount_type': promotion.discount_type,
+            'value': promotion.value,
+            'min_purchase_amount': promotion.min_purchase,
+            'place_id': place_id
+        }, 200
@@ -0,0 +1,105 @@
+from flask import current_app as app
+from flask_restx import Resource, Namespace, fields, inputs
+from sqlalchemy.exc import SQLAlchemyError
+from serialization import marshal_with
+from services.availability import naive_utc, parse_booking_date
+from services.pricing import quote, quote_many
+
+# Namespace
+api = Namespace('quotes', description='Operations related to price quotes')
+
+# Most (place, date) pairs priced in one batch request
+MAX_BATCH_SIZE = 100
+
+# DTO Definitions
+quote_adjustment_dto = api.model('QuoteAdjustment', {
+    'source': fields.String(description='What changed the price: pricing_rule or promotion'),
+    'id': fields.Integer(description='ID of the pricing rule or promotion'),
+    'type': fields.String(description='Rule type or promotion discount type'),
+    'modifier': fields.Float(description='Multiplier, discount percentage or fixed discount applied'),
+    'amount': fields.Float(description='Change of the price caused by this adjustment')
+})
+
+quote_dto = api.model('Quote', {
+    'place_id': fields.Integer(description='ID of the quoted place'),
+    'booking_date': fields.String(description='Start of the quoted booking'),
+    'base_price': fields.Float(description='Default price of the place'),
+    'adjustments': fields.List(fields.Nested(quote_adjustment_dto), description='Applied rules and promotion, in order'),
+    'total': fields.Float(description='Price to pay'),
+    'quoted_at': fields.String(description='When the quote was made')
+})
+
+quote_request_dto = api.model('QuoteRequest', {
+    'place_id': fields.Integer(required=True, description='ID of the place to quote'),
+    'booking_date': fields.String(required=True, description='Start of the booking (ISO 8601)'),
+    'promotion_code': fields.String(description='Promotion code to apply')
+})
+
+batch_quote_request_dto = api.model('BatchQuoteRequest', {
+    'items': fields.List(fields.Nested(quote_request_dto), required=True, description=f'Up to {MAX_BATCH_SIZE} bookings to quote')
+})
+
+batch_quote_item_dto = api.model('BatchQuoteItem', {
+    'quote': fields.Nested(quote_dto, allow_null=True, description='The quote, if the booking could be priced'),
+    'error': fields.String(description='Why the booking could not be priced')
+})
+
+quote_parser = api.parser()
+quote_parser.add_argument('date', type=inputs.datetime_from_iso8601, required=True, location='args', help='Start of the booking (ISO 8601)')
+quote_parser.add_argument('promotion_code', type=str, location='args', help='Promotion code to apply')
+
+
+class PlaceQuoteResource(Resource):
+    @api.expect(quote_parser)
+    @marshal_with(api, quote_dto, envelope='data')
+    def get(self, place_id):
+        """Quote the price of booking a place"""
+        args = quote_parser.parse_args()
+        try:
+            return quote(place_id, naive_utc(args['date']), args['promotion_code']), 200
+        except LookupError as e:
+            api.abort(404, str(e))
+        except ValueError as e:
+            api.abort(400, str(e))
+        except SQLAlchemyError as e:
+            app.logger.error('Error quoting place: %s', str(e))
+            api.abort(500, 'Failed to quote place. Please try again later.')
+
+
+class QuotesBatchResource(Resource):
+    @api.expect(batch_quote_request_dto)
+    @marshal_with(api, batch_quote_item_dto, envelope='data')
+    def post(self):
+        """Quote the prices of many bookings at once"""
+        items = (api.payload or {}).get('items')
+        if not isinstance(items, list):
+            api.abort(400, 'Items must be a list of bookings to quote')
+        if len(items) > MAX_BATCH_SIZE:
+            api.abort(400, f'Cannot quote more than {MAX_BATCH_SIZE} bookings at once')
+
+        requests, errors = [], {}
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get('place_id'), int):
+                errors[i] = 'Each item needs a place_id and a booking_date.'
+                continue
+            try:
+                requests.append((item['place_id'], parse_booking_date(item.get('booking_date')), item.get('promotion_code')))
+            except (TypeError, ValueError):
+                errors[i] = 'Booking date must be an ISO 8601 date and time.'
+        try:
+            quotes = iter(quote_many(requests))
+        except SQLAlchemyError as e:
+            app.logger.error('Error quoting places: %s', str(e))
+            api.abort(500, 'Failed to quote places. Please try again later.')
+
+        results = []
+        for i in range(len(items)):
+            if i in errors:
+                results.append({'quote': None, 'error': errors[i]})
+                continue
+            result = next(quotes)
+            if isinstance(result, Exception):
+                results.append({'quote': None, 'error': str(result)})
+            else:
+                results.append({'quote': result, 'error': None})
+        return results, 200
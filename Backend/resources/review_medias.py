@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, ReviewMedia
 from utils import log_user_activity
+from pagination import paginate, link_header, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('review_medias', description='Operations related to review media')
@@ -26,12 +28,13 @@ create_review_media_model = api.model('CreateReviewMedia', {
 class ReviewMediasResource(Resource):
     @log_user_activity('view_review_medias')
     @jwt_required()
-    @api.marshal_with(review_media_model, as_list=True)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, review_media_model, as_list=True)
     def get(self):
-        """Get all review media."""
+        """Get a page of review media."""
         try:
-            medias = ReviewMedia.query.all()
-            return medias, 200
+            page = paginate(ReviewMedia.query)
+            return page.items, 200, link_header(page)
         except SQLAlchemyError as e:
             app.logger.error('Error fetching review medias: %s', str(e))
             api.abort(500, 'Error fetching review media. Please try again.')
@@ -39,7 +42,7 @@ class ReviewMediasResource(Resource):
     @log_user_activity('create_review_media')
     @jwt_required()
     @api.expect(create_review_media_model, validate=True)
-    @api.marshal_with(review_media_model, code=201)
+    @marshal_with(api, review_media_model, code=201)
     def post(self):
         """Create a new review media."""
         data = api.payload
@@ -59,7 +62,7 @@ class ReviewMediasResource(Resource):
 
 class ReviewMediaResource(Resource):
     @jwt_required()
-    @api.marshal_with(review_media_model)
+    @marshal_with(api, review_media_model)
     def get(self, media_id):
         """Get a specific review media by its ID."""
         try:
@@ -71,7 +74,7 @@ class ReviewMediaResource(Resource):
 
     @jwt_required()
     @api.expect(create_review_media_model, validate=True)
-    @api.marshal_with(review_media_model)
+    @marshal_with(api, review_media_model)
     def put(self, media_id):
         """Update a review media."""
         data = api.payload
@@ -1,22 +1,34 @@
 from flask import current_app as app
-from flask_restx import Resource, Namespace, fields
+from flask_restx import Resource, Namespace, fields, inputs
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import joinedload, noload, selectinload
 from flask_jwt_extended import jwt_required
 from models import db, Review, Place, User
-from utils import log_user_activity
+from utils import log_user_activity, load_profile
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from cache import invalidate_on_commit
+from serialization import marshal_with
+from services.ratings import record_review_change
 from datetime import datetime
 
 # Namespace
 api = Namespace('reviews', description='Operations related to reviews')
 
 # DTO Definitions
+review_media_dto = api.model('ReviewMediaSummary', {
+    'id': fields.Integer(description='Unique ID of the media'),
+    'media_type': fields.String(description='Type of the media (image or video)'),
+    'media_url': fields.String(description='URL of the media')
+})
+
 review_dto = api.model('Review', {
     'id': fields.Integer(description='Unique ID of the review'),
     'place_id': fields.Integer(required=True, description='ID of the place being reviewed'),
     'user_id': fields.Integer(required=True, description='ID of the user who posted the review'),
     'rating': fields.Float(required=True, description='Rating of the place (1-5)'),
     'comment': fields.String(required=True, description='User comment on the place'),
-    'publish_date': fields.DateTime(description='Date and time the review was published')
+    'publish_date': fields.DateTime(description='Date and time the review was published'),
+    'media': fields.List(fields.Nested(review_media_dto), description='Photos and videos attached to the review')
 })
 
 create_review_dto = api.model('CreateReview', {
@@ -26,16 +38,33 @@ create_review_dto = api.model('CreateReview', {
     'comment': fields.String(required=True, description='User comment about the place')
 })
 
+place_review_dto = api.inherit('PlaceReview', review_dto, {
+    'username': fields.String(attribute='user.username', description='Username of the reviewer')
+})
+
+review_page_dto = page_model(api, review_dto)
+place_review_page_dto = page_model(api, place_review_dto)
+
+# Query parameters for the review feed of a place
+place_reviews_parser = api.parser()
+place_reviews_parser.add_argument('media', type=inputs.boolean, default=True, location='args',
+                                  help='Include review media, loaded with one query per page. When false, `media` is empty.')
+
+# Reviews change the rating and aggregates of their place
+invalidate_on_commit(Review, 'places', 'place:{place_id}')
+
 
 class ReviewsResource(Resource):
     @log_user_activity('view_reviews')
     @jwt_required()
-    @api.marshal_list_with(review_dto, envelope='data')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, review_page_dto)
+    @load_profile('review_detail')
     def get(self):
-        """Fetch all reviews"""
+        """Fetch a page of reviews"""
         try:
-            reviews = Review.query.all()
-            return reviews, 200
+            page = paginate(Review.query)
+            return {'data': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching reviews: %s', str(e))
             return {'message': 'Error fetching reviews'}, 500
@@ -67,6 +96,7 @@ class ReviewsResource(Resource):
                 publish_date=data.get('publish_date', datetime.utcnow())
             )
             db.session.add(new_review)
+            record_review_change(new_review.place_id, new_rating=new_review.rating, published_at=new_review.publish_date)
             db.session.commit()
             return {'message': 'Review created successfully', 'data': {'id': new_review.id}}, 201
         except IntegrityError as e:
@@ -78,9 +108,37 @@ class ReviewsResource(Resource):
             return {'message': 'Error creating review'}, 500
 
 
+class PlaceReviewsResource(Resource):
+    @api.doc(params=PAGINATION_PARAMS)
+    @api.expect(place_reviews_parser)
+    @marshal_with(api, place_review_page_dto)
+    def get(self, place_id):
+        """Fetch a page of a place's reviews, newest first"""
+        args = place_reviews_parser.parse_args()
+        try:
+            if not db.session.get(Place, place_id):
+                api.abort(404, 'Place not found')
+            # Served by ix_reviews_place_id_publish_date_id; rows without a date cannot be paged by it
+            query = Review.query.filter(Review.place_id == place_id, Review.publish_date.isnot(None)).options(
+                joinedload(Review.user),
+                selectinload(Review.media) if args['media'] else noload(Review.media)
+            )
+            page = paginate(query, sort_column=Review.publish_date, descending=True)
+            return {'data': page.items, 'next': page.next}, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error fetching place reviews: %s', str(e))
+            api.abort(500, 'Error fetching reviews')
+
+
+def lock_review(review_id):
+    """Load a review and lock its row until the transaction ends, or abort with 404."""
+    return Review.query.filter_by(id=review_id).populate_existing().with_for_update().first_or_404()
+
+
 class ReviewResource(Resource):
     @jwt_required()
-    @api.marshal_with(review_dto, envelope='data')
+    @marshal_with(api, review_dto, envelope='data')
+    @load_profile('review_detail')
     def get(self, review_id):
         """Fetch a specific review"""
         try:
@@ -100,9 +158,11 @@ class ReviewResource(Resource):
             return {'message': 'Rating must be between 1 and 5'}, 400
 
         try:
-            review = Review.query.get_or_404(review_id)
+            # Locked, so a concurrent edit or delete cannot apply its delta from the same old rating
+            review = lock_review(review_id)
 
-            if 'rating' in data:
+            if 'rating' in data and data['rating'] != review.rating:
+                record_review_change(review.place_id, old_rating=review.rating, new_rating=data['rating'])
                 review.rating = data['rating']
             if 'comment' in data:
                 review.comment = data['comment']
@@ -121,8 +181,12 @@ class ReviewResource(Resource):
     def delete(self, review_id):
         """Delete a specific review"""
         try:
-            review = Review.query.get_or_404(review_id)
+            # Once locked, the row is there until this transaction deletes it, so a concurrent
+            # delete waits and then finds nothing instead of removing the rating a second time
+            review = lock_review(review_id)
             db.session.delete(review)
+            db.session.flush()
+            record_review_change(review.place_id, old_rating=review.rating)
             db.session.commit()
             return {'message': 'Review deleted successfully'}, 200
         except SQLAlchemyError as e:
@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, RouteSegment
 from utils import log_user_activity
+from pagination import paginate, link_header, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('route_segments', description='Operations related to route segments')
@@ -28,12 +30,13 @@ create_route_segment_model = api.model('CreateRouteSegment', {
 class RouteSegmentsResource(Resource):
     @log_user_activity('view_route_segments')
     @jwt_required()
-    @api.marshal_with(route_segment_model, as_list=True)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, route_segment_model, as_list=True)
     def get(self):
-        """Get all route segments."""
+        """Get a page of route segments."""
         try:
-            segments = RouteSegment.query.all()
-            return segments, 200
+            page = paginate(RouteSegment.query)
+            return page.items, 200, link_header(page)
         except SQLAlchemyError as e:
             app.logger.error('Error fetching route segments: %s', str(e))
             api.abort(500, 'Error fetching route segments. Please try again.')
@@ -41,7 +44,7 @@ class RouteSegmentsResource(Resource):
     @log_user_activity('create_route_segment')
     @jwt_required()
     @api.expect(create_route_segment_model, validate=True)
-    @api.marshal_with(route_segment_model, code=201)
+    @marshal_with(api, route_segment_model, code=201)
     def post(self):
         """Create a new route segment."""
         data = api.payload
@@ -62,7 +65,7 @@ class RouteSegmentsResource(Resource):
 
 class RouteSegmentResource(Resource):
     @jwt_required()
-    @api.marshal_with(route_segment_model)
+    @marshal_with(api, route_segment_model)
     def get(self, segment_id):
         """Get a specific route segment by its ID."""
         try:
@@ -74,7 +77,7 @@ class RouteSegmentResource(Resource):
 
     @jwt_required()
     @api.expect(create_route_segment_model, validate=True)
-    @api.marshal_with(route_segment_model)
+    @marshal_with(api, route_segment_model)
     def put(self, segment_id):
         """Update a route segment."""
         data = api.payload
@@ -0,0 +1,105 @@
+from flask import current_app as app
+from flask_restx import Resource, Namespace, fields
+from sqlalchemy.exc import SQLAlchemyError
+from serialization import marshal_with
+from services.routing import plan_route, OPTIMIZE_WEIGHTS, TRANSPORT_MODES
+from services.travel_matrix import travel_matrix, METRIC_FILES
+
+# Namespace
+api = Namespace('routes', description='Operations related to route planning')
+
+# DTO Definitions
+route_leg_dto = api.model('RouteLeg', {
+    'origin_place_id': fields.Integer(attribute='origin', description='ID of the place the leg starts at'),
+    'destination_place_id': fields.Integer(attribute='destination', description='ID of the place the leg ends at'),
+    'transportation_id': fields.Integer(description='ID of the transportation the leg belongs to'),
+    'segment_id': fields.Integer(description='ID of the route segment, null for a transportation without segments'),
+    'transport_mode': fields.String(attribute='mode', description='Mode of transport'),
+    'duration_minutes': fields.Integer(attribute='duration', description='Duration of the leg in minutes'),
+    'distance_km': fields.Float(attribute='distance', description='Distance of the leg in kilometres'),
+    'cost': fields.Float(description='Cost of the leg, its share of the transportation cost')
+})
+
+route_plan_dto = api.model('RoutePlan', {
+    'from': fields.Integer(description='ID of the starting place'),
+    'to': fields.Integer(description='ID of the destination place'),
+    'optimize': fields.String(description='What the itinerary minimises'),
+    'duration_minutes': fields.Integer(description='Total duration, null if a leg has none'),
+    'distance_km': fields.Float(description='Total distance, null if a leg has none'),
+    'cost': fields.Float(description='Total cost, null if a leg has none'),
+    'legs': fields.List(fields.Nested(route_leg_dto), description='Legs of the itinerary, in order')
+})
+
+route_matrix_dto = api.model('RouteMatrix', {
+    'places': fields.List(fields.Integer, description='IDs of the places, in row and column order'),
+    'metric': fields.String(description='time (minutes) or cost'),
+    'matrix': fields.Raw(description='Rows of the shortest travel time or cost from the row place to the column place, null if unknown'),
+    'missing': fields.List(fields.Integer, description='Places not covered by the precomputed matrix')
+})
+
+# Most places one matrix request may ask for
+MAX_MATRIX_PLACES = 100
+
+# Query parameters for route planning
+plan_parser = api.parser()
+plan_parser.add_argument('from', type=int, required=True, location='args', help='ID of the starting place')
+plan_parser.add_argument('to', type=int, required=True, location='args', help='ID of the destination place')
+plan_parser.add_argument('optimize', type=str, default='time', choices=tuple(OPTIMIZE_WEIGHTS), location='args', help='Minimise total time, cost or distance')
+plan_parser.add_argument('modes', type=str, location='args', help=f'Comma separated transport modes to use ({", ".join(TRANSPORT_MODES)}), all by default')
+
+
+class RoutePlanResource(Resource):
+    @api.expect(plan_parser)
+    @marshal_with(api, route_plan_dto, envelope='data')
+    def get(self):
+        """Plan the best multi-leg itinerary between two places"""
+        args = plan_parser.parse_args()
+        modes = None
+        if args['modes']:
+            modes = {mode.strip() for mode in args['modes'].split(',') if mode.strip()}
+            unknown = modes - set(TRANSPORT_MODES)
+            if unknown:
+                api.abort(400, f'Unknown transport modes: {", ".join(sorted(unknown))}')
+
+        try:
+            itinerary = plan_route(args['from'], args['to'], args['optimize'], modes)
+        except SQLAlchemyError as e:
+            app.logger.error('Error planning route: %s', str(e))
+            api.abort(500, 'Failed to plan route. Please try again later.')
+        if itinerary is None:
+            api.abort(404, 'No route found between these places')
+        return {
+            'from': args['from'],
+            'to': args['to'],
+            'optimize': args['optimize'],
+            'duration_minutes': itinerary.duration,
+            'distance_km': itinerary.distance,
+            'cost': itinerary.cost,
+            'legs': [leg._asdict() for leg in itinerary.legs]
+        }, 200
+
+# Query parameters for travel matrices
+matrix_parser = api.parser()
+matrix_parser.add_argument('places', type=str, required=True, location='args', help=f'Comma separated place IDs, at most {MAX_MATRIX_PLACES}')
+matrix_parser.add_argument('metric', type=str, default='time', choices=tuple(METRIC_FILES), location='args', help='Travel time in minutes or cost')
+
+
+class RouteMatrixResource(Resource):
+    @api.expect(matrix_parser)
+    @marshal_with(api, route_matrix_dto, envelope='data')
+    def get(self):
+        """Fetch precomputed travel times or costs between many places"""
+        args = matrix_parser.parse_args()
+        try:
+            place_ids = list(dict.fromkeys(int(place_id) for place_id in args['places'].split(',') if place_id.strip()))
+        except ValueError:
+            api.abort(400, 'Places must be a comma separated list of IDs')
+        if not place_ids or len(place_ids) > MAX_MATRIX_PLACES:
+            api.abort(400, f'Between 1 and {MAX_MATRIX_PLACES} places are required')
+
+        try:
+            matrix, missing = travel_matrix.lookup(place_ids, args['metric'])
+        except OSError as e:
+            app.logger.error('Error reading travel matrix: %s', str(e))
+            api.abort(500, 'Failed to fetch travel matrix. Please try again later.')
+        return {'places': place_ids, 'metric': args['metric'], 'matrix': matrix, 'missing': missing}, 200
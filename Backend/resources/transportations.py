@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, Transportation
 from utils import log_user_activity
+from pagination import paginate, link_header, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('transportations', description='Operations related to transportations')
@@ -26,12 +28,13 @@ create_transportation_model = api.model('CreateTransportation', {
 class TransportationsResource(Resource):
     @log_user_activity('view_transportations')
     @jwt_required()
-    @api.marshal_with(transportation_model, as_list=True)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, transportation_model, as_list=True)
     def get(self):
-        """Get all transportations."""
+        """Get a page of transportations."""
         try:
-            transportations = Transportation.query.all()
-            return transportations, 200
+            page = paginate(Transportation.query)
+            return page.items, 200, link_header(page)
         except SQLAlchemyError as e:
             app.logger.error('Error fetching transportations: %s', str(e))
             api.abort(500, 'Error fetching transportations. Please try again.')
@@ -39,7 +42,7 @@ class TransportationsResource(Resource):
     @log_user_activity('create_transportation')
     @jwt_required()
     @api.expect(create_transportation_model, validate=True)
-    @api.marshal_with(transportation_model, code=201)
+    @marshal_with(api, transportation_model, code=201)
     def post(self):
         """Create a new transportation."""
         data = api.payload
@@ -59,7 +62,7 @@ class TransportationsResource(Resource):
 
 class TransportationResource(Resource):
     @jwt_required()
-    @api.marshal_with(transportation_model)
+    @marshal_with(api, transportation_model)
     def get(self, transportation_id):
         """Get a specific transportation by its ID."""
         try:
@@ -71,7 +74,7 @@ class TransportationResource(Resource):
 
     @jwt_required()
     @api.expect(create_transportation_model, validate=True)
-    @api.marshal_with(transportation_model)
+    @marshal_with(api, transportation_model)
     def put(self, transportation_id):
         """Update a transportation."""
         data = api.payload
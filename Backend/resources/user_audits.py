@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, UserAudit, User
 from utils import log_user_activity
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('user_audits', description='User audit related operations')
@@ -23,16 +25,19 @@ audit_create_dto = api.model('CreateUserAudit', {
     'changed_data': fields.String(required=True, description='Details of the data that changed')
 })
 
+audit_page_dto = page_model(api, audit_dto, envelope='audits')
+
 
 class UserAuditsResource(Resource):
     @log_user_activity('fetch_audits')
     @jwt_required()
-    @api.marshal_list_with(audit_dto, envelope='audits')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, audit_page_dto)
     def get(self):
-        """Fetch all user audits"""
+        """Fetch a page of user audits"""
         try:
-            audits = UserAudit.query.all()
-            return audits, 200
+            page = paginate(UserAudit.query)
+            return {'audits': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching user audits: %s', str(e))
             return {'message': 'An error occurred while fetching audits.'}, 500
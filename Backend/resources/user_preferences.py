@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, UserPreference
 from utils import log_user_activity
+from pagination import paginate, link_header, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('user_preferences', description='Operations related to user preferences')
@@ -26,12 +28,13 @@ create_user_preference_model = api.model('CreateUserPreference', {
 class UserPreferencesResource(Resource):
     @log_user_activity('view_user_preferences')
     @jwt_required()
-    @api.marshal_with(user_preference_model, as_list=True)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, user_preference_model, as_list=True)
     def get(self):
-        """Get all user preferences."""
+        """Get a page of user preferences."""
         try:
-            preferences = UserPreference.query.all()
-            return preferences, 200
+            page = paginate(UserPreference.query)
+            return page.items, 200, link_header(page)
         except SQLAlchemyError as e:
             app.logger.error('Error fetching user preferences: %s', str(e))
             api.abort(500, 'Error fetching preferences. Please try again.')
@@ -39,7 +42,7 @@ class UserPreferencesResource(Resource):
     @log_user_activity('create_user_preference')
     @jwt_required()
     @api.expect(create_user_preference_model, validate=True)
-    @api.marshal_with(user_preference_model, code=201)
+    @marshal_with(api, user_preference_model, code=201)
     def post(self):
         """Create a new user preference."""
         data = api.payload
@@ -59,7 +62,7 @@ class UserPreferencesResource(Resource):
 
 class UserPreferenceResource(Resource):
     @jwt_required()
-    @api.marshal_with(user_preference_model)
+    @marshal_with(api, user_preference_model)
     def get(self, preference_id):
         """Get a specific user preference by its ID."""
         try:
@@ -71,7 +74,7 @@ class UserPreferenceResource(Resource):
 
     @jwt_required()
     @api.expect(create_user_preference_model, validate=True)
-    @api.marshal_with(user_preference_model)
+    @marshal_with(api, user_preference_model)
     def put(self, preference_id):
         """Update a user preference."""
         data = api.payload
@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required
 from models import db, UserSession
 from utils import log_user_activity
+from pagination import paginate, link_header, PAGINATION_PARAMS
+from serialization import marshal_with
 
 # Namespace
 api = Namespace('user_sessions', description='Operations related to user sessions')
@@ -26,12 +28,13 @@ create_user_session_model = api.model('CreateUserSession', {
 class UserSessionsResource(Resource):
     @log_user_activity('view_user_sessions')
     @jwt_required()
-    @api.marshal_with(user_session_model, as_list=True)
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, user_session_model, as_list=True)
     def get(self):
-        """Get all user sessions."""
+        """Get a page of user sessions."""
         try:
-            sessions = UserSession.query.all()
-            return sessions, 200
+            page = paginate(UserSession.query)
+            return page.items, 200, link_header(page)
         except SQLAlchemyError as e:
             app.logger.error('Error fetching user sessions: %s', str(e))
             api.abort(500, 'Error fetching sessions. Please try again.')
@@ -39,7 +42,7 @@ class UserSessionsResource(Resource):
     @log_user_activity('create_user_session')
     @jwt_required()
     @api.expect(create_user_session_model, validate=True)
-    @api.marshal_with(user_session_model, code=201)
+    @marshal_with(api, user_session_model, code=201)
     def post(self):
         """Create a new user session."""
         data = api.payload
@@ -59,7 +62,7 @@ class UserSessionsResource(Resource):
 
 class UserSessionResource(Resource):
     @jwt_required()
-    @api.marshal_with(user_session_model)
+    @marshal_with(api, user_session_model)
     def get(self, session_id):
         """Get a specific user session by its ID."""
         try:
@@ -71,7 +74,7 @@ class UserSessionResource(Resource):
 
     @jwt_required()
     @api.expect(create_user_session_model, validate=True)
-    @api.marshal_with(user_session_model)
+    @marshal_with(api, user_session_model)
     def put(self, session_id):
         """Update a user session."""
         data = api.payload
@@ -3,8 +3,12 @@ from flask_restx import Resource, fields, Namespace
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.security import generate_password_hash
 from flask_jwt_extended import jwt_required
-from models import User, db, UserPreference, UserAudit
-from utils import log_user_activity
+from models import User, db, UserPreference, UserAudit, Place, Booking, Review
+from utils import log_user_activity, load_profile
+from cache import cached_response, invalidate_on_commit
+from pagination import paginate, page_model, PAGINATION_PARAMS
+from serialization import marshal_with
+from services.recommendations import recommender
 import os
 
 # Namespace
@@ -37,16 +41,42 @@ user_create_dto = api.model('CreateUser', {
     'preferences': fields.Nested(user_preferences_dto, description='User preferences', allow_null=True)
 })
 
+user_page_dto = page_model(api, user_dto, envelope='users')
+
+recommended_place_dto = api.model('RecommendedPlace', {
+    'id': fields.Integer(description='Unique ID of the place'),
+    'name': fields.String(description='Name of the place'),
+    'city': fields.String(description='City of the place'),
+    'rating': fields.Float(description='Rating of the place'),
+    'entertainment_type_id': fields.Integer(description='Entertainment type ID linked to the place'),
+    'category_id': fields.Integer(description='Category ID linked to the place'),
+    'default_price': fields.Float(description='Default price for the place'),
+    'images': fields.List(fields.String, description='List of image URLs for the place'),
+    'score': fields.Float(description='How well the place matches the user, higher is better')
+})
+
+# Query parameters for the recommendations
+recommendations_parser = api.parser()
+recommendations_parser.add_argument('limit', type=int, default=20, location='args', help='Maximum number of places (max 50)')
+
+# A user's recommendations change with their profile and history, and with the places themselves
+invalidate_on_commit(User, 'user:{id}:recommendations')
+invalidate_on_commit(UserPreference, 'user:{user_id}:recommendations')
+invalidate_on_commit(Booking, 'user:{user_id}:recommendations')
+invalidate_on_commit(Review, 'user:{user_id}:recommendations')
+
 
 class UsersResource(Resource):
     @log_user_activity('fetch_users')
     @jwt_required()
-    @api.marshal_list_with(user_dto, envelope='users')
+    @api.doc(params=PAGINATION_PARAMS)
+    @marshal_with(api, user_page_dto)
+    @load_profile('user_detail')
     def get(self):
-        """Fetch all users"""
+        """Fetch a page of users"""
         try:
-            users = User.query.all()
-            return users, 200
+            page = paginate(User.query)
+            return {'users': page.items, 'next': page.next}, 200
         except SQLAlchemyError as e:
             app.logger.error('Error fetching users: %s', str(e))
             return {'message': 'An error occurred while fetching users.'}, 500
@@ -99,7 +129,8 @@ class UsersResource(Resource):
 
 class UserResource(Resource):
     @jwt_required()
-    @api.marshal_with(user_dto)
+    @marshal_with(api, user_dto)
+    @load_profile('user_detail')
     def get(self, user_id):
         """Fetch a user by ID"""
         try:
@@ -179,3 +210,31 @@ class UserResource(Resource):
         except SQLAlchemyError as e:
             app.logger.error('Error deleting user: %s', str(e))
             return {'message': 'An error occurred while deleting the user.'}, 500
+
+
+class UserRecommendationsResource(Resource):
+    @jwt_required()
+    @api.expect(recommendations_parser)
+    @cached_response('user:{user_id}:recommendations', 'places', params=(recommendations_parser,))
+    @marshal_with(api, recommended_place_dto, as_list=True, envelope='data')
+    def get(self, user_id):
+        """Recommend places to a user from their preferences, favourites, bookings and reviews"""
+        args = recommendations_parser.parse_args()
+        if not (1 <= args['limit'] <= 50):
+            api.abort(400, 'Limit must be between 1 and 50.')
+
+        try:
+            if db.session.get(User, user_id) is None:
+                api.abort(404, 'User not found.')
+            recommendations = recommender.recommend(user_id, args['limit'])
+            places = {place.id: place for place in Place.query.filter(Place.id.in_([place_id for place_id, _ in recommendations]))}
+            result = []
+            for place_id, score in recommendations:
+                place = places.get(place_id)
+                if place is not None:
+                    place.score = round(score, 4)
+                    result.append(place)
+            return result, 200
+        except SQLAlchemyError as e:
+            app.logger.error('Error fetching recommendations: %s', str(e))
+            api.abort(500, 'An error occurred while fetching recommendations.')
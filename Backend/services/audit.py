@@ -0,0 +1,120 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import insert
+from models import db, UserAudit
+
+MAX_QUEUED_EVENTS = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+# How long a request waits for room in a full queue before writing its event itself
+ENQUEUE_TIMEOUT = 0.05
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Background writer for user audit events.
+
+    Requests only put events on a bounded in-process queue. A writer thread
+    collects them into batches and stores each batch with one multi-row
+    INSERT on its own connection, once BATCH_SIZE events are waiting or
+    FLUSH_INTERVAL seconds have passed. Pending events are written when the
+    process exits.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self._thread = None
+        self._pid = None
+        self._app = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def record(self, user_id, action, changed_data=None):
+        """Queue an audit event for the current user action."""
+        self._ensure_started()
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'changed_data': changed_data,
+            'action_timestamp': datetime.now(timezone.utc)
+        }
+        try:
+            self._queue.put(event, timeout=ENQUEUE_TIMEOUT)
+        except queue.Full:
+            current_app.logger.warning('Audit queue is full, writing audit event synchronously')
+            self._write([event])
+
+    def shutdown(self, timeout=10):
+        """Stop the writer thread after it has written every queued event, waiting at most `timeout` seconds."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        try:
+            # Wakes the writer right away; a full queue keeps it busy and checking the flag anyway
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._app = current_app._get_current_object()
+            # A forked process inherits the queue object but not the thread
+            self._queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                try:
+                    event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            if batch:
+                self._write(batch)
+            stopping = stopping or self._stopping.is_set()
+        # Drain whatever was queued behind the stop marker
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(remaining), BATCH_SIZE):
+            self._write([event for event in remaining[start:start + BATCH_SIZE] if event is not _STOP])
+
+    def _write(self, batch):
+        if not batch:
+            return
+        with self._app.app_context():
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(UserAudit).values(batch))
+            except Exception:
+                # Whatever went wrong, the writer lives on to write the next batches
+                self._app.logger.exception('Failed to write %d audit events', len(batch))
+
+
+audit_writer = AuditLogWriter()
@@ -0,0 +1,318 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from cache import redis_client
+from db import use_primary
+from models import db, Availability, Booking
+from services.sync import on_commit
+
+# Bookings only store their start; each one holds its place and driver for this long
+BOOKING_DURATION = timedelta(hours=1)
+# Longest range the free slots can be listed for in one call
+MAX_RANGE = timedelta(days=31)
+
+# Redis counter bumped on writes to the windows or bookings of an entity, by type and id
+VERSION_KEY = 'availability:version:{}:{}'
+
+Slot = namedtuple('Slot', ['start', 'end'])
+
+_AFTER_ANY_ID = float('inf')
+
+
+class EntitySchedule:
+    """Opening windows and booking starts of one place or driver, kept sorted."""
+
+    def __init__(self):
+        self.windows = {}
+        # Union of the windows as disjoint intervals, sorted by start
+        self.open_starts = []
+        self.open_ends = []
+        # (start, booking_id) pairs sorted by start
+        self.bookings = []
+
+    def set_window(self, availability_id, start, end):
+        if start is None or end is None or end <= start:
+            self.windows.pop(availability_id, None)
+        else:
+            self.windows[availability_id] = (start, end)
+        self._merge_windows()
+
+    def remove_window(self, availability_id):
+        if self.windows.pop(availability_id, None) is not None:
+            self._merge_windows()
+
+    def _merge_windows(self):
+        starts, ends = [], []
+        for start, end in sorted(self.windows.values()):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.open_starts, self.open_ends = starts, ends
+
+    def is_open(self, start, end):
+        """Check that [start, end) lies within one opening window."""
+        if not self.windows:
+            return True
+        i = bisect_right(self.open_starts, start) - 1
+        return i >= 0 and self.open_ends[i] >= end
+
+    def booked(self, start, end, exclude=None):
+        """Return the `(start, booking_id)` pairs of bookings overlapping [start, end)."""
+        first = bisect_right(self.bookings, (start - BOOKING_DURATION, _AFTER_ANY_ID))
+        last = bisect_left(self.bookings, (end,))
+        return [booking for booking in self.bookings[first:last] if booking[1] != exclude]
+
+    def free_slots(self, start, end):
+        """Return the free [start, end) intervals within the given range."""
+        if self.windows:
+            first = max(bisect_right(self.open_starts, start) - 1, 0)
+            last = bisect_left(self.open_starts, end)
+            open_slots = [
+                (max(s, start), min(e, end))
+                for s, e in zip(self.open_starts[first:last], self.open_ends[first:last])
+                if e > start
+            ]
+        else:
+            open_slots = [(start, end)]
+
+        slots = []
+        busy = [(booked, booked + BOOKING_DURATION) for booked, _ in self.booked(start, end)]
+        for slot_start, slot_end in open_slots:
+            for busy_start, busy_end in busy:
+                if busy_end <= slot_start or busy_start >= slot_end:
+                    continue
+                if busy_start > slot_start:
+                    slots.append(Slot(slot_start, busy_start))
+                slot_start = max(slot_start, busy_end)
+                if slot_start >= slot_end:
+                    break
+            if slot_start < slot_end:
+                slots.append(Slot(slot_start, slot_end))
+        return slots
+
+
+class AvailabilityIndex:
+    """
+    Per-process cache of when places and drivers are open and booked.
+
+    Each place and driver has an EntitySchedule of sorted arrays, so checking
+    a time range or listing free slots is a few binary searches over that one
+    entity's data instead of a range scan over the availabilities and
+    bookings tables. Entities without any availability rows are always open.
+
+    Each schedule is stored with the Redis version of its entity. Commits
+    that touch an entity's availabilities or bookings bump that version, so
+    every process reloads the entity on its next lookup.
+    """
+
+    def __init__(self):
+        self._schedules = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, key):
+        """Return the up-to-date schedule of a `(entity_type, entity_id)` key."""
+        return self.schedules([key])[key]
+
+    def schedules(self, keys):
+        """
+        Return the up-to-date schedules of many `(entity_type, entity_id)` keys, by key.
+
+        Their versions are read in one round trip, and the stale schedules
+        of each entity type are loaded together.
+        """
+        keys = list(dict.fromkeys(keys))
+        versions = self._versions(keys)
+        result, stale = {}, {}
+        with self._lock:
+            for key in keys:
+                cached = self._schedules.get(key)
+                if cached is not None and versions is not None and cached[0] == versions[key]:
+                    result[key] = cached[1]
+                else:
+                    stale.setdefault(key[0], []).append(key[1])
+        for entity_type, entity_ids in stale.items():
+            loaded = _load_schedules(entity_type, entity_ids)
+            with self._lock:
+                for entity_id, schedule in loaded.items():
+                    key = (entity_type, entity_id)
+                    if versions is not None:
+                        self._schedules[key] = (versions[key], schedule)
+                    result[key] = schedule
+        return result
+
+    def invalidate(self, keys):
+        """Make every process reload the schedules of the given keys."""
+        with self._lock:
+            for key in keys:
+                self._schedules.pop(key, None)
+        try:
+            with redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(VERSION_KEY.format(*key))
+                pipe.execute()
+        except RedisError as e:
+            current_app.logger.error('Failed to invalidate availability schedules: %s', str(e))
+
+    def _versions(self, keys):
+        # Read before loading, so a write committed meanwhile leaves the schedule stale, never a newer version.
+        # Wrapped so that a counter nobody has bumped yet is still a version.
+        if not keys:
+            return {}
+        try:
+            values = redis_client.mget([VERSION_KEY.format(*key) for key in keys])
+        except RedisError as e:
+            current_app.logger.warning('Availability versions unavailable, loading schedules uncached: %s', str(e))
+            return None
+        return {key: (value,) for key, value in zip(keys, values)}
+
+    def is_free(self, key, start, end, exclude_booking=None):
+        """Check whether the entity is open and unbooked for all of [start, end)."""
+        schedule = self.schedule(key)
+        return schedule.is_open(start, end) and not schedule.booked(start, end, exclude_booking)
+
+    def is_open(self, key, start, end):
+        """Check whether [start, end) lies within one of the entity's opening windows."""
+        return self.schedule(key).is_open(start, end)
+
+    def booking_count(self, key, start, end):
+        """Count the bookings of the entity overlapping [start, end)."""
+        return len(self.schedule(key).booked(start, end))
+
+    def free_slots(self, key, start, end):
+        """List the free intervals of the entity within [start, end)."""
+        return self.schedule(key).free_slots(start, end)
+
+
+def naive_utc(value):
+    """Convert a datetime to the naive UTC form the DateTime columns store."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_booking_date(value):
+    """Parse an ISO 8601 booking date, raising ValueError when it is not one."""
+    if isinstance(value, datetime):
+        return naive_utc(value)
+    return naive_utc(datetime.fromisoformat(value))
+
+
+def _booking_keys(record):
+    keys = []
+    if record.get('place_id') is not None:
+        keys.append(('place', record['place_id']))
+    if record.get('driver_id') is not None:
+        keys.append(('driver', record['driver_id']))
+    return keys
+
+
+availability_index = AvailabilityIndex()
+
+
+@use_primary()
+def _load_schedules(entity_type, entity_ids):
+    """Build the schedules of places or drivers from the database, by id."""
+    schedules = {entity_id: EntitySchedule() for entity_id in entity_ids}
+    # Place windows may name their place in either column
+    owner = db.func.coalesce(Availability.place_id, Availability.entity_id) if entity_type == 'place' else Availability.entity_id
+    windows = db.session.execute(select(
+        owner, Availability.id, Availability.availability_start, Availability.availability_end
+    ).where(Availability.entity_type == entity_type, owner.in_(schedules)))
+    for entity_id, availability_id, start, end in windows:
+        schedules[entity_id].set_window(availability_id, start, end)
+    booked = Booking.place_id if entity_type == 'place' else Booking.driver_id
+    bookings = {entity_id: [] for entity_id in schedules}
+    for entity_id, booking_date, booking_id in db.session.execute(select(booked, Booking.booking_date, Booking.id).where(
+            booked.in_(schedules), Booking.status != 'cancelled', Booking.booking_date.is_not(None))):
+        bookings[entity_id].append((booking_date, booking_id))
+    for entity_id, schedule in schedules.items():
+        schedule.bookings = sorted(bookings[entity_id])
+    return schedules
+
+
+def schedules(entity_type, entity_ids):
+    """Return the schedules of many places or drivers at once, by id."""
+    loaded = availability_index.schedules((entity_type, entity_id) for entity_id in entity_ids)
+    return {entity_id: schedule for (_, entity_id), schedule in loaded.items()}
+
+
+def is_available(entity_type, entity_id, start, end, exclude_booking=None):
+    """Check whether a place or driver is free for all of [start, end)."""
+    return availability_index.is_free((entity_type, entity_id), start, end, exclude_booking)
+
+
+def is_open(entity_type, entity_id, start, end):
+    """Check whether a place or driver is open for all of [start, end), bookings aside."""
+    return availability_index.is_open((entity_type, entity_id), start, end)
+
+
+def booking_count(entity_type, entity_id, start, end):
+    """Count the bookings of a place or driver overlapping [start, end)."""
+    return availability_index.booking_count((entity_type, entity_id), start, end)
+
+
+def free_slots(entity_type, entity_id, start, end):
+    """List the free intervals of a place or driver within [start, end)."""
+    return availability_index.free_slots((entity_type, entity_id), start, end)
+
+
+def has_conflicting_booking(start, place_id=None, driver_id=None, exclude_booking=None):
+    """
+    Confirm against the database that no booking overlaps one starting at `start`.
+
+    The booking endpoints decide with this check rather than the index, which
+    only learns of another process's bookings once they are committed. It
+    is a locking read, so it sees bookings committed after the transaction's
+    snapshot was taken.
+    """
+    entities = []
+    if place_id is not None:
+        entities.append(Booking.place_id == place_id)
+    if driver_id is not None:
+        entities.append(Booking.driver_id == driver_id)
+    if not entities:
+        return False
+    query = select(Booking.id).where(
+        db.or_(*entities),
+        Booking.status != 'cancelled',
+        Booking.booking_date > start - BOOKING_DURATION,
+        Booking.booking_date < start + BOOKING_DURATION
+    )
+    if exclude_booking is not None:
+        query = query.where(Booking.id != exclude_booking)
+    return db.session.execute(query.limit(1).with_for_update(read=True)).first() is not None
+
+
+def _window_keys(record):
+    entity_type = record.get('entity_type')
+    entity_id = record.get('place_id') if entity_type == 'place' else None
+    if entity_id is None:
+        entity_id = record.get('entity_id')
+    if entity_type not in ('place', 'driver') or entity_id is None:
+        return []
+    return [(entity_type, entity_id)]
+
+
+@on_commit(Availability, previous=True)
+def _invalidate_windows(changes):
+    # An updated row may have moved to another entity, which changes both
+    keys = set()
+    for values, _, previous in changes:
+        keys.update(_window_keys(values), _window_keys({**values, **previous}))
+    if keys:
+        availability_index.invalidate(keys)
+
+
+@on_commit(Booking, previous=True)
+def _invalidate_bookings(changes):
+    keys = set()
+    for values, _, previous in changes:
+        keys.update(_booking_keys(values), _booking_keys({**values, **previous}))
+    if keys:
+        availability_index.invalidate(keys)
@@ -0,0 +1,107 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from functools import wraps
+from types import MappingProxyType
+from flask import request
+from flask_restx.utils import unpack
+from models import Currency
+from services.reference import reference_data
+
+MONEY = Decimal('0.01')
+
+CURRENCY_PARAM = {'currency': 'Currency code to convert prices to, e.g. EUR (defaults to the stored currency)'}
+
+# Exchange rates are per unit of the default currency, the one prices are stored in
+RateTable = namedtuple('RateTable', ['base', 'rates'])
+
+# (reference snapshot, rate table built from it)
+_table = (None, None)
+
+
+def rate_table():
+    """
+    Return the exchange rates of the current reference snapshot, by currency code.
+
+    The table is built once per snapshot, so it changes only when a currency
+    write makes every process reload the reference data.
+    """
+    global _table
+    snapshot = reference_data.snapshot()
+    built_from, table = _table
+    if built_from is not snapshot:
+        currencies = snapshot.tables[Currency].values()
+        rates = {
+            currency.currency_code.upper(): Decimal(str(currency.exchange_rate))
+            for currency in currencies if currency.exchange_rate
+        }
+        base = next((currency.currency_code.upper() for currency in currencies if currency.is_default), None)
+        table = RateTable(base, MappingProxyType(rates))
+        _table = (snapshot, table)
+    return table
+
+
+def conversion_factor(to_code, from_code=None):
+    """
+    Return the Decimal factor from one currency to another, the default one if omitted.
+
+    Raises KeyError for codes without an exchange rate.
+    """
+    table = rate_table()
+    to_rate = table.rates[to_code.upper()]
+    from_code = from_code or table.base
+    from_rate = table.rates[from_code.upper()] if from_code else Decimal(1)
+    return to_rate / from_rate
+
+
+def convert_amounts(amounts, to_code, from_code=None):
+    """
+    Convert a batch of amounts in one pass, keeping None as None.
+
+    The factor is looked up once for the whole batch and each amount is
+    converted with Decimal arithmetic and rounded half up to cents, so floats
+    never leak rounding errors into prices. Raises KeyError for unknown codes.
+    """
+    factor = conversion_factor(to_code, from_code)
+    with localcontext() as context:
+        context.rounding = ROUND_HALF_UP
+        return [
+            None if amount is None else (Decimal(str(amount)) * factor).quantize(MONEY)
+            for amount in amounts
+        ]
+
+
+def convert_currency(*field_names, envelope='data'):
+    """
+    Convert the given fields of a marshalled page to the `?currency=` code.
+
+    Apply it above the marshalling decorator. Every field of every item is
+    converted in a single batch, and the response gains a `currency` key.
+    Without the parameter the response is left untouched.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            code = request.args.get('currency')
+            if not code:
+                return func(*args, **kwargs)
+            try:
+                conversion_factor(code)
+            except KeyError:
+                return {'message': f'Unknown currency {code}.'}, 400
+
+            data, status, headers = unpack(func(*args, **kwargs))
+            if status != 200:
+                return data, status, headers
+            items = data[envelope]
+            # Fields left out by `?fields=` stay out
+            names = [name for name in field_names if items and name in items[0]]
+            amounts = [item.get(name) for item in items for name in names]
+            converted = iter(convert_amounts(amounts, code))
+            for item in items:
+                for name in names:
+                    amount = next(converted)
+                    item[name] = None if amount is None else float(amount)
+            data['currency'] = code.upper()
+            return data, status, headers
+        return wrapper
+    return decorator
@@ -0,0 +1,353 @@
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from db import use_primary
+from models import db, Assignment, Booking, Driver, UserPreference
+from services.availability import is_available, has_conflicting_booking, naive_utc, schedules, BOOKING_DURATION
+from services.geo import haversine_km, place_point
+from services import geo
+from services.sync import on_commit
+from services.versions import SharedVersion
+
+# Costs added to a driver's score, lower is better
+LANGUAGE_MISMATCH_COST = 1.0
+# Per booking the driver already has within LOAD_HORIZON
+LOAD_COST = 0.25
+LOAD_HORIZON = timedelta(days=7)
+# Scaled from 0 at the place to 1 at MAX_DISTANCE_KM or more; drivers without a known location get half
+DISTANCE_COST = 1.0
+MAX_DISTANCE_KM = 50.0
+
+# Candidates kept per booking when matching a batch, and the most bookings one batch may hold
+BATCH_CANDIDATES = 20
+MAX_BATCH_SIZE = 200
+# Cost of pairing a booking with a driver that cannot take it
+_INFEASIBLE = 1e9
+# The driver pool is reloaded at least this often, in case a change was never announced
+POOL_MAX_AGE = 10 * 60
+
+DriverScore = namedtuple('DriverScore', ['driver_id', 'score', 'language_match', 'load', 'distance_km'])
+
+
+class DriverPool:
+    """
+    In-process pools of the available drivers, by company and by language.
+
+    Drivers are located at the place of their latest assignment. Driver and
+    assignment writes update the pools and locations as they are committed.
+    """
+
+    def __init__(self):
+        self._drivers = {}
+        self._available = set()
+        self._by_company = {}
+        self._by_language = {}
+        # Driver id -> {assignment id: (assigned_at, place_id)}
+        self._assignments = {}
+        self._assignment_drivers = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def load(self, drivers, assignments):
+        """Replace the pools with Driver and Assignment rows (as mappings)."""
+        with self._lock:
+            self._drivers, self._available, self._by_company, self._by_language = {}, set(), {}, {}
+            self._assignments, self._assignment_drivers = {}, {}
+            for values in drivers:
+                self.upsert_driver(values)
+            for values in assignments:
+                self.upsert_assignment(values)
+            self.loaded = True
+
+    def upsert_driver(self, values):
+        with self._lock:
+            record = {**self._drivers.get(values['id'], {}), **values}
+            self.remove_driver(values['id'], keep_assignments=True)
+            self._drivers[record['id']] = record
+            if record.get('status', 'available') == 'available':
+                self._available.add(record['id'])
+                self._by_company.setdefault(record.get('company_id'), set()).add(record['id'])
+                self._by_language.setdefault(record.get('language_id'), set()).add(record['id'])
+
+    def remove_driver(self, driver_id, keep_assignments=False):
+        with self._lock:
+            record = self._drivers.pop(driver_id, None)
+            if not keep_assignments:
+                self._assignments.pop(driver_id, None)
+            if record is None:
+                return
+            self._available.discard(driver_id)
+            self._by_company.get(record.get('company_id'), set()).discard(driver_id)
+            self._by_language.get(record.get('language_id'), set()).discard(driver_id)
+
+    def upsert_assignment(self, values):
+        with self._lock:
+            self.remove_assignment(values['id'])
+            driver_id, assigned_at = values.get('driver_id'), values.get('assigned_at')
+            if isinstance(assigned_at, str):
+                assigned_at = datetime.fromisoformat(assigned_at)
+            if driver_id is None or assigned_at is None:
+                return
+            # Committed rows carry the aware default, loaded ones the stored naive UTC
+            assigned_at = naive_utc(assigned_at)
+            self._assignments.setdefault(driver_id, {})[values['id']] = (assigned_at, values.get('place_id'))
+            self._assignment_drivers[values['id']] = driver_id
+
+    def remove_assignment(self, assignment_id):
+        with self._lock:
+            driver_id = self._assignment_drivers.pop(assignment_id, None)
+            if driver_id is not None:
+                self._assignments.get(driver_id, {}).pop(assignment_id, None)
+
+    def candidates(self, company_id=None):
+        """Return the ids of the available drivers, optionally of one company."""
+        with self._lock:
+            return set(self._by_company.get(company_id, ())) if company_id is not None else set(self._available)
+
+    def speaks(self, driver_id, language_id):
+        with self._lock:
+            return driver_id in self._by_language.get(language_id, ())
+
+    def location(self, driver_id):
+        """Return the place of the driver's latest assignment, or None."""
+        with self._lock:
+            assignments = self._assignments.get(driver_id)
+            return max(assignments.values(), key=lambda assignment: assignment[0])[1] if assignments else None
+
+
+driver_pool = DriverPool()
+
+
+driver_pool_version = SharedVersion('drivers', POOL_MAX_AGE)
+
+
+def _ensure_loaded():
+    # Locations are read from commit hooks, where no query can run
+    geo.ensure_loaded()
+    if driver_pool.loaded and not driver_pool_version.is_stale():
+        return
+    version = driver_pool_version.current()
+    with use_primary():
+        drivers = db.session.execute(select(Driver.id, Driver.company_id, Driver.language_id, Driver.status)).mappings()
+        assignments = db.session.execute(select(Assignment.id, Assignment.driver_id, Assignment.place_id, Assignment.assigned_at)).mappings()
+        driver_pool.load(drivers, assignments)
+    driver_pool_version.loaded(version)
+
+
+def preferred_languages(user_ids):
+    """Return the preferred language of each user that has one, by user id."""
+    rows = db.session.execute(
+        select(UserPreference.user_id, UserPreference.preferred_language)
+        .where(UserPreference.user_id.in_(set(user_ids)), UserPreference.preferred_language.isnot(None))
+        .order_by(UserPreference.id)
+    )
+    languages = {}
+    for user_id, language_id in rows:
+        languages.setdefault(user_id, language_id)
+    return languages
+
+
+def driver_schedules(company_id=None):
+    """Return the schedules of the available drivers, optionally of one company, by driver id."""
+    _ensure_loaded()
+    return schedules('driver', driver_pool.candidates(company_id))
+
+
+def score_drivers(booking, language_id=None, company_id=None, now=None, drivers=None):
+    """
+    Score every available driver free for the booking, best (lowest) first.
+
+    A driver's score adds up a language mismatch with the user, the
+    bookings they already have in the coming LOAD_HORIZON and their
+    distance to the booked place. `drivers` are the schedules of
+    `driver_schedules(company_id)`, for callers scoring many bookings.
+    """
+    if drivers is None:
+        drivers = driver_schedules(company_id)
+    now = now or datetime.utcnow()
+    start = booking.booking_date
+    target = place_point(booking.place_id)
+    scores = []
+    for driver_id, schedule in drivers.items():
+        if not schedule.is_open(start, start + BOOKING_DURATION) or schedule.booked(start, start + BOOKING_DURATION, booking.id):
+            continue
+        language_match = language_id is None or driver_pool.speaks(driver_id, language_id)
+        load = len(schedule.booked(now, now + LOAD_HORIZON))
+        location = driver_pool.location(driver_id)
+        point = place_point(location) if location is not None else None
+        distance = haversine_km(*point, *target) if point and target else None
+        score = (
+            (0 if language_match else LANGUAGE_MISMATCH_COST)
+            + LOAD_COST * load
+            + DISTANCE_COST * (min(distance / MAX_DISTANCE_KM, 1.0) if distance is not None else 0.5)
+        )
+        scores.append(DriverScore(driver_id, score, language_match, load, distance))
+    scores.sort(key=lambda candidate: (candidate.score, candidate.driver_id))
+    return scores
+
+
+def lock_drivers(*driver_ids):
+    """
+    Lock the rows of the given drivers until the transaction ends.
+
+    Rows are locked in id order, like the booking endpoints lock places, so
+    two requests can never deadlock. Returns the ids of the drivers that
+    exist and are available.
+    """
+    driver_ids = sorted(set(driver_ids))
+    return set(db.session.scalars(
+        select(Driver.id).where(Driver.id.in_(driver_ids), Driver.status == 'available').order_by(Driver.id).with_for_update()
+    ))
+
+
+def assign_driver(booking, candidates=3, company_id=None):
+    """
+    Assign the best free driver to a booking in the current transaction.
+
+    The driver already assigned to the booking is kept if they are still
+    free for it; otherwise the top candidates, optionally of one company,
+    are tried in order. All of
+    them are locked at once, in id order, and each is checked against the
+    database before being taken. Returns the driver id, or None if no
+    driver could be assigned, in which case the booking is left without one.
+    """
+    language_id = preferred_languages([booking.user_id]).get(booking.user_id)
+    driver_ids = [candidate.driver_id for candidate in score_drivers(booking, language_id, company_id)[:candidates]]
+    if booking.driver_id is not None and is_available(
+            'driver', booking.driver_id, booking.booking_date, booking.booking_date + BOOKING_DURATION, exclude_booking=booking.id):
+        driver_ids = [booking.driver_id] + [driver_id for driver_id in driver_ids if driver_id != booking.driver_id]
+    locked = lock_drivers(*driver_ids) if driver_ids else set()
+    for driver_id in driver_ids:
+        if driver_id in locked and not has_conflicting_booking(
+                booking.booking_date, driver_id=driver_id, exclude_booking=booking.id):
+            booking.driver_id = driver_id
+            return driver_id
+    booking.driver_id = None
+    return None
+
+
+def min_cost_assignment(cost):
+    """
+    Solve the assignment problem for a cost matrix with the Hungarian algorithm.
+
+    Returns the `(row, column)` pairs of a matching of minimum total cost
+    that covers every row or every column, whichever is fewer. The inner
+    loop runs over whole rows with NumPy, so it takes O(n^2) array operations.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, columns = cost.shape
+    # Potentials and the row matched to each column, all 1-based with 0 as the dummy
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    match = np.zeros(columns + 1, dtype=int)
+    way = np.zeros(columns + 1, dtype=int)
+    for row in range(1, rows + 1):
+        match[0] = row
+        column = 0
+        min_reduced = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while match[column] != 0:
+            used[column] = True
+            current_row = match[column]
+            free = ~used[1:]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+            next_column = int(np.argmin(np.where(free, min_reduced[1:], np.inf))) + 1
+            delta = min_reduced[next_column]
+            used_columns = np.flatnonzero(used)
+            u[match[used_columns]] += delta
+            v[used_columns] -= delta
+            min_reduced[1:][free] -= delta
+            column = next_column
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+    pairs = [(int(match[column]) - 1, column - 1) for column in range(1, columns + 1) if match[column]]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    return sorted(pairs)
+
+
+def dispatch_bookings(bookings, company_id=None, now=None):
+    """
+    Assign drivers to many bookings at once with a minimum total score.
+
+    Each booking keeps its BATCH_CANDIDATES best drivers, and one matching
+    over all of them replaces picking drivers booking by booking, so a
+    driver who suits several bookings goes where they fit best. A driver
+    takes at most one booking per batch, and the drivers may be limited to
+    one company. Returns `{booking_id: driver_id}` for the bookings that
+    got a driver, in the current transaction.
+    """
+    if not bookings:
+        return {}
+    now = now or datetime.utcnow()
+    languages = preferred_languages(booking.user_id for booking in bookings)
+    # Loaded once for the whole batch
+    drivers = driver_schedules(company_id)
+    candidates = [
+        {candidate.driver_id: candidate.score
+         for candidate in score_drivers(booking, languages.get(booking.user_id), now=now, drivers=drivers)[:BATCH_CANDIDATES]}
+        for booking in bookings
+    ]
+    driver_ids = sorted({driver_id for scores in candidates for driver_id in scores})
+    if not driver_ids:
+        return {}
+    columns = {driver_id: i for i, driver_id in enumerate(driver_ids)}
+    cost = np.full((len(bookings), len(driver_ids)), _INFEASIBLE)
+    for row, scores in enumerate(candidates):
+        for driver_id, score in scores.items():
+            cost[row, columns[driver_id]] = score
+
+    pairs = [(row, column) for row, column in min_cost_assignment(cost) if cost[row, column] < _INFEASIBLE]
+    assigned = {}
+    # Lock in id order, as assign_driver does, so batches and bookings cannot deadlock each other
+    for row, column in sorted(pairs, key=lambda pair: driver_ids[pair[1]]):
+        booking, driver_id = bookings[row], driver_ids[column]
+        if lock_drivers(driver_id) and not has_conflicting_booking(
+                booking.booking_date, driver_id=driver_id, exclude_booking=booking.id):
+            booking.driver_id = driver_id
+            assigned[booking.id] = driver_id
+    return assigned
+
+
+def pending_bookings(booking_ids=None, limit=MAX_BATCH_SIZE, now=None):
+    """Return upcoming, uncancelled bookings without a driver, soonest first."""
+    query = select(Booking).where(
+        Booking.driver_id.is_(None),
+        Booking.status != 'cancelled',
+        Booking.booking_date >= (now or datetime.utcnow())
+    )
+    if booking_ids:
+        query = query.where(Booking.id.in_(booking_ids))
+    return db.session.scalars(query.order_by(Booking.booking_date, Booking.id).limit(limit)).all()
+
+
+@on_commit(Driver)
+def _sync_drivers(changes):
+    if driver_pool.loaded:
+        for values, deleted in changes:
+            if deleted:
+                driver_pool.remove_driver(values.get('id'))
+            else:
+                driver_pool.upsert_driver(values)
+    driver_pool_version.bump()
+
+
+@on_commit(Assignment)
+def _sync_assignments(changes):
+    if driver_pool.loaded:
+        for values, deleted in changes:
+            if deleted:
+                driver_pool.remove_assignment(values.get('id'))
+            else:
+                driver_pool.upsert_assignment(values)
+    driver_pool_version.bump()
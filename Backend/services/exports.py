@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+import orjson
+from sqlalchemy import select
+from models import db, Booking, Payment, UserAudit
+
+# Rows fetched from the server-side cursor, and encoded, per chunk
+BATCH_SIZE = 1000
+
+# Exportable tables and the column `since` filters them on
+EXPORTS = {
+    'bookings': (Booking, Booking.updated_at),
+    'payments': (Payment, Payment.transaction_date),
+    'user_audits': (UserAudit, UserAudit.action_timestamp)
+}
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def export_columns(name):
+    """Return the columns of an export, in table order."""
+    model, _ = EXPORTS[name]
+    return list(model.__table__.columns)
+
+
+def export_rows(name, since=None):
+    """
+    Yield the rows of an export in batches, by id.
+
+    Rows are plain column tuples read through a server-side cursor,
+    BATCH_SIZE at a time, so memory stays flat however large the table is.
+    """
+    model, timestamp = EXPORTS[name]
+    query = select(*export_columns(name)).order_by(model.id)
+    if since is not None:
+        query = query.where(timestamp >= since)
+    result = db.session.execute(query.execution_options(yield_per=BATCH_SIZE))
+    yield from result.partitions()
+
+
+def encode_ndjson(keys, batches):
+    for rows in batches:
+        yield b''.join(
+            orjson.dumps(dict(zip(keys, row)), default=str, option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def encode_csv(keys, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for rows in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks into a gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+ENCODERS = {'ndjson': encode_ndjson, 'csv': encode_csv}
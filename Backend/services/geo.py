@@ -0,0 +1,153 @@
+import math
+import threading
+from db import use_primary
+from models import Place
+from services.sync import on_commit
+from services.versions import SharedVersion
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+# The index is rebuilt at least this often, in case a change was never announced
+INDEX_MAX_AGE = 10 * 60
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """
+    In-process spatial index over place coordinates.
+
+    Places are bucketed into fixed-size latitude/longitude cells, so a
+    proximity query only measures the places in the handful of cells that
+    overlap the search circle instead of every row in the table.
+    """
+
+    def __init__(self, cell_degrees=0.1):
+        self.cell_degrees = cell_degrees
+        self.columns = int(round(360 / cell_degrees))
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def _cell(self, lat, lon):
+        row = int(math.floor((lat + 90) / self.cell_degrees))
+        column = int(math.floor((lon + 180) / self.cell_degrees)) % self.columns
+        return row, column
+
+    def load(self, rows):
+        """Replace the index contents with `(place_id, latitude, longitude)` rows."""
+        cells, points = {}, {}
+        for place_id, lat, lon in rows:
+            if lat is None or lon is None:
+                continue
+            point = (float(lat), float(lon))
+            points[place_id] = point
+            cells.setdefault(self._cell(*point), {})[place_id] = point
+        with self._lock:
+            self._cells, self._points = cells, points
+            self.loaded = True
+
+    def upsert(self, place_id, lat, lon):
+        with self._lock:
+            self._discard(place_id)
+            if lat is not None and lon is not None:
+                point = (float(lat), float(lon))
+                self._points[place_id] = point
+                self._cells.setdefault(self._cell(*point), {})[place_id] = point
+
+    def remove(self, place_id):
+        with self._lock:
+            self._discard(place_id)
+
+    def _discard(self, place_id):
+        point = self._points.pop(place_id, None)
+        if point is not None:
+            cell = self._cells.get(self._cell(*point))
+            if cell is not None:
+                cell.pop(place_id, None)
+                if not cell:
+                    del self._cells[self._cell(*point)]
+
+    def point(self, place_id):
+        """Return the `(latitude, longitude)` of a place, or None."""
+        return self._points.get(place_id)
+
+    def nearby(self, lat, lon, radius_km, limit):
+        """Return up to `limit` `(place_id, distance_km)` pairs, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        min_row, min_column = self._cell(max(lat - dlat, -90), lon - dlon)
+        max_row, max_column = self._cell(min(lat + dlat, 90), lon + dlon)
+        if dlon >= 180:
+            columns = range(self.columns)
+        elif min_column <= max_column:
+            columns = range(min_column, max_column + 1)
+        else:
+            # The search box crosses the antimeridian
+            columns = [*range(min_column, self.columns), *range(max_column + 1)]
+
+        matches = []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for column in columns:
+                    for place_id, (plat, plon) in self._cells.get((row, column), {}).items():
+                        distance = haversine_km(lat, lon, plat, plon)
+                        if distance <= radius_km:
+                            matches.append((distance, place_id))
+        matches.sort()
+        return [(place_id, distance) for distance, place_id in matches[:limit]]
+
+
+place_geo_index = GeoGridIndex()
+geo_version = SharedVersion('geo', INDEX_MAX_AGE)
+
+
+def ensure_loaded():
+    """Load the index on first use in this process, and again once another process changed places."""
+    if not place_geo_index.loaded or geo_version.is_stale():
+        _load()
+
+
+@use_primary()
+def _load():
+    version = geo_version.current()
+    place_geo_index.load(Place.query.with_entities(Place.id, Place.latitude, Place.longitude)
+                         .filter(Place.latitude.isnot(None), Place.longitude.isnot(None)))
+    geo_version.loaded(version)
+
+
+def nearby_places(lat, lon, radius_km, limit):
+    """Look up the nearest places, loading the index on first use."""
+    ensure_loaded()
+    return place_geo_index.nearby(lat, lon, radius_km, limit)
+
+
+def place_point(place_id):
+    """
+    Return the `(latitude, longitude)` of a place, or None if it has no coordinates.
+
+    The index is only loaded if it never was: this also runs in commit hooks,
+    where no query can run, so callers refresh it with `ensure_loaded` first.
+    """
+    if not place_geo_index.loaded:
+        _load()
+    return place_geo_index.point(place_id)
+
+
+@on_commit(Place)
+def _sync_place_coordinates(changes):
+    if place_geo_index.loaded:
+        for values, deleted in changes:
+            if deleted:
+                place_geo_index.remove(values.get('id'))
+            elif 'latitude' in values or 'longitude' in values:
+                place_geo_index.upsert(values['id'], values.get('latitude'), values.get('longitude'))
+    geo_version.bump()
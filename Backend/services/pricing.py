@@ -0,0 +1,296 @@
+import threading
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from cache import redis_client
+from db import use_primary
+from models import db, Place, PricingRule, Promotion
+from services.sync import on_commit
+
+MONEY = Decimal('0.01')
+
+# Rules apply in this order: seasonal and dynamic multipliers, then percentage discounts
+RULE_ORDER = {'seasonal': 0, 'dynamic': 1, 'discount': 2}
+# Redis counters bumped on writes that affect a place's prices; the None one is shared by every place
+VERSION_KEY = 'pricing:version:{}'
+
+CompiledRule = namedtuple('CompiledRule', ['id', 'rule_type', 'modifier', 'start', 'end', 'conditions'])
+CompiledPromotion = namedtuple('CompiledPromotion', ['id', 'code', 'discount_type', 'value', 'min_purchase', 'start', 'end'])
+
+
+def money(value):
+    return Decimal(value).quantize(MONEY, rounding=ROUND_HALF_UP)
+
+
+def _compile_conditions(conditions):
+    """
+    Turn a rule's JSON conditions into predicates on the booking date.
+
+    Supported keys: `weekdays` (list of 0-6, Monday is 0), `hours` ([from, to)
+    hours of the day), `min_days_ahead` and `max_days_ahead` (days between
+    quoting and the booking). Raises ValueError for anything else.
+    """
+    predicates = []
+    for key, value in (conditions or {}).items():
+        if key == 'weekdays':
+            weekdays = frozenset(int(day) for day in value)
+            if not weekdays <= set(range(7)):
+                raise ValueError('weekdays must be between 0 and 6')
+            predicates.append(lambda date, now, weekdays=weekdays: date.weekday() in weekdays)
+        elif key == 'hours':
+            start, end = (int(hour) for hour in value)
+            if not 0 <= start < end <= 24:
+                raise ValueError('hours must be a [from, to) range within 0-24')
+            predicates.append(lambda date, now, start=start, end=end: start <= date.hour < end)
+        elif key == 'min_days_ahead':
+            days = int(value)
+            predicates.append(lambda date, now, days=days: (date - now).days >= days)
+        elif key == 'max_days_ahead':
+            days = int(value)
+            predicates.append(lambda date, now, days=days: (date - now).days <= days)
+        else:
+            raise ValueError(f'unsupported condition {key!r}')
+    return tuple(predicates)
+
+
+def compile_rule(rule):
+    """Validate a PricingRule row and compile it, raising ValueError if it is unusable."""
+    if rule.rule_type not in RULE_ORDER:
+        raise ValueError(f'unknown rule type {rule.rule_type!r}')
+    if rule.price_modifier is None:
+        raise ValueError('missing price modifier')
+    modifier = Decimal(str(rule.price_modifier))
+    if rule.rule_type == 'discount' and not 0 < modifier <= 100:
+        raise ValueError('discount must be a percentage between 0 and 100')
+    if rule.rule_type != 'discount' and modifier <= 0:
+        raise ValueError('price multiplier must be positive')
+    if rule.rule_start and rule.rule_end and rule.rule_end <= rule.rule_start:
+        raise ValueError('rule ends before it starts')
+    if rule.rule_conditions is not None and not isinstance(rule.rule_conditions, dict):
+        raise ValueError('conditions must be an object')
+    return CompiledRule(rule.id, rule.rule_type, modifier, rule.rule_start, rule.rule_end,
+                        _compile_conditions(rule.rule_conditions))
+
+
+def compile_promotion(promotion):
+    """Validate a Promotion row and compile it, raising ValueError if it is unusable."""
+    if promotion.discount_type not in ('percentage', 'fixed_amount') or promotion.value is None:
+        raise ValueError('missing discount')
+    value = Decimal(str(promotion.value))
+    if value <= 0 or (promotion.discount_type == 'percentage' and value > 100):
+        raise ValueError('discount out of range')
+    min_purchase = money(promotion.min_purchase_amount) if promotion.min_purchase_amount is not None else None
+    return CompiledPromotion(promotion.id, promotion.code, promotion.discount_type, value, min_purchase,
+                             promotion.start_date, promotion.end_date)
+
+
+class PriceEvaluator:
+    """The compiled, ordered pricing rules and promotions of one place."""
+
+    def __init__(self, place_id, base_price, rules, promotions):
+        self.place_id = place_id
+        self.base_price = money(base_price) if base_price is not None else None
+        self.rules = sorted(rules, key=lambda rule: (RULE_ORDER[rule.rule_type], rule.id))
+        self.promotions = {promotion.code: promotion for promotion in promotions}
+
+    def quote(self, date, promotion=None, now=None):
+        """
+        Price a booking of the place starting at `date`.
+
+        Returns the breakdown stored as a booking's pricing snapshot. Raises
+        ValueError if the place has no price or the promotion does not apply.
+        """
+        if self.base_price is None:
+            raise ValueError('Place has no price.')
+        now = now or datetime.utcnow()
+        price = self.base_price
+        adjustments = []
+        for rule in self.rules:
+            if rule.start and date < rule.start or rule.end and date >= rule.end:
+                continue
+            if not all(predicate(date, now) for predicate in rule.conditions):
+                continue
+            if rule.rule_type == 'discount':
+                new_price = money(price * (100 - rule.modifier) / 100)
+            else:
+                new_price = money(price * rule.modifier)
+            adjustments.append({
+                'source': 'pricing_rule',
+                'id': rule.id,
+                'type': rule.rule_type,
+                'modifier': str(rule.modifier),
+                'amount': str(new_price - price)
+            })
+            price = new_price
+
+        if promotion is not None:
+            if promotion.start and date.date() < promotion.start or promotion.end and date.date() > promotion.end:
+                raise ValueError('Promotion code is not valid for this date.')
+            if promotion.min_purchase is not None and price < promotion.min_purchase:
+                raise ValueError(f'Promotion code requires a minimum purchase of {promotion.min_purchase}.')
+            if promotion.discount_type == 'percentage':
+                new_price = money(price * (100 - promotion.value) / 100)
+            else:
+                new_price = max(money(price - promotion.value), Decimal('0.00'))
+            adjustments.append({
+                'source': 'promotion',
+                'id': promotion.id,
+                'type': promotion.discount_type,
+                'modifier': str(promotion.value),
+                'amount': str(new_price - price)
+            })
+            price = new_price
+
+        return {
+            'place_id': self.place_id,
+            'booking_date': date.isoformat(),
+            'base_price': str(self.base_price),
+            'adjustments': adjustments,
+            'total': str(price),
+            'quoted_at': now.isoformat()
+        }
+
+
+class PricingEngine:
+    """
+    Per-process cache of compiled price evaluators.
+
+    Each evaluator is stored with the Redis version of its place and of the
+    all-places promotions. Writes to rules, promotions or place prices bump
+    those versions, so every process recompiles on its next quote.
+    """
+
+    def __init__(self):
+        self._evaluators = {}
+        self._lock = threading.Lock()
+
+    def evaluators(self, place_ids):
+        """Return up-to-date evaluators for the given places, by place id."""
+        place_ids = list(dict.fromkeys(place_ids))
+        versions = self._versions(place_ids)
+        result, stale = {}, []
+        with self._lock:
+            for place_id in place_ids:
+                cached = self._evaluators.get(place_id)
+                if cached is not None and versions is not None and cached[0] == versions[place_id]:
+                    result[place_id] = cached[1]
+                else:
+                    stale.append(place_id)
+        if stale:
+            compiled = self._compile(stale)
+            with self._lock:
+                for place_id, evaluator in compiled.items():
+                    if versions is not None:
+                        self._evaluators[place_id] = (versions[place_id], evaluator)
+                    result[place_id] = evaluator
+        return result
+
+    def _versions(self, place_ids):
+        try:
+            values = redis_client.mget([VERSION_KEY.format(None)] + [VERSION_KEY.format(place_id) for place_id in place_ids])
+        except RedisError as e:
+            current_app.logger.warning('Pricing versions unavailable, compiling rules uncached: %s', str(e))
+            return None
+        shared = values[0]
+        return {place_id: (shared, value) for place_id, value in zip(place_ids, values[1:])}
+
+    @use_primary()
+    def _compile(self, place_ids):
+        now = datetime.utcnow()
+        prices = dict(db.session.execute(select(Place.id, Place.default_price).where(Place.id.in_(place_ids))).all())
+        rules = {place_id: [] for place_id in prices}
+        for rule in db.session.scalars(select(PricingRule).where(
+                PricingRule.place_id.in_(prices),
+                db.or_(PricingRule.rule_end.is_(None), PricingRule.rule_end > now))):
+            try:
+                rules[rule.place_id].append(compile_rule(rule))
+            except (ValueError, TypeError) as e:
+                current_app.logger.warning('Skipping invalid pricing rule %s: %s', rule.id, str(e))
+        promotions = {place_id: [] for place_id in prices}
+        for promotion in db.session.scalars(select(Promotion).where(
+                db.or_(Promotion.place_id.in_(prices), Promotion.place_id.is_(None)),
+                db.or_(Promotion.end_date.is_(None), Promotion.end_date >= now.date()))):
+            try:
+                compiled = compile_promotion(promotion)
+            except (ValueError, TypeError) as e:
+                current_app.logger.warning('Skipping invalid promotion %s: %s', promotion.id, str(e))
+                continue
+            for place_id in ([promotion.place_id] if promotion.place_id is not None else prices):
+                promotions[place_id].append(compiled)
+        return {
+            place_id: PriceEvaluator(place_id, prices[place_id], rules[place_id], promotions[place_id])
+            for place_id in prices
+        }
+
+
+pricing_engine = PricingEngine()
+
+
+def quote(place_id, date, promotion_code=None):
+    """
+    Price a booking of a place starting at `date`, with an optional promotion code.
+
+    Raises LookupError for unknown places and ValueError when the place cannot
+    be quoted or the code does not apply.
+    """
+    result = quote_many([(place_id, date, promotion_code)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def quote_many(requests):
+    """
+    Price many `(place_id, date, promotion_code)` requests at once.
+
+    Evaluators are fetched for all places together. Each result is either a
+    quote or the LookupError/ValueError that request raised.
+    """
+    evaluators = pricing_engine.evaluators(place_id for place_id, _, _ in requests)
+    now = datetime.utcnow()
+    results = []
+    for place_id, date, promotion_code in requests:
+        evaluator = evaluators.get(place_id)
+        try:
+            if evaluator is None:
+                raise LookupError('Place not found.')
+            promotion = None
+            if promotion_code:
+                promotion = evaluator.promotions.get(promotion_code)
+                if promotion is None:
+                    raise ValueError('Promotion code is not valid for this place.')
+            results.append(evaluator.quote(date, promotion, now))
+        except (LookupError, ValueError) as e:
+            results.append(e)
+    return results
+
+
+def _bump_versions(place_ids):
+    try:
+        with redis_client.pipeline(transaction=False) as pipe:
+            for place_id in place_ids:
+                pipe.incr(VERSION_KEY.format(place_id))
+            pipe.execute()
+    except RedisError as e:
+        current_app.logger.error('Failed to invalidate compiled prices: %s', str(e))
+
+
+@on_commit(PricingRule, previous=True)
+def _invalidate_rules(changes):
+    # A rule moved to another place changes the prices of both places
+    place_ids = {values.get('place_id') for values, _, _ in changes} | {previous.get('place_id') for _, _, previous in changes}
+    _bump_versions(place_ids - {None})
+
+
+@on_commit(Promotion)
+def _invalidate_promotions(changes):
+    # Promotions can apply to every place or move between places, and are rarely written
+    _bump_versions([None])
+
+
+@on_commit(Place)
+def _invalidate_prices(changes):
+    _bump_versions({values['id'] for values, _ in changes if 'default_price' in values})
@@ -0,0 +1,91 @@
+import threading
+from datetime import date
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from cache import redis_client
+from db import use_primary
+from models import db, Promotion
+from services.pricing import compile_promotion
+from services.sync import on_commit
+
+# Redis counter bumped on every promotion write, so each process reloads its snapshot
+VERSION_KEY = 'promotions:version'
+
+
+class PromotionCodes:
+    """
+    Per-process snapshot of every promotion code that is active or upcoming.
+
+    The snapshot holds all such codes, so a code missing from it is known to
+    be invalid without a query: unknown and mistyped codes are answered from
+    memory just like valid ones. The database is only read again after a
+    promotion write has bumped the Redis version.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def get(self, code):
+        """Return the compiled promotion of a code, or None if there is no such code."""
+        try:
+            version = redis_client.get(VERSION_KEY)
+        except RedisError as e:
+            current_app.logger.warning('Promotion version unavailable: %s', str(e))
+            version = self._version if self.loaded else None
+        if not self.loaded or version != self._version:
+            self._load(version)
+        return self._codes.get(code)
+
+    @use_primary()
+    def _load(self, version):
+        promotions = db.session.scalars(select(Promotion).where(
+            db.or_(Promotion.end_date.is_(None), Promotion.end_date >= date.today())
+        ))
+        codes = {}
+        for promotion in promotions:
+            try:
+                codes[promotion.code] = (compile_promotion(promotion), promotion.place_id)
+            except (ValueError, TypeError) as e:
+                current_app.logger.warning('Skipping invalid promotion %s: %s', promotion.id, str(e))
+        with self._lock:
+            self._codes, self._version, self.loaded = codes, version, True
+
+
+promotion_codes = PromotionCodes()
+
+
+def validate_code(code, place_id=None, amount=None, on=None):
+    """
+    Check a promotion code for a purchase.
+
+    Returns `(promotion, place_id, reason)`, where `reason` is None when the
+    code can be used for the given place, amount and date, and the promotion
+    is None when the code does not exist.
+    """
+    entry = promotion_codes.get(code.strip())
+    if entry is None:
+        return None, None, 'Promotion code does not exist.'
+    promotion, promotion_place_id = entry
+    on = on or date.today()
+    if promotion.start and on < promotion.start:
+        return promotion, promotion_place_id, 'Promotion has not started yet.'
+    if promotion.end and on > promotion.end:
+        return promotion, promotion_place_id, 'Promotion has expired.'
+    if place_id is not None and promotion_place_id is not None and place_id != promotion_place_id:
+        return promotion, promotion_place_id, 'Promotion code is not valid for this place.'
+    if amount is not None and promotion.min_purchase is not None and amount < promotion.min_purchase:
+        return promotion, promotion_place_id, f'Promotion code requires a minimum purchase of {promotion.min_purchase}.'
+    return promotion, promotion_place_id, None
+
+
+@on_commit(Promotion)
+def _invalidate_codes(changes):
+    promotion_codes.loaded = False
+    try:
+        redis_client.incr(VERSION_KEY)
+    except RedisError as e:
+        current_app.logger.error('Failed to invalidate promotion codes: %s', str(e))
@@ -0,0 +1,117 @@
+from sqlalchemy import case, func, select, update
+from models import db, Place, Review
+
+# Places recomputed per transaction by the repair job
+REPAIR_BATCH_SIZE = 1000
+
+STAR_RATINGS = range(1, 6)
+
+
+def rating_bucket(rating):
+    """Return the histogram bucket of a rating, rounded half up to whole stars."""
+    return min(max(int(rating + 0.5), 1), 5)
+
+
+def _histogram_column(rating):
+    return getattr(Place, f'rating_{rating_bucket(rating)}_count')
+
+
+def record_review_change(place_id, old_rating=None, new_rating=None, published_at=None):
+    """
+    Apply one review change to the place's aggregates in the current transaction.
+
+    Pass `new_rating` and `published_at` for a new review, `old_rating` for a
+    deleted one and both ratings for an edit. The change is a single relative
+    UPDATE, so concurrent reviews of the same place never lose each other's
+    counts, and it is committed together with the review itself.
+    """
+    review_count = Place.review_count + (new_rating is not None) - (old_rating is not None)
+    rating_sum = Place.rating_sum + (new_rating or 0) - (old_rating or 0)
+
+    # rating goes first: MySQL evaluates later assignments against the already updated values
+    values = [
+        (Place.rating, case((review_count > 0, rating_sum / review_count), else_=Place.rating)),
+        (Place.review_count, review_count),
+        (Place.rating_sum, rating_sum)
+    ]
+    old_column = _histogram_column(old_rating) if old_rating is not None else None
+    new_column = _histogram_column(new_rating) if new_rating is not None else None
+    if old_column is not new_column:
+        if old_column is not None:
+            values.append((old_column, old_column - 1))
+        if new_column is not None:
+            values.append((new_column, new_column + 1))
+    if published_at is not None:
+        values.append((Place.last_review_at, case(
+            (Place.last_review_at > published_at, Place.last_review_at), else_=published_at
+        )))
+    elif new_rating is None:
+        # The deleted review may have been the latest one
+        values.append((Place.last_review_at, select(func.max(Review.publish_date))
+                       .where(Review.place_id == place_id).scalar_subquery()))
+
+    db.session.execute(
+        update(Place)
+        .where(Place.id == place_id)
+        .ordered_values(*values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def repair_review_aggregates(batch_size=REPAIR_BATCH_SIZE):
+    """
+    Recompute every place's review aggregates from the reviews table.
+
+    Places are processed in id order, `batch_size` per transaction, with one
+    grouped query and one bulk UPDATE each, so the job never locks the whole
+    table. Returns the number of places processed.
+    """
+    bucket = case(
+        (Review.rating < 1.5, 1),
+        (Review.rating < 2.5, 2),
+        (Review.rating < 3.5, 3),
+        (Review.rating < 4.5, 4),
+        else_=5
+    )
+    repaired = 0
+    last_id = 0
+    while True:
+        place_ids = db.session.scalars(
+            select(Place.id).where(Place.id > last_id).order_by(Place.id).limit(batch_size)
+        ).all()
+        if not place_ids:
+            return repaired
+
+        stats = db.session.execute(
+            select(
+                Review.place_id,
+                func.count().label('review_count'),
+                func.sum(Review.rating).label('rating_sum'),
+                func.max(Review.publish_date).label('last_review_at'),
+                *[func.sum(case((bucket == stars, 1), else_=0)).label(f'rating_{stars}_count') for stars in STAR_RATINGS]
+            )
+            .where(Review.place_id.in_(place_ids))
+            .group_by(Review.place_id)
+        )
+        rows = {row.place_id: row for row in stats}
+
+        updates = []
+        for place_id in place_ids:
+            row = rows.get(place_id)
+            values = {
+                'id': place_id,
+                'review_count': row.review_count if row else 0,
+                'rating_sum': row.rating_sum if row else 0,
+                'last_review_at': row.last_review_at if row else None
+            }
+            for stars in STAR_RATINGS:
+                values[f'rating_{stars}_count'] = getattr(row, f'rating_{stars}_count') if row else 0
+            # Places without reviews keep their assigned rating
+            if row:
+                values['rating'] = row.rating_sum / row.review_count
+            updates.append(values)
+        db.session.execute(update(Place), updates)
+        db.session.commit()
+
+        repaired += len(place_ids)
+        last_id = place_ids[-1]
@@ -0,0 +1,164 @@
+import threading
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import select
+from db import use_primary
+from models import db, Place, User, UserPreference, Booking, Review
+from services.sync import on_commit
+from services.versions import SharedVersion
+
+# Place features are rebuilt after a place write, or after this long as ratings drift with reviews
+FEATURES_TTL = 10 * 60
+
+PRICE_RANGES = ('low', 'medium', 'high')
+
+# Weight of each signal in a place's score
+WEIGHTS = {
+    'entertainment_type': 3.0,
+    'location': 2.0,
+    'rating_range': 1.5,
+    'price_range': 1.5,
+    'history_entertainment_type': 2.0,
+    'history_category': 1.5,
+    'history_city': 1.0,
+    'rating': 1.0
+}
+
+# A review this good or better counts as liking the place
+LIKED_RATING = 4
+
+Recommendation = namedtuple('Recommendation', ['place_id', 'score'])
+
+
+class PlaceFeatures:
+    """
+    Column arrays of the features of every place, for vectorized scoring.
+
+    Categorical features are stored as dense codes where 0 means unknown,
+    so a user's affinities can be looked up for all places with a single
+    fancy index. Prices are bucketed into thirds of the price distribution.
+    """
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.place_ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.entertainment_types, self.entertainment_type_codes = _encode(row.entertainment_type_id for row in rows)
+        self.categories, self.category_codes = _encode(row.category_id for row in rows)
+        self.cities, self.city_codes = _encode((row.city or '').strip().lower() or None for row in rows)
+        self.ratings = np.array([row.rating or 0 for row in rows], dtype=np.float32)
+        prices = np.array([row.default_price if row.default_price is not None else np.nan for row in rows], dtype=np.float64)
+        known = prices[~np.isnan(prices)]
+        self.price_limits = np.quantile(known, [1 / 3, 2 / 3]) if known.size else np.array([np.inf, np.inf])
+        # -1 for places without a price, else the index into PRICE_RANGES
+        self.price_buckets = np.where(np.isnan(prices), -1, np.searchsorted(self.price_limits, np.nan_to_num(prices), side='right')).astype(np.int8)
+        self.positions = {int(place_id): i for i, place_id in enumerate(self.place_ids)}
+
+
+def _encode(values):
+    """Return the value -> code mapping and the code array of a categorical column."""
+    mapping = {}
+    codes = np.array([0 if value is None else mapping.setdefault(value, len(mapping) + 1) for value in values], dtype=np.int32)
+    return mapping, codes
+
+
+class Recommender:
+    """Scores every place for a user from their preferences and history."""
+
+    def __init__(self):
+        self._features = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def features(self):
+        """Return the place features, rebuilt after a place write by this or any other process."""
+        with self._lock:
+            features = self._features
+            if features is None or self._stale or features_version.is_stale():
+                version = features_version.current()
+                with use_primary():
+                    features = self._features = PlaceFeatures(db.session.execute(select(
+                        Place.id, Place.entertainment_type_id, Place.category_id, Place.city, Place.rating, Place.default_price
+                    )))
+                features_version.loaded(version)
+                self._stale = False
+        return features
+
+    def mark_stale(self):
+        self._stale = True
+
+    def recommend(self, user_id, limit=20):
+        """Return the `limit` best places for the user, excluding places they already know."""
+        features = self.features()
+        if not features.place_ids.size:
+            return []
+        profile = _user_profile(user_id)
+        scores = np.zeros(features.place_ids.size, dtype=np.float32)
+
+        preference = profile['preference']
+        if preference is not None:
+            if preference.preferred_entertainment_type is not None:
+                code = features.entertainment_types.get(preference.preferred_entertainment_type, -1)
+                scores += WEIGHTS['entertainment_type'] * (features.entertainment_type_codes == code)
+            if preference.preferred_location:
+                code = features.cities.get(preference.preferred_location.strip().lower(), -1)
+                scores += WEIGHTS['location'] * (features.city_codes == code)
+            if preference.preferred_rating_range:
+                low, high = (float(bound) for bound in preference.preferred_rating_range.split('-'))
+                scores += WEIGHTS['rating_range'] * ((features.ratings >= low) & (features.ratings <= high))
+            if preference.preferred_price_range in PRICE_RANGES:
+                bucket = PRICE_RANGES.index(preference.preferred_price_range)
+                scores += WEIGHTS['price_range'] * (features.price_buckets == bucket)
+
+        # Share of the places the user liked that have each feature value
+        known = [features.positions[place_id] for place_id in profile['liked'] if place_id in features.positions]
+        if known:
+            for weight, codes in (
+                (WEIGHTS['history_entertainment_type'], features.entertainment_type_codes),
+                (WEIGHTS['history_category'], features.category_codes),
+                (WEIGHTS['history_city'], features.city_codes)
+            ):
+                affinity = np.bincount(codes[known], minlength=codes.max() + 1).astype(np.float32) / len(known)
+                affinity[0] = 0
+                scores += weight * affinity[codes]
+        scores += WEIGHTS['rating'] * features.ratings / 5
+
+        # Places the user has already favourited, booked or reviewed are not recommended
+        seen = [features.positions[place_id] for place_id in profile['seen'] if place_id in features.positions]
+        scores[seen] = -np.inf
+
+        limit = min(limit, scores.size)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            Recommendation(int(features.place_ids[i]), float(scores[i]))
+            for i in top if np.isfinite(scores[i])
+        ]
+
+
+def _user_profile(user_id):
+    preference = db.session.scalars(
+        select(UserPreference).where(UserPreference.user_id == user_id).order_by(UserPreference.id.desc()).limit(1)
+    ).first()
+    favourites = db.session.scalar(select(User.favourite_places).where(User.id == user_id)) or []
+    favourites = {int(place_id) for place_id in favourites if isinstance(place_id, (int, str)) and str(place_id).isdigit()}
+    booked = set(db.session.scalars(
+        select(Booking.place_id).where(Booking.user_id == user_id, Booking.status != 'cancelled').distinct()
+    ))
+    reviews = db.session.execute(select(Review.place_id, Review.rating).where(Review.user_id == user_id)).all()
+    liked = favourites | booked | {place_id for place_id, rating in reviews if rating is not None and rating >= LIKED_RATING}
+    return {
+        'preference': preference,
+        'liked': liked,
+        'seen': favourites | booked | {place_id for place_id, _ in reviews}
+    }
+
+
+recommender = Recommender()
+features_version = SharedVersion('recommendations', FEATURES_TTL)
+
+
+@on_commit(Place)
+def _places_changed(changes):
+    # Features are only ever rebuilt whole, so this process's copy is stale too
+    recommender.mark_stale()
+    features_version.bump()
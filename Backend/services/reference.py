@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+from cache import redis_client
+from models import db, EntertainmentType, PlaceCategory, Language, Currency, Company
+from services.sync import on_commit
+
+# Small, rarely-changing lookup tables held in memory by every process
+REFERENCE_MODELS = (EntertainmentType, PlaceCategory, Language, Currency, Company)
+
+VERSION_KEY = 'reference:version'
+UPDATES_CHANNEL = 'reference:updates'
+
+ReferenceSnapshot = namedtuple('ReferenceSnapshot', ['version', 'tables'])
+
+# Immutable row type per model, holding its column values
+_ROW_TYPES = {
+    model: namedtuple(f'{model.__name__}Row', [attr.key for attr in inspect(model).column_attrs])
+    for model in REFERENCE_MODELS
+}
+
+
+class ReferenceData:
+    """
+    Versioned, immutable in-memory copy of the reference tables.
+
+    Readers always see a complete snapshot; a refresh builds a new one and
+    swaps it in. Writes to any reference table bump a version counter in
+    Redis and publish it, and every process reloads when it sees a newer
+    version than the one it holds.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def snapshot(self):
+        """Return the current snapshot, loading it on first use in this process."""
+        if self._listener_pid != os.getpid():
+            self._start_listener(current_app._get_current_object())
+        if self._snapshot is None:
+            self.reload()
+        return self._snapshot
+
+    def get(self, model, row_id):
+        """Return the row of `model` with the given id, or None."""
+        return self.snapshot().tables[model].get(row_id)
+
+    def all(self, model):
+        """Return every row of `model`."""
+        return tuple(self.snapshot().tables[model].values())
+
+    def exists(self, model, row_id):
+        """
+        Check that a row of `model` exists, without a query for known ids.
+
+        Ids missing from the snapshot are confirmed against the database, as
+        the row may have been created moments ago by another process.
+        """
+        if row_id is None:
+            return False
+        if self.get(model, row_id) is not None:
+            return True
+        return db.session.get(model, row_id) is not None
+
+    def reload(self, version=None):
+        """Build a fresh snapshot from the database and swap it in."""
+        if version is None:
+            version = self._current_version()
+        tables = {}
+        # A connection of its own, as this also runs right after a session commit
+        with db.engine.connect() as connection:
+            for model in REFERENCE_MODELS:
+                row_type = _ROW_TYPES[model]
+                columns = [getattr(model, field) for field in row_type._fields]
+                rows = connection.execute(select(*columns))
+                tables[model] = MappingProxyType({row.id: row_type(*row) for row in rows})
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version <= version:
+                self._snapshot = ReferenceSnapshot(version, MappingProxyType(tables))
+
+    def publish_change(self):
+        """Announce that a reference table changed so every process reloads."""
+        try:
+            version = redis_client.incr(VERSION_KEY)
+            redis_client.publish(UPDATES_CHANNEL, version)
+        except RedisError as e:
+            current_app.logger.error('Failed to publish reference data change: %s', str(e))
+            version = self._snapshot.version if self._snapshot else 0
+        self.reload(version)
+
+    def _current_version(self):
+        try:
+            return int(redis_client.get(VERSION_KEY) or 0)
+        except RedisError:
+            return 0
+
+    def _start_listener(self, app):
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, args=(app,), name='reference-data-listener', daemon=True).start()
+
+    def _listen(self, app):
+        while True:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(UPDATES_CHANNEL)
+                with app.app_context():
+                    # Catch up on changes published while we were not subscribed
+                    self._refresh(self._current_version())
+                for message in pubsub.listen():
+                    with app.app_context():
+                        self._refresh(int(message['data']))
+            except RedisError as e:
+                app.logger.warning('Reference data listener disconnected: %s', str(e))
+                time.sleep(5)
+
+    def _refresh(self, version):
+        if self._snapshot is not None and self._snapshot.version >= version:
+            return
+        try:
+            self.reload(version)
+        except SQLAlchemyError as e:
+            current_app.logger.error('Failed to reload reference data: %s', str(e))
+
+
+reference_data = ReferenceData()
+
+
+def init_app(app):
+    """Load the reference snapshot when the app starts."""
+    with app.app_context():
+        try:
+            reference_data.snapshot()
+        except SQLAlchemyError as e:
+            app.logger.warning('Reference data not loaded at startup, will load on first use: %s', str(e))
+
+
+def _publish_reference_change(changes):
+    reference_data.publish_change()
+
+
+for _model in REFERENCE_MODELS:
+    on_commit(_model)(_publish_reference_change)
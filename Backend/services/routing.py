@@ -0,0 +1,300 @@
+import heapq
+import threading
+from collections import namedtuple
+from decimal import Decimal
+from itertools import count
+from sqlalchemy import select
+from db import use_primary
+from models import db, Transportation, RouteSegment
+from services import geo
+from services.geo import haversine_km, place_point
+from services.sync import on_commit
+from services.versions import SharedVersion
+
+# The graph is rebuilt at least this often, in case a change was never announced
+GRAPH_MAX_AGE = 10 * 60
+
+TRANSPORT_MODES = ('bus', 'train', 'car', 'plane', 'boat', 'walking')
+
+# Edge attribute minimised by each `optimize` choice
+OPTIMIZE_WEIGHTS = {'time': 'duration', 'cost': 'cost', 'distance': 'distance'}
+
+# One hop of the graph: a route segment, or a whole transportation that has no segments
+Edge = namedtuple('Edge', ['origin', 'destination', 'transportation_id', 'segment_id', 'mode',
+                           'duration', 'distance', 'cost'])
+
+Itinerary = namedtuple('Itinerary', ['legs', 'duration', 'distance', 'cost'])
+
+
+class RouteGraph:
+    """
+    In-process adjacency-list graph of the transportations between places.
+
+    A transportation with segments contributes one edge per segment, and
+    its cost is shared between them by distance (evenly when distances are
+    missing); one without segments is a single edge. Writes rebuild only the
+    edges of the transportation they touch.
+    """
+
+    def __init__(self):
+        self._adjacency = {}
+        # Last indexed state of every row, and the edges built from each transportation
+        self._transportations = {}
+        self._segments = {}
+        self._edges = {}
+        # Fastest observed km per minute, which keeps the time heuristic admissible
+        self._max_speed = 0.0
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def load(self, transportations, segments):
+        """Replace the graph with Transportation and RouteSegment rows (as mappings)."""
+        with self._lock:
+            self._adjacency, self._transportations, self._segments, self._edges = {}, {}, {}, {}
+            for values in transportations:
+                self._transportations[values['id']] = dict(values)
+            for values in segments:
+                self._segments.setdefault(values['transportation_id'], {})[values['id']] = dict(values)
+            for transportation_id in self._transportations:
+                self._rebuild(transportation_id)
+            self._update_max_speed()
+            self.loaded = True
+
+    def upsert_transportation(self, values):
+        with self._lock:
+            self._transportations[values['id']] = {**self._transportations.get(values['id'], {}), **values}
+            self._changed(values['id'])
+
+    def remove_transportation(self, transportation_id):
+        with self._lock:
+            self._transportations.pop(transportation_id, None)
+            self._changed(transportation_id)
+
+    def upsert_segment(self, values):
+        with self._lock:
+            old = self._remove_segment_record(values['id'])
+            record = {**(old or {}), **values}
+            self._segments.setdefault(record.get('transportation_id'), {})[record['id']] = record
+            self._changed(record.get('transportation_id'), old and old.get('transportation_id'))
+
+    def remove_segment(self, segment_id):
+        with self._lock:
+            old = self._remove_segment_record(segment_id)
+            if old is not None:
+                self._changed(old.get('transportation_id'))
+
+    def _remove_segment_record(self, segment_id):
+        for segments in self._segments.values():
+            if segment_id in segments:
+                return segments.pop(segment_id)
+        return None
+
+    def _changed(self, *transportation_ids):
+        for transportation_id in set(transportation_ids) - {None}:
+            self._rebuild(transportation_id)
+        self._update_max_speed()
+
+    def _rebuild(self, transportation_id):
+        for edge in self._edges.pop(transportation_id, ()):
+            self._adjacency[edge.origin].remove(edge)
+        transportation = self._transportations.get(transportation_id)
+        if transportation is None:
+            return
+        edges = _build_edges(transportation, self._segments.get(transportation_id, {}).values())
+        for edge in edges:
+            self._adjacency.setdefault(edge.origin, []).append(edge)
+        self._edges[transportation_id] = edges
+
+    def _update_max_speed(self):
+        speeds = [
+            float(edge.distance) / edge.duration
+            for edges in self._edges.values() for edge in edges
+            if edge.distance is not None and edge.duration
+        ]
+        self._max_speed = max(speeds, default=0.0)
+
+    def shortest_path(self, origin, destination, optimize='time', modes=None):
+        """
+        Find the cheapest itinerary by the `optimize` weight, or None if there is none.
+
+        Searches with A*, using the great-circle distance to the destination
+        as a lower bound for distance and time, and with Dijkstra for cost.
+        Edges missing the optimised value, or not in `modes`, are skipped.
+        """
+        weight = OPTIMIZE_WEIGHTS[optimize]
+        target = place_point(destination)
+        if target is None or optimize == 'cost':
+            scale = 0.0
+        elif optimize == 'distance':
+            scale = 1.0
+        else:
+            scale = 1.0 / self._max_speed if self._max_speed else 0.0
+
+        def heuristic(place_id):
+            if not scale:
+                return 0.0
+            point = place_point(place_id)
+            return haversine_km(*point, *target) * scale if point else 0.0
+
+        with self._lock:
+            tie = count()
+            best = {origin: 0.0}
+            previous = {}
+            queue = [(heuristic(origin), 0.0, next(tie), origin)]
+            while queue:
+                _, cost, _, place_id = heapq.heappop(queue)
+                if place_id == destination:
+                    return self._itinerary(previous, origin, destination)
+                if cost > best.get(place_id, float('inf')):
+                    continue
+                for edge in self._adjacency.get(place_id, ()):
+                    value = getattr(edge, weight)
+                    if value is None or (modes and edge.mode not in modes):
+                        continue
+                    new_cost = cost + float(value)
+                    if new_cost < best.get(edge.destination, float('inf')):
+                        best[edge.destination] = new_cost
+                        previous[edge.destination] = edge
+                        heapq.heappush(queue, (new_cost + heuristic(edge.destination), new_cost, next(tie), edge.destination))
+        return None
+
+    def shortest_paths(self, origin, optimize='time'):
+        """
+        Run Dijkstra from `origin` over the whole graph.
+
+        Returns the lowest total `optimize` weight to every reachable place,
+        and the edge each place is reached by on its shortest path.
+        """
+        weight = OPTIMIZE_WEIGHTS[optimize]
+        with self._lock:
+            best = {origin: 0.0}
+            previous = {}
+            queue = [(0.0, origin)]
+            while queue:
+                cost, place_id = heapq.heappop(queue)
+                if cost > best[place_id]:
+                    continue
+                for edge in self._adjacency.get(place_id, ()):
+                    value = getattr(edge, weight)
+                    if value is None:
+                        continue
+                    new_cost = cost + float(value)
+                    if new_cost < best.get(edge.destination, float('inf')):
+                        best[edge.destination] = new_cost
+                        previous[edge.destination] = edge
+                        heapq.heappush(queue, (new_cost, edge.destination))
+        return best, previous
+
+    def edges_of(self, transportation_id):
+        """Return the current edges built from a transportation."""
+        with self._lock:
+            return list(self._edges.get(transportation_id, ()))
+
+    @staticmethod
+    def _itinerary(previous, origin, destination):
+        legs = []
+        place_id = destination
+        while place_id != origin:
+            edge = previous[place_id]
+            legs.append(edge)
+            place_id = edge.origin
+        legs.reverse()
+        return Itinerary(
+            legs=legs,
+            duration=_total(edge.duration for edge in legs),
+            distance=_total(edge.distance for edge in legs),
+            cost=_total(edge.cost for edge in legs)
+        )
+
+
+def _total(values):
+    values = list(values)
+    return None if any(value is None for value in values) else sum(values)
+
+
+def _build_edges(transportation, segments):
+    cost = transportation.get('cost')
+    segments = sorted(
+        (segment for segment in segments if segment.get('origin_place_id') is not None and segment.get('destination_place_id') is not None),
+        key=lambda segment: (segment.get('segment_order') or 0, segment['id'])
+    )
+    if not segments:
+        if transportation.get('origin_place_id') is None or transportation.get('destination_place_id') is None:
+            return []
+        origin, destination = place_point(transportation['origin_place_id']), place_point(transportation['destination_place_id'])
+        distance = Decimal(str(round(haversine_km(*origin, *destination), 2))) if origin and destination else None
+        return [Edge(
+            transportation['origin_place_id'], transportation['destination_place_id'], transportation['id'], None,
+            transportation.get('transport_type'), transportation.get('duration'), distance, cost
+        )]
+
+    distances = [segment.get('distance_km') for segment in segments]
+    if cost is None:
+        shares = [None] * len(segments)
+    elif all(distances) and sum(distances) > 0:
+        shares = [cost * distance / sum(distances) for distance in distances]
+    else:
+        shares = [Decimal(cost) / len(segments)] * len(segments)
+    return [
+        Edge(
+            segment['origin_place_id'], segment['destination_place_id'], transportation['id'], segment['id'],
+            segment.get('transport_mode'), segment.get('duration_minutes'), segment.get('distance_km'), share
+        )
+        for segment, share in zip(segments, shares)
+    ]
+
+
+route_graph = RouteGraph()
+routing_version = SharedVersion('routing', GRAPH_MAX_AGE)
+
+
+def ensure_loaded():
+    """Load the graph on first use in this process, and again once another process changed routes."""
+    # Edges read place coordinates, also from commit hooks where no query can run
+    geo.ensure_loaded()
+    if not route_graph.loaded or routing_version.is_stale():
+        reload()
+
+
+@use_primary()
+def reload():
+    """Rebuild the graph from the database."""
+    version = routing_version.current()
+    transportations = db.session.execute(select(
+        Transportation.id, Transportation.origin_place_id, Transportation.destination_place_id,
+        Transportation.transport_type, Transportation.duration, Transportation.cost
+    )).mappings()
+    segments = db.session.execute(select(
+        RouteSegment.id, RouteSegment.transportation_id, RouteSegment.origin_place_id, RouteSegment.destination_place_id,
+        RouteSegment.segment_order, RouteSegment.distance_km, RouteSegment.duration_minutes, RouteSegment.transport_mode
+    )).mappings()
+    route_graph.load(transportations, segments)
+    routing_version.loaded(version)
+
+
+def plan_route(origin, destination, optimize='time', modes=None):
+    """Find the best itinerary between two places, or None if they are not connected."""
+    ensure_loaded()
+    return route_graph.shortest_path(origin, destination, optimize, modes)
+
+
+@on_commit(Transportation)
+def _sync_transportations(changes):
+    if route_graph.loaded:
+        for values, deleted in changes:
+            if deleted:
+                route_graph.remove_transportation(values.get('id'))
+            else:
+                route_graph.upsert_transportation(values)
+    routing_version.bump()
+
+
+@on_commit(RouteSegment)
+def _sync_segments(changes):
+    if route_graph.loaded:
+        for values, deleted in changes:
+            if deleted:
+                route_graph.remove_segment(values.get('id'))
+            else:
+                route_graph.upsert_segment(values)
+    routing_version.bump()
@@ -0,0 +1,207 @@
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from db import use_primary
+from models import Place, PlaceTranslation
+from services.sync import on_commit
+from services.versions import SharedVersion
+
+# Relative weight of a term occurrence in each indexed field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.0,
+    'translated_name': 3.0,
+    'translated_description': 1.0
+}
+MAX_PREFIX_EXPANSIONS = 50
+# The index is rebuilt at least this often, in case a change was never announced
+INDEX_MAX_AGE = 10 * 60
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# Letters that NFKD leaves alone but users commonly type without the diacritic
+_LATIN_FOLD = str.maketrans({'ı': 'i', 'ə': 'e'})
+
+
+def tokenize(text):
+    """Split text into lowercase, accent-folded word tokens."""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', text.casefold().translate(_LATIN_FOLD))
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(folded)
+
+
+class PlaceSearchIndex:
+    """
+    Embedded inverted index over place names, descriptions and translations.
+
+    Each place is one document made of its own text plus all of its
+    translations. Every query term must match; the last term also matches as
+    a prefix so partially typed words find results while the user types.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._vocabulary = []
+        self._sources = defaultdict(dict)
+        self._translation_places = {}
+        self._documents = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self, places, translations):
+        """Build the index from `(id, name, description)` place rows and
+        `(id, place_id, translated_name, translated_description)` translation rows."""
+        with self._lock:
+            self._postings, self._vocabulary = defaultdict(dict), []
+            self._sources, self._documents = defaultdict(dict), {}
+            self._translation_places = {}
+            for place_id, name, description in places:
+                self._sources[place_id]['place'] = {'name': name, 'description': description}
+            for translation_id, place_id, name, description in translations:
+                self._sources[place_id][translation_id] = {'translated_name': name, 'translated_description': description}
+                self._translation_places[translation_id] = place_id
+            for place_id in list(self._sources):
+                self._index(place_id, keep_vocabulary_sorted=False)
+            # Sorted once, rather than inserting each new token in order
+            self._vocabulary = sorted(self._postings)
+            self.loaded = True
+
+    def set_place(self, place_id, fields):
+        with self._lock:
+            self._sources[place_id].setdefault('place', {}).update(fields)
+            self._reindex(place_id)
+
+    def remove_place(self, place_id):
+        with self._lock:
+            for source in self._sources.pop(place_id, {}):
+                if source != 'place':
+                    self._translation_places.pop(source, None)
+            self._reindex(place_id)
+
+    def set_translation(self, place_id, translation_id, fields):
+        with self._lock:
+            previous_place_id = self._translation_places.get(translation_id, place_id)
+            if previous_place_id != place_id:
+                fields = {**self._sources[previous_place_id].pop(translation_id, {}), **fields}
+                self._reindex(previous_place_id)
+            self._sources[place_id].setdefault(translation_id, {}).update(fields)
+            self._translation_places[translation_id] = place_id
+            self._reindex(place_id)
+
+    def remove_translation(self, translation_id):
+        with self._lock:
+            place_id = self._translation_places.pop(translation_id, None)
+            if place_id is not None:
+                self._sources[place_id].pop(translation_id, None)
+                self._reindex(place_id)
+
+    def _reindex(self, place_id):
+        for token in self._documents.pop(place_id, ()):
+            postings = self._postings[token]
+            postings.pop(place_id, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary.pop(bisect_left(self._vocabulary, token))
+        self._index(place_id)
+
+    def _index(self, place_id, keep_vocabulary_sorted=True):
+        sources = self._sources.get(place_id)
+        if not sources or 'place' not in sources:
+            # Translations are kept aside until their place itself is indexed
+            return
+
+        weights = defaultdict(float)
+        for fields in sources.values():
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    weights[token] += FIELD_WEIGHTS[field]
+        for token, weight in weights.items():
+            if keep_vocabulary_sorted and token not in self._postings:
+                self._vocabulary.insert(bisect_left(self._vocabulary, token), token)
+            self._postings[token][place_id] = weight
+        self._documents[place_id] = tuple(weights)
+
+    def _expand(self, prefix):
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query, limit):
+        """Return up to `limit` `(place_id, score)` pairs, best match first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            total = max(len(self._documents), 1)
+            scores = None
+            for position, term in enumerate(terms):
+                candidates = self._expand(term) if position == len(terms) - 1 else [term]
+                term_scores = defaultdict(float)
+                for token in candidates:
+                    postings = self._postings.get(token, {})
+                    idf = math.log(1 + total / (len(postings) or 1))
+                    # Exact word matches outrank words that merely share the prefix
+                    boost = 1.0 if token == term else 0.5
+                    for place_id, weight in postings.items():
+                        term_scores[place_id] = max(term_scores[place_id], weight * idf * boost)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {place_id: score + term_scores[place_id]
+                              for place_id, score in scores.items() if place_id in term_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+place_search_index = PlaceSearchIndex()
+search_version = SharedVersion('search', INDEX_MAX_AGE)
+
+
+def search_places(query, limit):
+    """Search place text, loading the index on first use and again once another process changed places."""
+    if not place_search_index.loaded or search_version.is_stale():
+        version = search_version.current()
+        with use_primary():
+            place_search_index.load(
+                Place.query.with_entities(Place.id, Place.name, Place.description),
+                PlaceTranslation.query.with_entities(PlaceTranslation.id, PlaceTranslation.place_id,
+                                                     PlaceTranslation.translated_name, PlaceTranslation.translated_description)
+            )
+        search_version.loaded(version)
+    return place_search_index.search(query, limit)
+
+
+@on_commit(Place)
+def _sync_places(changes):
+    if place_search_index.loaded:
+        for values, deleted in changes:
+            if deleted:
+                place_search_index.remove_place(values.get('id'))
+            else:
+                place_search_index.set_place(values['id'], {field: values[field] for field in ('name', 'description') if field in values})
+    search_version.bump()
+
+
+@on_commit(PlaceTranslation)
+def _sync_translations(changes):
+    if place_search_index.loaded:
+        for values, deleted in changes:
+            if deleted or 'place_id' not in values:
+                place_search_index.remove_translation(values.get('id'))
+            else:
+                place_search_index.set_translation(values['place_id'], values['id'], {
+                    field: values[field] for field in ('translated_name', 'translated_description') if field in values
+                })
+    search_version.bump()
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Model class -> (callback, previous) of the callbacks interested in committed writes to its rows
+_listeners = defaultdict(list)
+
+
+def on_commit(model, previous=False):
+    """
+    Register a callback that receives the committed changes to `model` rows.
+
+    The callback is called after every successful commit that inserted,
+    updated or deleted `model` rows, with a list of `(values, deleted)` pairs
+    where `values` is a dict of the row's column values captured at flush time.
+    With `previous`, it gets `(values, deleted, previous)` triples instead,
+    where `previous` holds the values the flush replaced, for callbacks that
+    must also know where an updated row used to be. Writes that are rolled
+    back are never reported.
+    """
+    def decorator(callback):
+        _listeners[model].append((callback, previous))
+        return callback
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _capture_changes(session, flush_context):
+    for obj, deleted in _changed(session):
+        model = type(obj)
+        if model in _listeners:
+            state = inspect(obj)
+            values = {attr.key: getattr(obj, attr.key, None) for attr in state.mapper.column_attrs
+                      if attr.key in obj.__dict__}
+            # The history still holds the pre-flush values until the flush ends
+            replaced = {attr.key: attr.history.deleted[0] for attr in state.attrs
+                        if attr.key in values and attr.history.deleted}
+            session.info.setdefault('committed_changes', defaultdict(list))[model].append((values, deleted, replaced))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop('committed_changes', None)
+    if not changes:
+        return
+    for model, rows in changes.items():
+        for callback, previous in _listeners[model]:
+            callback(rows if previous else [(values, deleted) for values, deleted, _ in rows])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('committed_changes', None)
+
+
+def _changed(session):
+    for obj in session.new:
+        yield obj, False
+    for obj in session.dirty:
+        yield obj, False
+    for obj in session.deleted:
+        yield obj, True
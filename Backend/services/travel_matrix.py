@@ -0,0 +1,286 @@
+import math
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+import numpy as np
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from cache import redis_client
+from models import db, Place, Transportation, RouteSegment
+from services import routing
+from services.routing import route_graph
+from services.sync import on_commit
+
+# Number of most reviewed places the matrix covers
+DEFAULT_SIZE = 500
+# The set of places is refreshed with a full rebuild this often
+REBUILD_INTERVAL = 15 * 60
+# Route writes are collected for this long before the affected rows are recomputed
+DEBOUNCE_SECONDS = 5
+# Only one process of a host builds at a time, as each host keeps its own files
+LOCK_KEY = f'travel-matrix:lock:{socket.gethostname()}'
+LOCK_TTL = 10 * 60
+CURRENT_LINK = 'current'
+KEEP_BUILDS = 3
+
+# Deletes the lock only if it still holds the given token, so an expired lock
+# another process has taken since is left alone. KEYS[1]: lock, ARGV[1]: token
+_RELEASE = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+# Matrix file of each metric; unreachable pairs are stored as infinity
+METRIC_FILES = {'time': 'duration.npy', 'cost': 'cost.npy'}
+PLACE_IDS_FILE = 'place_ids.npy'
+
+
+def matrix_dir(app=None):
+    app = app or current_app
+    return app.config.get('TRAVEL_MATRIX_DIR') or os.path.join(app.instance_path, 'travel_matrix')
+
+
+class TravelMatrix:
+    """
+    Read-only view of the latest travel matrix build, memory-mapped from disk.
+
+    Every process maps the same files, so the matrices are shared through
+    the page cache instead of being loaded into each worker. A new build is
+    picked up as soon as the `current` link points at it.
+    """
+
+    def __init__(self):
+        self._target = None
+        self._arrays = None
+        self._lock = threading.Lock()
+
+    def arrays(self):
+        """Return `(place index, {metric: matrix})` of the current build, or None if there is none."""
+        link = os.path.join(matrix_dir(), CURRENT_LINK)
+        target = os.path.realpath(link)
+        if target != self._target:
+            if not os.path.exists(os.path.join(target, PLACE_IDS_FILE)):
+                return None
+            place_ids = np.load(os.path.join(target, PLACE_IDS_FILE))
+            matrices = {
+                metric: np.load(os.path.join(target, filename), mmap_mode='r')
+                for metric, filename in METRIC_FILES.items()
+            }
+            index = {int(place_id): i for i, place_id in enumerate(place_ids)}
+            with self._lock:
+                self._target, self._arrays = target, (index, matrices)
+        return self._arrays
+
+    def lookup(self, place_ids, metric='time'):
+        """
+        Return the matrix between the given places, with None for unknown pairs.
+
+        Only the requested rows and columns are read from the mapped file.
+        Also returns the places that are not covered by the matrix.
+        """
+        result = np.full((len(place_ids), len(place_ids)), np.inf)
+        arrays = self.arrays()
+        index, matrices = arrays if arrays is not None else ({}, None)
+        requested = [i for i, place_id in enumerate(place_ids) if place_id in index]
+        if requested:
+            positions = [index[place_ids[i]] for i in requested]
+            result[np.ix_(requested, requested)] = matrices[metric][np.ix_(positions, positions)]
+        missing = [place_id for place_id in place_ids if place_id not in index]
+        return [[value if math.isfinite(value) else None for value in row] for row in result.tolist()], missing
+
+
+class MatrixBuilder:
+    """
+    Background builder of the travel time and cost matrices.
+
+    A full build runs Dijkstra from each of the most reviewed places over
+    the in-memory route graph. Route writes only mark their transportations
+    dirty; the builder then recomputes just the rows whose shortest paths
+    used one of them, or that can reach one of their new edges.
+    """
+
+    def __init__(self):
+        self._dirty = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._app = None
+        # Last build of this process: its directory, places, matrices and, per row, the
+        # places it reaches and the transportations its shortest paths use
+        self._build = None
+
+    def start(self, app):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._app = app
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='travel-matrix-builder', daemon=True).start()
+
+    def mark_dirty(self, transportation_ids):
+        with self._lock:
+            self._dirty.update(transportation_ids)
+        self._wake.set()
+
+    def _run(self):
+        # Build right away when the last build is missing or stale
+        timeout = 0
+        while True:
+            woken = self._wake.wait(timeout)
+            if woken:
+                time.sleep(DEBOUNCE_SECONDS)
+            self._wake.clear()
+            timeout = REBUILD_INTERVAL
+            with self._app.app_context():
+                if not woken and self._age() < REBUILD_INTERVAL:
+                    continue
+                try:
+                    if not self.build(full=not woken) and woken:
+                        # Another process is building; retry the incremental update after it
+                        timeout = DEBOUNCE_SECONDS
+                        self._wake.set()
+                except Exception:
+                    # Whatever went wrong, the thread lives on to build again
+                    current_app.logger.exception('Failed to build travel matrix')
+
+    @staticmethod
+    def _age():
+        try:
+            return time.time() - os.path.getmtime(os.path.realpath(os.path.join(matrix_dir(), CURRENT_LINK)))
+        except OSError:
+            return float('inf')
+
+    def build(self, full=True):
+        """
+        Build the matrices, incrementally if this process made the current build.
+
+        Returns False when another process is building.
+        """
+        token = uuid.uuid4().hex
+        try:
+            if not redis_client.set(LOCK_KEY, token, nx=True, ex=LOCK_TTL):
+                return False
+        except RedisError as e:
+            current_app.logger.warning('Travel matrix lock unavailable, building anyway: %s', str(e))
+            token = None
+        try:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            current = os.path.realpath(os.path.join(matrix_dir(), CURRENT_LINK))
+            if full or self._build is None or self._build['path'] != current:
+                # A full build replaces the shared matrix, so it is made from the database, not this process's graph
+                routing.reload()
+                self._build = self._full_build()
+            elif dirty:
+                routing.ensure_loaded()
+                self._build = self._update(self._build, dirty)
+            return True
+        finally:
+            if token is not None:
+                try:
+                    _RELEASE(keys=[LOCK_KEY], args=[token])
+                except RedisError as e:
+                    current_app.logger.warning('Failed to release travel matrix lock: %s', str(e))
+
+    def _full_build(self):
+        size = current_app.config.get('TRAVEL_MATRIX_SIZE', DEFAULT_SIZE)
+        place_ids = db.session.scalars(
+            select(Place.id).order_by(Place.review_count.desc(), Place.id).limit(size)
+        ).all()
+        build = {
+            'place_ids': np.array(place_ids, dtype=np.int64),
+            'index': {place_id: i for i, place_id in enumerate(place_ids)},
+            'matrices': {metric: np.full((len(place_ids), len(place_ids)), np.inf, dtype=np.float32) for metric in METRIC_FILES},
+            'reached': [set() for _ in place_ids],
+            'used': [set() for _ in place_ids]
+        }
+        for row in range(len(place_ids)):
+            self._compute_row(build, row)
+        build['path'] = self._write(build)
+        current_app.logger.info('Built travel matrix for %d places', len(place_ids))
+        return build
+
+    def _update(self, build, dirty):
+        # New or cheaper edges can only shorten paths from rows that reach their origin
+        origins = {edge.origin for transportation_id in dirty for edge in route_graph.edges_of(transportation_id)}
+        rows = [
+            row for row in range(len(build['place_ids']))
+            if build['used'][row] & dirty or build['reached'][row] & origins
+        ]
+        if not rows:
+            return build
+        build = {**build, 'matrices': {metric: matrix.copy() for metric, matrix in build['matrices'].items()}}
+        for row in rows:
+            self._compute_row(build, row)
+        build['path'] = self._write(build)
+        current_app.logger.info('Updated %d rows of the travel matrix', len(rows))
+        return build
+
+    @staticmethod
+    def _compute_row(build, row):
+        source = int(build['place_ids'][row])
+        reached, used = set(), set()
+        for metric, matrix in build['matrices'].items():
+            matrix[row, :] = np.inf
+            distances, previous = route_graph.shortest_paths(source, metric)
+            for place_id, distance in distances.items():
+                column = build['index'].get(place_id)
+                if column is not None:
+                    matrix[row, column] = distance
+            reached.update(distances)
+            used.update(edge.transportation_id for edge in previous.values())
+        build['reached'][row], build['used'][row] = reached, used
+
+    @staticmethod
+    def _write(build):
+        """Write the build to a new directory and atomically point the current link at it."""
+        base = matrix_dir()
+        os.makedirs(base, exist_ok=True)
+        path = os.path.join(base, str(time.time_ns()))
+        os.makedirs(path)
+        np.save(os.path.join(path, PLACE_IDS_FILE), build['place_ids'])
+        for metric, filename in METRIC_FILES.items():
+            np.save(os.path.join(path, filename), build['matrices'][metric])
+
+        link = os.path.join(base, f'{CURRENT_LINK}.{os.getpid()}')
+        os.symlink(path, link)
+        os.replace(link, os.path.join(base, CURRENT_LINK))
+
+        # Readers still mapping an old build keep its files until they unmap them
+        builds = sorted(name for name in os.listdir(base) if name.isdigit())
+        for name in builds[:-KEEP_BUILDS]:
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        return os.path.realpath(path)
+
+
+travel_matrix = TravelMatrix()
+matrix_builder = MatrixBuilder()
+
+
+def init_app(app):
+    """Start the builder thread of each serving process with its first request, so CLI commands never start it."""
+    @app.before_request
+    def _start_matrix_builder():
+        matrix_builder.start(app)
+
+
+@on_commit(Transportation)
+def _transportations_changed(changes):
+    matrix_builder.mark_dirty({values.get('id') for values, _ in changes} - {None})
+
+
+@on_commit(RouteSegment, previous=True)
+def _segments_changed(changes):
+    # A segment moved to another transportation changes the paths of both
+    transportation_ids = set()
+    for values, _, previous in changes:
+        transportation_ids.update((values.get('transportation_id'), previous.get('transportation_id')))
+    matrix_builder.mark_dirty(transportation_ids - {None})
@@ -0,0 +1,68 @@
+import threading
+import time
+from flask import current_app
+from redis.exceptions import RedisError
+from cache import redis_client
+
+# Shortest time between two checks of the shared version by one process
+CHECK_INTERVAL = 1.0
+
+
+class SharedVersion:
+    """
+    Tells a process when its copy of an in-memory index is out of date.
+
+    A process applies its own commits to its copy, then bumps a Redis
+    counter; every other process sees the counter move on its next check
+    and rebuilds. A copy older than `max_age` seconds is out of date anyway,
+    so changes that were never announced (Redis down, writes made outside
+    the ORM) are caught up with eventually.
+    """
+
+    def __init__(self, name, max_age):
+        self.key = f'index:version:{name}'
+        self.max_age = max_age
+        self._version = None
+        self._loaded_at = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Read the shared version; pass it to `loaded` once a rebuild started after reading it is done."""
+        try:
+            return int(redis_client.get(self.key) or 0)
+        except RedisError as e:
+            current_app.logger.warning('Version of %s unavailable: %s', self.key, str(e))
+            return None
+
+    def is_stale(self):
+        """Check whether the copy must be rebuilt, reading Redis at most every CHECK_INTERVAL seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at > self.max_age:
+                return True
+            if now - self._checked_at < CHECK_INTERVAL:
+                return False
+            self._checked_at = now
+        version = self.current()
+        # Without Redis, only the age of the copy tells when to rebuild
+        return version is not None and version != self._version
+
+    def loaded(self, version):
+        """Record that the copy now reflects the given version."""
+        with self._lock:
+            self._version, self._loaded_at, self._checked_at = version, time.monotonic(), time.monotonic()
+
+    def bump(self):
+        """Announce a committed change, after applying it to this process's copy."""
+        try:
+            version = redis_client.incr(self.key)
+        except RedisError as e:
+            current_app.logger.error('Failed to announce change of %s: %s', self.key, str(e))
+            return
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+            else:
+                # Another process changed it too, and this copy is missing that change
+                self._loaded_at = None
@@ -0,0 +1,89 @@
+"""
+Shared fixtures: every test gets a fresh in-memory SQLite database, an empty
+fakeredis server in place of Redis, and empty in-process indexes.
+"""
+import os
+import sys
+import fakeredis
+import pytest
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# cache.py connects when it is imported, so Redis is replaced before any app module is
+redis.Redis = fakeredis.FakeRedis
+
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token  # noqa: E402
+from flask_restx import Api  # noqa: E402
+from cache import redis_client  # noqa: E402
+from models import db, Place, User  # noqa: E402
+from serialization import output_json  # noqa: E402
+from services import dispatch, geo, recommendations, routing, search  # noqa: E402
+from services.availability import availability_index  # noqa: E402
+from services.pricing import pricing_engine  # noqa: E402
+from services.reference import reference_data  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Forget everything the previous test left in Redis and in the in-process indexes."""
+    redis_client.flushall()
+    for index in (geo.place_geo_index, search.place_search_index, routing.route_graph, dispatch.driver_pool,
+                  availability_index, pricing_engine, recommendations.recommender):
+        index.__init__()
+    reference_data.__init__()
+    # Tests refresh the reference snapshot themselves rather than through a listener thread
+    reference_data._listener_pid = os.getpid()
+    yield
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Return a factory of apps serving the given `(resource, url)` pairs over a fresh database.
+
+    Keyword arguments override the app's config.
+    """
+    def make(*resources, **config):
+        app = Flask(__name__)
+        app.config.update({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes',
+            'TRAVEL_MATRIX_DIR': str(tmp_path / 'travel_matrix'),
+            'TESTING': True,
+            **config
+        })
+        JWTManager(app)
+        db.init_app(app)
+        api = Api(app)
+        api.representation('application/json')(output_json)
+        for resource, url in resources:
+            api.add_resource(resource, url)
+        with app.app_context():
+            # Only the primary; tests with replicas create their tables themselves
+            db.create_all(bind_key=None)
+        return app
+    return make
+
+
+def add_user(user_id=1, role='user'):
+    """Add a user to the current app's database and return it."""
+    user = User(id=user_id, username=f'user{user_id}', email=f'user{user_id}@example.com', role=role)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(app, user_id=1):
+    """Return the headers of a request authenticated as the given user."""
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+
+def add_place(place_id, **columns):
+    """Add a place, with placeholder values for the columns not given, and return it."""
+    place = Place(id=place_id, **{'name': f'place{place_id}', 'city': 'Baku', 'rating': 3.0, 'images': [],
+                                  'description': 'A place', **columns})
+    db.session.add(place)
+    return place
@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+from sqlalchemy import select
+from conftest import add_user
+from models import db, UserAudit
+from services import audit
+from services.audit import AuditLogWriter
+
+
+@pytest.fixture
+def writer(make_app, monkeypatch):
+    monkeypatch.setattr(audit, 'FLUSH_INTERVAL', 0.01)
+    app = make_app()
+    with app.app_context():
+        add_user(1)
+        writer = AuditLogWriter()
+        yield writer
+        writer.shutdown()
+
+
+def written_actions():
+    db.session.rollback()
+    return sorted(db.session.scalars(select(UserAudit.action)))
+
+
+def test_queued_events_are_written_on_shutdown(writer):
+    for i in range(3):
+        writer.record(1, f'action {i}')
+    writer.shutdown()
+
+    assert not writer._thread.is_alive()
+    assert written_actions() == ['action 0', 'action 1', 'action 2']
+
+
+def test_writer_survives_unexpected_errors(writer, monkeypatch):
+    failed = threading.Event()
+    real_insert = audit.insert
+
+    def failing_insert(table):
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError('not a database error')
+        return real_insert(table)
+    monkeypatch.setattr(audit, 'insert', failing_insert)
+
+    writer.record(1, 'lost')
+    assert failed.wait(5)
+    writer.record(1, 'kept')
+    writer.shutdown()
+
+    assert written_actions() == ['kept']
+
+
+def test_shutdown_does_not_hang_on_a_full_queue(writer, monkeypatch):
+    monkeypatch.setattr(audit, 'BATCH_SIZE', 1)
+    monkeypatch.setattr(audit, 'MAX_QUEUED_EVENTS', 2)
+    writing, release = threading.Event(), threading.Event()
+
+    def blocked_write(batch):
+        writing.set()
+        release.wait(5)
+        AuditLogWriter._write(writer, batch)
+    writer._write = blocked_write
+
+    writer.record(1, 'first')
+    assert writing.wait(5)
+    writer.record(1, 'second')
+    writer.record(1, 'third')
+    assert writer._queue.full()
+
+    started = time.monotonic()
+    writer.shutdown(timeout=0.1)
+    assert time.monotonic() - started < 1
+
+    # Once unblocked the writer still writes everything that was queued
+    release.set()
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    assert written_actions() == ['first', 'second', 'third']
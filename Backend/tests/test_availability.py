@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, Availability, Booking
+from resources.places import PlaceAvailabilityResource
+from services import availability
+from services.availability import EntitySchedule, Slot, VERSION_KEY, availability_index, free_slots, is_available, is_open
+from conftest import add_place, add_user
+
+
+def at(hour, minute=0):
+    return datetime(2027, 1, 4) + timedelta(hours=hour, minutes=minute)
+
+
+@pytest.fixture
+def schedule():
+    schedule = EntitySchedule()
+    # Overlapping windows merge into 9-14, then a gap until 16
+    schedule.set_window(1, at(9), at(12))
+    schedule.set_window(2, at(11), at(14))
+    schedule.set_window(3, at(16), at(18))
+    schedule.bookings = [(at(10), 1), (at(12, 30), 2), (at(16), 3)]
+    return schedule
+
+
+def test_ranges_must_lie_within_one_merged_window(schedule):
+    assert schedule.is_open(at(9), at(14))
+    assert not schedule.is_open(at(13), at(17))
+    assert not schedule.is_open(at(8), at(10))
+    schedule.remove_window(2)
+    assert not schedule.is_open(at(11), at(13))
+    assert EntitySchedule().is_open(at(0), at(23))
+
+
+def test_bookings_hold_their_slot_for_an_hour(schedule):
+    assert schedule.booked(at(10, 59), at(11, 30)) == [(at(10), 1)]
+    # Back to back with the booking on either side
+    assert schedule.booked(at(11), at(12, 30)) == []
+    assert schedule.booked(at(9), at(10)) == []
+    assert schedule.booked(at(9), at(18), exclude=2) == [(at(10), 1), (at(16), 3)]
+
+
+def test_free_slots_are_the_windows_minus_the_bookings(schedule):
+    assert schedule.free_slots(at(8), at(20)) == [
+        Slot(at(9), at(10)), Slot(at(11), at(12, 30)), Slot(at(13, 30), at(14)), Slot(at(17), at(18))
+    ]
+    assert schedule.free_slots(at(10, 30), at(13)) == [Slot(at(11), at(12, 30))]
+    unlimited = EntitySchedule()
+    unlimited.bookings = [(at(10), 1)]
+    assert unlimited.free_slots(at(9), at(12)) == [Slot(at(9), at(10)), Slot(at(11), at(12))]
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((PlaceAvailabilityResource, '/places/<int:place_id>/availability'))
+    with app.app_context():
+        add_user(1)
+        for place_id in (1, 2):
+            add_place(place_id, default_price=10)
+        db.session.add(Availability(id=1, place_id=1, entity_type='place', availability_start=at(9), availability_end=at(17)))
+        db.session.add(Booking(id=1, user_id=1, place_id=1, booking_date=at(10), status='confirmed'))
+        db.session.commit()
+        yield app
+
+
+def test_commits_update_the_schedules_they_touch(app):
+    assert not is_available('place', 1, at(10), at(11))
+    db.session.get(Booking, 1).status = 'cancelled'
+    db.session.add(Booking(id=2, user_id=1, place_id=1, booking_date=at(15), status='confirmed'))
+    db.session.commit()
+    assert is_available('place', 1, at(10), at(11))
+    assert not is_available('place', 1, at(15, 30), at(16))
+
+    # A window moved to another place closes the first and limits the second
+    assert is_open('place', 2, at(7), at(8))
+    db.session.get(Availability, 1).place_id = 2
+    db.session.commit()
+    assert is_open('place', 1, at(7), at(8))
+    assert not is_open('place', 2, at(7), at(8))
+
+
+def test_changes_announced_by_other_processes_reload_the_schedule(app):
+    assert free_slots('place', 1, at(12), at(14)) == [Slot(at(12), at(14))]
+    # Written without the ORM, as another process's commit looks from here
+    db.session.execute(text("INSERT INTO bookings (id, user_id, place_id, booking_date, status) "
+                            "VALUES (2, 1, 1, '2027-01-04 12:00:00.000000', 'confirmed')"))
+    db.session.commit()
+    assert free_slots('place', 1, at(12), at(14)) == [Slot(at(12), at(14))]
+    redis_client.incr(VERSION_KEY.format('place', 1))
+    assert free_slots('place', 1, at(12), at(14)) == [Slot(at(13), at(14))]
+
+
+def test_stale_schedules_are_loaded_together(app, monkeypatch):
+    loads = []
+    load_schedules = availability._load_schedules
+    monkeypatch.setattr(availability, '_load_schedules', lambda *args: loads.append(args) or load_schedules(*args))
+
+    keys = [('place', 1), ('place', 2), ('driver', 1)]
+    availability_index.schedules(keys)
+    assert sorted(loads) == [('driver', [1]), ('place', [1, 2])]
+    loads.clear()
+    availability_index.schedules(keys)
+    assert loads == []
+
+
+def test_endpoint_lists_free_slots(app):
+    client = app.test_client()
+    response = client.get('/places/1/availability', query_string={'start': at(9).isoformat(), 'end': at(12).isoformat()})
+    assert response.status_code == 200
+    assert response.json['data']['free'] is False
+    assert response.json['data']['slots'] == [
+        {'start': at(9).isoformat(), 'end': at(10).isoformat()},
+        {'start': at(11).isoformat(), 'end': at(12).isoformat()}
+    ]
+
+
+@pytest.mark.parametrize('place_id, start, end, status', [
+    (1, at(12), at(11), 400),
+    (1, at(0), at(0) + timedelta(days=32), 400),
+    (3, at(9), at(10), 404)
+])
+def test_endpoint_rejects_bad_ranges_and_unknown_places(app, place_id, start, end, status):
+    query = {'start': start.isoformat(), 'end': end.isoformat()}
+    assert app.test_client().get(f'/places/{place_id}/availability', query_string=query).status_code == status
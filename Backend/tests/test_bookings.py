@@ -0,0 +1,105 @@
+import hashlib
+import json
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import OperationalError
+from cache import redis_client
+from models import db, Booking
+from resources import bookings
+from resources.bookings import BookingsResource, lock_places
+from conftest import add_place, add_user, auth_headers
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((BookingsResource, '/bookings'))
+    with app.app_context():
+        add_user(1)
+        add_user(2)
+        add_place(1, default_price=25)
+        add_place(2, default_price=40)
+        db.session.commit()
+    return app
+
+
+def book(client, user_id=1, place_id=1, date='2027-01-04T10:00:00', key=None, status='confirmed'):
+    headers = auth_headers(client.application, user_id)
+    if key is not None:
+        headers['Idempotency-Key'] = key
+    payload = {'user_id': user_id, 'place_id': place_id, 'booking_date': date, 'status': status}
+    return client.post('/bookings', json=payload, headers=headers)
+
+
+def booking_ids(app):
+    with app.app_context():
+        return db.session.scalars(select(Booking.id).order_by(Booking.id)).all()
+
+
+def test_bookings_are_priced_and_refused_for_taken_slots(app):
+    client = app.test_client()
+    response = book(client)
+    assert response.status_code == 201
+    with app.app_context():
+        booking = db.session.get(Booking, response.json['data']['id'])
+        assert (float(booking.total_cost), booking.pricing_snapshot['total']) == (25.0, '25.00')
+
+    assert book(client, user_id=2, date='2027-01-04T10:30:00').status_code == 409
+    # The slot ends when the next one starts, and other places are unaffected
+    assert book(client, user_id=2, date='2027-01-04T11:00:00').status_code == 201
+    assert book(client, user_id=2, place_id=2, date='2027-01-04T10:30:00').status_code == 201
+    # Cancelled bookings neither take nor need the slot
+    assert book(client, user_id=2, date='2027-01-04T10:30:00', status='cancelled').status_code == 201
+    assert book(client, place_id=3).status_code == 400
+
+
+def test_retries_with_the_same_key_replay_the_first_response(app):
+    client = app.test_client()
+    first = book(client, key='attempt-1')
+    retry = book(client, key='attempt-1')
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert booking_ids(app) == [first.json['data']['id']]
+
+    # Keys are per user
+    assert book(client, user_id=2, place_id=2, key='attempt-1').status_code == 201
+    assert len(booking_ids(app)) == 2
+
+
+def test_keys_reused_for_another_request_or_still_running_are_refused(app):
+    client = app.test_client()
+    assert book(client, key='attempt-1').status_code == 201
+    assert book(client, key='attempt-1', date='2027-01-05T10:00:00').status_code == 422
+
+    # A request with this key and body is still running elsewhere
+    body = json.dumps({'user_id': 1, 'place_id': 1, 'booking_date': '2027-01-06T10:00:00', 'status': 'confirmed'})
+    fingerprint = hashlib.sha256(body.encode()).hexdigest()
+    redis_client.set('idempotency:create_booking:1:attempt-2', json.dumps({'fingerprint': fingerprint}))
+    response = client.post('/bookings', data=body, content_type='application/json',
+                           headers={**auth_headers(app), 'Idempotency-Key': 'attempt-2'})
+    assert response.status_code == 409
+    assert len(booking_ids(app)) == 1
+
+
+def test_failed_attempts_release_their_key(app, monkeypatch):
+    client = app.test_client()
+
+    def fail(booking):
+        raise OperationalError('INSERT', {}, Exception('connection lost'))
+    monkeypatch.setattr(bookings, 'assign_driver', fail)
+    assert book(client, key='attempt-1').status_code == 500
+    monkeypatch.undo()
+
+    assert book(client, key='attempt-1').status_code == 201
+    assert len(booking_ids(app)) == 1
+
+
+def test_places_are_locked_in_id_order(app, monkeypatch):
+    statements = []
+    scalars = db.session.scalars
+    monkeypatch.setattr(db.session, 'scalars', lambda statement: statements.append(statement) or scalars(statement))
+    with app.app_context():
+        assert lock_places(2, 3, 1, 2) == {1, 2}
+    sql = str(statements[0].compile(dialect=mysql.dialect()))
+    assert sql.endswith('ORDER BY places.id FOR UPDATE')
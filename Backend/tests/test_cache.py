@@ -0,0 +1,73 @@
+import pytest
+from flask_restx import Resource
+from cache import cached_response, invalidate, redis_client, CACHE_TTL
+
+calls = []
+
+
+class CountedResource(Resource):
+    @cached_response('things', 'thing:{thing_id}', params=('page',))
+    def get(self, thing_id):
+        calls.append(thing_id)
+        if thing_id == 0:
+            return {'message': 'Not found'}, 404
+        if thing_id == 99:
+            # A write committed while the response was being built
+            invalidate('thing:99')
+        return {'thing': thing_id, 'calls': len(calls)}, 200
+
+
+@pytest.fixture
+def client(make_app):
+    calls.clear()
+    return make_app((CountedResource, '/things/<int:thing_id>')).test_client()
+
+
+def test_second_request_is_served_from_redis(client):
+    first = client.get('/things/1')
+    second = client.get('/things/1')
+    assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('MISS', 'HIT')
+    assert second.json == first.json
+    assert calls == [1]
+
+
+def test_invalidating_any_tag_drops_the_entry(client):
+    client.get('/things/1')
+    client.get('/things/2')
+    invalidate('thing:1')
+    assert client.get('/things/1').headers['X-Cache'] == 'MISS'
+    assert client.get('/things/2').headers['X-Cache'] == 'HIT'
+    invalidate('things')
+    assert client.get('/things/2').headers['X-Cache'] == 'MISS'
+
+
+def test_entry_built_during_an_invalidation_is_not_stored(client):
+    client.get('/things/99')
+    assert client.get('/things/99').headers['X-Cache'] == 'MISS'
+    assert calls == [99, 99]
+
+
+def test_errors_are_not_cached(client):
+    assert client.get('/things/0').status_code == 404
+    assert client.get('/things/0').status_code == 404
+    assert calls == [0, 0]
+
+
+def test_key_only_holds_known_parameters(client):
+    client.get('/things/1?page=2&junk=a')
+    assert client.get('/things/1?junk=b&page=2').headers['X-Cache'] == 'HIT'
+    assert client.get('/things/1?page=3').headers['X-Cache'] == 'MISS'
+    assert client.get('/things/1?page=2&fields=thing').headers['X-Cache'] == 'MISS'
+
+
+def test_masked_requests_bypass_the_cache(client):
+    client.get('/things/1')
+    response = client.get('/things/1', headers={'X-Fields': 'thing'})
+    assert 'X-Cache' not in response.headers
+    assert calls == [1, 1]
+
+
+def test_entries_and_tag_sets_expire(client):
+    client.get('/things/1')
+    keys = redis_client.keys('cache:response:*') + redis_client.keys('cache:keys:*')
+    assert keys and all(0 < redis_client.ttl(key) <= CACHE_TTL for key in keys)
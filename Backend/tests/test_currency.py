@@ -0,0 +1,58 @@
+from decimal import Decimal
+import pytest
+from models import db, Currency
+from resources.places import PlacesResource
+from services.currency import conversion_factor, convert_amounts, rate_table
+from conftest import add_place
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((PlacesResource, '/places'))
+    with app.app_context():
+        db.session.add_all([
+            Currency(id=1, currency_code='AZN', exchange_rate=1, is_default=True),
+            Currency(id=2, currency_code='USD', exchange_rate=0.59),
+            Currency(id=3, currency_code='eur', exchange_rate=1.5),
+            Currency(id=4, currency_code='GBP', exchange_rate=None)
+        ])
+        add_place(1, default_price=10)
+        add_place(2, default_price=0.01)
+        add_place(3, default_price=None)
+        db.session.commit()
+        yield app
+
+
+def test_factors_convert_between_any_two_rated_currencies(app):
+    assert rate_table().base == 'AZN'
+    assert conversion_factor('usd') == Decimal('0.59')
+    assert conversion_factor('EUR', 'USD') == Decimal('1.5') / Decimal('0.59')
+    for code in ('GBP', 'JPY'):
+        with pytest.raises(KeyError):
+            conversion_factor(code)
+
+
+def test_amounts_are_converted_in_decimal_and_rounded_half_up(app):
+    assert convert_amounts([10, 0.01, None, 19.99], 'EUR') == [Decimal('15.00'), Decimal('0.02'), None, Decimal('29.99')]
+    assert convert_amounts([0.1 + 0.2], 'AZN') == [Decimal('0.30')]
+
+
+def test_rates_follow_currency_writes(app):
+    table = rate_table()
+    assert rate_table() is table
+    db.session.get(Currency, 2).exchange_rate = 0.6
+    db.session.commit()
+    assert conversion_factor('USD') == Decimal('0.6')
+
+
+def test_place_prices_are_listed_in_the_requested_currency(app):
+    client = app.test_client()
+    response = client.get('/places?currency=eur')
+    assert response.status_code == 200
+    assert response.json['currency'] == 'EUR'
+    assert [place['default_price'] for place in response.json['data']] == [15.0, 0.02, None]
+
+    response = client.get('/places?currency=USD&fields=name')
+    assert response.json['data'][0] == {'name': 'place1'}
+    assert client.get('/places').json['data'][0]['default_price'] == 10.0
+    assert client.get('/places?currency=GBP').status_code == 400
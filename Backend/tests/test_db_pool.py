@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from db import TimedQueuePool, pool_stats
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_stats_report_checked_out_connections(engine):
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats['pool'] == 'TimedQueuePool'
+        assert (stats['size'], stats['checked_out'], stats['checked_in'], stats['overflow']) == (1, 1, 0, 0)
+
+    stats = pool_stats(engine)
+    assert (stats['checked_out'], stats['checked_in'], stats['checkouts'], stats['timeouts']) == (0, 1, 1, 0)
+
+
+def test_timed_pool_counts_timeouts_and_waits(engine):
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert (stats['checkouts'], stats['timeouts']) == (2, 1)
+    assert stats['max_wait_seconds'] >= 0.05
+    assert stats['avg_wait_seconds'] == pytest.approx(stats['total_wait_seconds'] / 2, abs=1e-6)
+
+
+def test_other_pools_only_report_their_class():
+    engine = create_engine('sqlite://')
+    assert pool_stats(engine) == {'pool': 'SingletonThreadPool'}
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from itertools import permutations
+import numpy as np
+import pytest
+from sqlalchemy import event
+from models import db, Assignment, Availability, Booking, Company, Driver
+from resources.bookings import BookingDriversResource, BookingsDispatchResource
+from services import availability
+from services.dispatch import dispatch_bookings, driver_pool, min_cost_assignment, pending_bookings, score_drivers
+from conftest import add_place, add_user, auth_headers
+
+NOW = datetime(2027, 1, 1, 8)
+
+
+def brute_force_cost(cost):
+    rows, columns = cost.shape
+    if rows > columns:
+        return brute_force_cost(cost.T)
+    return min(sum(cost[row, column] for row, column in enumerate(chosen)) for chosen in permutations(range(columns), rows))
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 4), (4, 1), (3, 3), (5, 5), (2, 6), (6, 2), (4, 7), (7, 4)])
+def test_matches_brute_force_on_random_matrices(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        # Small integer costs make ties, and so alternative optimal matchings, common
+        cost = rng.integers(0, 5, size=shape).astype(float)
+        pairs = min_cost_assignment(cost)
+        assert len(pairs) == min(shape)
+        assert len({row for row, _ in pairs}) == len({column for _, column in pairs}) == len(pairs)
+        assert pairs == sorted(pairs)
+        assert sum(cost[row, column] for row, column in pairs) == pytest.approx(brute_force_cost(cost))
+
+
+def test_avoids_infeasible_pairs_when_it_can():
+    cost = np.array([[1e9, 1.0, 1e9], [2.0, 1e9, 1e9]])
+    assert min_cost_assignment(cost) == [(0, 1), (1, 0)]
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((BookingDriversResource, '/bookings/<int:booking_id>/drivers'), (BookingsDispatchResource, '/bookings/dispatch'))
+    with app.app_context():
+        add_user()
+        add_place(1, latitude=40.37, longitude=49.83)
+        add_place(2, latitude=40.60, longitude=49.90)
+        db.session.add_all([Company(id=1, name='Taxi'), Company(id=2, name='Limo')])
+        for driver_id, company_id in [(1, 1), (2, 1), (3, 2), (4, 2)]:
+            db.session.add(Driver(id=driver_id, company_id=company_id, name=f'driver{driver_id}', surname='Driver'))
+        db.session.add(Driver(id=5, company_id=1, name='driver5', surname='Driver', status='unavailable'))
+        # Driver 2 only works mornings
+        db.session.add(Availability(id=1, entity_type='driver', entity_id=2,
+                                    availability_start=datetime(2027, 1, 1, 6), availability_end=datetime(2027, 1, 1, 12)))
+        for booking_id, hour in [(1, 9), (2, 9), (3, 14)]:
+            db.session.add(Booking(id=booking_id, user_id=1, place_id=1, booking_date=datetime(2027, 1, 1, hour)))
+        db.session.commit()
+    return app
+
+
+def drivers_of(scores):
+    return [score.driver_id for score in scores]
+
+
+def test_scores_only_available_drivers_free_for_the_booking(app):
+    with app.app_context():
+        booking = db.session.get(Booking, 3)
+        assert drivers_of(score_drivers(booking, now=NOW)) == [1, 3, 4]
+        assert drivers_of(score_drivers(booking, company_id=2, now=NOW)) == [3, 4]
+        db.session.add(Booking(id=4, user_id=1, place_id=2, driver_id=3, booking_date=datetime(2027, 1, 1, 14, 30)))
+        db.session.commit()
+        assert drivers_of(score_drivers(booking, now=NOW)) == [1, 4]
+
+
+def test_drivers_are_located_at_their_latest_assignment(app):
+    with app.app_context():
+        booking = db.session.get(Booking, 3)
+        score_drivers(booking, now=NOW)
+        for assignment_id, place_id in [(1, 2), (2, 1)]:
+            db.session.add(Assignment(id=assignment_id, driver_id=1, place_id=place_id))
+            db.session.commit()
+        first, second = Assignment.query.order_by(Assignment.id)
+        assert first.assigned_at < second.assigned_at
+        # Both as committed by this process and as loaded from the database
+        assert driver_pool.location(1) == 1
+        driver_pool.loaded = False
+        best = score_drivers(booking, now=NOW)[0]
+        assert (best.driver_id, best.distance_km, driver_pool.location(1)) == (1, 0.0, 1)
+
+
+def test_a_batch_loads_driver_schedules_once(app, monkeypatch):
+    versions = []
+    monkeypatch.setattr(availability.availability_index, '_versions',
+                        lambda keys, read=availability.availability_index._versions: versions.append(keys) or read(keys))
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        bookings = pending_bookings(now=NOW)
+        assigned = dispatch_bookings(bookings, now=NOW)
+        db.session.commit()
+        assert len(versions) == 1
+        assert len([statement for statement in statements if 'FROM availabilities' in statement]) == 1
+        # Bookings 1 and 2 overlap, so they get different drivers; driver 2 cannot take booking 3
+        assert sorted(assigned) == [1, 2, 3]
+        assert assigned[1] != assigned[2] and assigned[3] != 2
+
+
+def test_endpoints_can_be_limited_to_one_company(app):
+    client, headers = app.test_client(), auth_headers(app)
+    response = client.get('/bookings/1/drivers?company_id=2', headers=headers)
+    assert [candidate['driver_id'] for candidate in response.json['data']] == [3, 4]
+    response = client.post('/bookings/dispatch', json={'booking_ids': [1, 2], 'company_id': 2}, headers=headers)
+    assert sorted(response.json['data']['assigned'].values()) == [3, 4]
+    assert client.post('/bookings/dispatch', json={'company_id': 'Limo'}, headers=headers).status_code == 400
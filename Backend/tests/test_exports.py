@@ -0,0 +1,75 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+from decimal import Decimal
+import orjson
+import pytest
+from models import db, Booking, Payment
+from resources.exports import ExportResource
+from services.exports import encode_csv, encode_ndjson, gzip_chunks
+from conftest import add_place, add_user, auth_headers
+
+KEYS = ['id', 'amount', 'paid_at', 'details', 'note']
+BATCHES = [
+    [(1, Decimal('9.50'), datetime(2027, 1, 1, 12), {'card': 'visa'}, None)],
+    [],
+    [(2, Decimal('0.00'), None, [1, 2], 'a, "quoted" note')]
+]
+
+
+def test_ndjson_writes_one_object_per_row():
+    body = b''.join(encode_ndjson(KEYS, BATCHES))
+    assert [orjson.loads(line) for line in body.splitlines()] == [
+        {'id': 1, 'amount': '9.50', 'paid_at': '2027-01-01T12:00:00', 'details': {'card': 'visa'}, 'note': None},
+        {'id': 2, 'amount': '0.00', 'paid_at': None, 'details': [1, 2], 'note': 'a, "quoted" note'}
+    ]
+
+
+def test_csv_writes_a_header_then_one_line_per_row():
+    body = b''.join(encode_csv(KEYS, BATCHES)).decode()
+    assert list(csv.reader(io.StringIO(body))) == [
+        KEYS,
+        ['1', '9.50', '2027-01-01T12:00:00', '{"card": "visa"}', ''],
+        ['2', '0.00', '', '[1, 2]', 'a, "quoted" note']
+    ]
+    assert b''.join(encode_csv(KEYS, [])) == b'id,amount,paid_at,details,note\r\n'
+
+
+def test_gzip_stream_decompresses_to_the_chunks():
+    chunks = [b'first chunk\n', b'', b'second chunk\n' * 1000]
+    assert gzip.decompress(b''.join(gzip_chunks(iter(chunks)))) == b''.join(chunks)
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((ExportResource, '/export/<string:resource>'))
+    with app.app_context():
+        add_user(1, role='admin')
+        add_user(2)
+        add_place(1, default_price=100)
+        for booking_id, updated_at in enumerate([datetime(2027, 1, 1), datetime(2027, 2, 1), datetime(2027, 3, 1)], 1):
+            db.session.add(Booking(id=booking_id, user_id=2, place_id=1, booking_date=updated_at, updated_at=updated_at))
+        db.session.add(Payment(id=1, booking_id=1, amount=Decimal('100.00'), payment_method='paypal'))
+        db.session.commit()
+    return app
+
+
+def test_only_admins_can_export(app):
+    client = app.test_client()
+    assert client.get('/export/bookings', headers=auth_headers(app, 2)).status_code == 403
+    assert client.get('/export/bookings').status_code == 401
+    assert client.get('/export/refunds', headers=auth_headers(app, 1)).status_code == 404
+
+
+def test_exports_stream_rows_written_since(app):
+    client, headers = app.test_client(), auth_headers(app, 1)
+    response = client.get('/export/bookings?since=2027-02-01T00:00:00', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [orjson.loads(line)['id'] for line in response.data.splitlines()] == [2, 3]
+
+    response = client.get('/export/payments?format=csv', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode())))
+    assert [(row['id'], row['amount'], row['payment_method']) for row in rows] == [('1', '100.00', 'paypal')]
@@ -0,0 +1,103 @@
+import random
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, Place
+from resources.places import PlacesNearbyResource
+from services import versions
+from services.geo import GeoGridIndex, geo_version, haversine_km
+from conftest import add_place
+
+
+def test_haversine_distances():
+    assert haversine_km(40.0, 49.0, 40.0, 49.0) == 0
+    # One degree of latitude
+    assert haversine_km(0, 0, 1, 0) == pytest.approx(111.195, abs=0.01)
+    assert haversine_km(0, 179.5, 0, -179.5) == pytest.approx(111.195, abs=0.01)
+
+
+@pytest.mark.parametrize('center', [(40.4, 49.9), (0.0, 179.9), (0.0, -179.95), (89.9, 10.0), (-89.95, -120.0)])
+def test_nearby_matches_a_scan_of_every_place(center):
+    rng = random.Random(7)
+    lat, lon = center
+    points = {
+        place_id: (max(min(lat + rng.uniform(-1, 1), 90), -90), (lon + rng.uniform(-2, 2) + 180) % 360 - 180)
+        for place_id in range(1, 400)
+    }
+    index = GeoGridIndex()
+    index.load((place_id, plat, plon) for place_id, (plat, plon) in points.items())
+
+    for radius_km in (1, 10, 50, 100):
+        expected = sorted((haversine_km(lat, lon, *point), place_id) for place_id, point in points.items())
+        expected = [place_id for distance, place_id in expected if distance <= radius_km]
+        assert [place_id for place_id, _ in index.nearby(lat, lon, radius_km, 1000)] == expected
+        assert [place_id for place_id, _ in index.nearby(lat, lon, radius_km, 5)] == expected[:5]
+
+
+def test_moved_and_removed_places_leave_their_old_cell():
+    index = GeoGridIndex()
+    index.load([(1, 40.0, 49.0), (2, 40.0, 49.01), (3, None, None)])
+    index.upsert(1, 41.0, 49.0)
+    index.remove(2)
+    index.upsert(3, 40.0, 49.0)
+
+    assert [place_id for place_id, _ in index.nearby(40.0, 49.0, 5, 10)] == [3]
+    assert [place_id for place_id, _ in index.nearby(41.0, 49.0, 5, 10)] == [1]
+    assert index.point(2) is None
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(versions, 'CHECK_INTERVAL', 0)
+    app = make_app((PlacesNearbyResource, '/places/nearby'))
+    with app.app_context():
+        add_place(1, latitude=40.3661, longitude=49.8372)
+        add_place(2, latitude=40.3716, longitude=49.8330)
+        add_place(3, latitude=40.6828, longitude=46.3606)
+        add_place(4)
+        db.session.commit()
+    return app
+
+
+def nearby(client, **args):
+    response = client.get('/places/nearby', query_string={'lat': 40.37, 'lon': 49.83, 'radius_km': 5, **args})
+    assert response.status_code == 200
+    return [(place['id'], place['distance_km']) for place in response.json['data']]
+
+
+def test_nearby_places_are_listed_nearest_first_with_their_distance(app):
+    client = app.test_client()
+    assert nearby(client) == [
+        (2, round(haversine_km(40.37, 49.83, 40.3716, 49.8330), 3)),
+        (1, round(haversine_km(40.37, 49.83, 40.3661, 49.8372), 3))
+    ]
+    assert [place_id for place_id, _ in nearby(client, limit=1)] == [2]
+    assert [place_id for place_id, _ in nearby(client, radius_km=100)] == [2, 1]
+
+
+def test_commits_move_places_in_the_index(app):
+    client = app.test_client()
+    assert [place_id for place_id, _ in nearby(client)] == [2, 1]
+    with app.app_context():
+        db.session.get(Place, 3).latitude, db.session.get(Place, 3).longitude = 40.37, 49.83
+        db.session.delete(db.session.get(Place, 2))
+        db.session.commit()
+    assert [place_id for place_id, _ in nearby(client)] == [3, 1]
+
+
+def test_changes_announced_by_other_processes_reload_the_index(app):
+    client = app.test_client()
+    assert [place_id for place_id, _ in nearby(client)] == [2, 1]
+    with app.app_context():
+        # Written without the ORM, as another process's commit looks from here
+        db.session.execute(text('UPDATE places SET latitude = 40.37, longitude = 49.83 WHERE id = 4'))
+        db.session.commit()
+    assert [place_id for place_id, _ in nearby(client)] == [2, 1]
+    redis_client.incr(geo_version.key)
+    assert [place_id for place_id, _ in nearby(client)] == [4, 2, 1]
+
+
+@pytest.mark.parametrize('args', [{'lat': 91}, {'lon': -181}, {'radius_km': 0}, {'radius_km': 101}, {'limit': 0}, {'limit': 101}])
+def test_out_of_range_arguments_are_rejected(app, args):
+    query = {'lat': 40.37, 'lon': 49.83, **args}
+    assert app.test_client().get('/places/nearby', query_string=query).status_code == 400
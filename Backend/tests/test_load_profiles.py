@@ -0,0 +1,61 @@
+import pytest
+from flask import g
+from sqlalchemy import event, select
+from models import db, LOAD_PROFILES, Review, ReviewMedia, User
+from resources.reviews import ReviewsResource
+from conftest import add_place, add_user, auth_headers
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((ReviewsResource, '/reviews'))
+    with app.app_context():
+        add_user(1)
+        add_place(1)
+        db.session.commit()
+    return app
+
+
+def add_reviews(count):
+    start = db.session.scalar(select(db.func.count(Review.id)))
+    for review_id in range(start + 1, start + count + 1):
+        db.session.add(Review(id=review_id, place_id=1, user_id=1, rating=4, comment='Nice'))
+        db.session.add_all([
+            ReviewMedia(review_id=review_id, media_url=f'https://example.com/{review_id}/{i}.jpg', media_type='image')
+            for i in range(2)
+        ])
+    db.session.commit()
+
+
+def test_review_pages_take_the_same_queries_however_many_reviews(app):
+    client, headers = app.test_client(), auth_headers(app)
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    counts = []
+    for count in (2, 10):
+        with app.app_context():
+            add_reviews(count)
+        statements.clear()
+        response = client.get('/reviews', headers=headers)
+        assert response.status_code == 200
+        assert all(len(review['media']) == 2 for review in response.json['data'])
+        # Audit events of the request may be written meanwhile
+        counts.append(len([statement for statement in statements if 'FROM review' in statement]))
+    # The page, then the media of all its reviews
+    assert counts == [2, 2]
+
+
+def test_profiles_only_apply_to_queries_loading_their_model(app):
+    with app.app_context():
+        add_reviews(1)
+    with app.test_request_context('/reviews'):
+        g.load_profile = LOAD_PROFILES['review_detail']
+        # Loader options on a column query would raise
+        assert db.session.scalars(select(Review.id)).all() == [1]
+        assert db.session.scalars(select(User.username)).all() == ['user1']
+
+        review = db.session.scalars(select(Review)).one()
+        assert 'media' in review.__dict__
+        user = db.session.get(User, 1)
+        assert 'preferences' not in user.__dict__
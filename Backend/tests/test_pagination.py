@@ -0,0 +1,101 @@
+from datetime import datetime
+import pytest
+from werkzeug.exceptions import BadRequest
+from models import db, Booking, Place
+from pagination import paginate, encode_cursor, decode_cursor
+from resources.bookings import BookingsResource
+from resources.places import PlacesResource
+from conftest import add_place, add_user, auth_headers
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((PlacesResource, '/places'))
+    with app.app_context():
+        # Many ties on rating, so the id must break them for pages not to overlap
+        for place_id in range(1, 24):
+            add_place(place_id, rating=float(place_id % 4 + 1), default_price=place_id * 3 % 7)
+        db.session.commit()
+    return app
+
+
+def walk(app, limit, **kwargs):
+    """Follow the `next` links from the first page, returning the ids in page order."""
+    ids, url = [], f'/places?limit={limit}'
+    while url:
+        with app.test_request_context(url):
+            page = paginate(Place.query, limit=limit, **kwargs)
+            ids.extend(place.id for place in page.items)
+            assert len(page.items) <= limit
+            url = page.next
+    return ids
+
+
+@pytest.mark.parametrize('limit', [1, 4, 23, 50])
+def test_pages_cover_every_row_once_in_id_order(app, limit):
+    assert walk(app, limit) == list(range(1, 24))
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_follow_the_sort_column_then_the_id(app, descending):
+    with app.app_context():
+        places = Place.query.all()
+        expected = [place.id for place in sorted(places, key=lambda place: (place.rating, place.id), reverse=descending)]
+        assert walk(app, 5, sort_column=Place.rating, descending=descending) == expected
+
+
+def test_rows_added_before_the_cursor_do_not_shift_later_pages(app):
+    with app.test_request_context('/places?limit=5'):
+        first = paginate(Place.query, limit=5)
+    with app.app_context():
+        # OFFSET pagination would repeat the last row of the first page after this insert
+        add_place(0)
+        db.session.commit()
+    with app.test_request_context(first.next):
+        second = paginate(Place.query, limit=5)
+    assert [place.id for place in second.items] == [6, 7, 8, 9, 10]
+
+
+def test_cursor_round_trips_typed_values():
+    columns = [Place.__table__.c.rating, Place.__table__.c.id]
+    assert decode_cursor(encode_cursor([2.5, 7]), columns) == [2.5, 7]
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor([1, 2, 3]), encode_cursor(['x'])])
+def test_invalid_cursor_is_rejected(app, cursor):
+    with app.test_request_context(f'/places?after={cursor}'):
+        with pytest.raises(BadRequest):
+            paginate(Place.query)
+
+
+def test_endpoint_links_pages_and_validates_the_limit(app):
+    client = app.test_client()
+    response = client.get('/places?limit=10&sort=-rating')
+    assert response.status_code == 200
+    ids = [place['id'] for place in response.json['data']]
+    while response.json['next']:
+        response = client.get(response.json['next'])
+        ids.extend(place['id'] for place in response.json['data'])
+    assert sorted(ids) == list(range(1, 24))
+    assert client.get('/places?limit=0').status_code == 400
+
+
+def test_bookings_can_be_paged_for_one_user(make_app):
+    app = make_app((BookingsResource, '/bookings'))
+    with app.app_context():
+        add_user(1)
+        add_user(2)
+        add_place(1)
+        for booking_id in range(1, 8):
+            db.session.add(Booking(id=booking_id, user_id=booking_id % 2 + 1, place_id=1, total_cost=10,
+                                   booking_date=datetime(2027, 1, booking_id), status='confirmed'))
+        db.session.commit()
+    client, headers = app.test_client(), auth_headers(app)
+
+    ids, url = [], '/bookings?user_id=2&limit=2'
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        ids.extend(booking['id'] for booking in response.json['data'])
+        url = response.json['next']
+    assert ids == [1, 3, 5, 7]
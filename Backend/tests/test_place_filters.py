@@ -0,0 +1,64 @@
+import pytest
+from models import db
+from resources.places import PlacesResource
+from conftest import add_place
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app((PlacesResource, '/places'))
+    with app.app_context():
+        add_place(1, city='Baku', category_id=1, entertainment_type_id=1, rating=4.5, default_price=20)
+        add_place(2, city='Ganja', category_id=1, entertainment_type_id=2, rating=3.0, default_price=80)
+        add_place(3, city='Baku', category_id=2, entertainment_type_id=2, rating=5.0, default_price=None)
+        add_place(4, city='Baku', category_id=2, entertainment_type_id=1, rating=2.0, default_price=50)
+        add_place(5, city='Shaki', category_id=1, entertainment_type_id=1, rating=4.0, default_price=35)
+        db.session.commit()
+    return app.test_client()
+
+
+def ids(client, query):
+    """Follow the `next` links of a filtered listing, returning the ids in page order."""
+    result, url = [], f'/places?{query}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.json
+        result.extend(place['id'] for place in response.json['data'])
+        url = response.json['next']
+    return result
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('city=Baku', [1, 3, 4]),
+    ('category_id=1', [1, 2, 5]),
+    ('entertainment_type_id=2', [2, 3]),
+    ('min_rating=4', [1, 3, 5]),
+    ('max_rating=3', [2, 4]),
+    ('min_price=30&max_price=60', [4, 5]),
+    ('city=Baku&category_id=2&min_rating=3', [3]),
+    ('city=Nowhere', [])
+])
+def test_filters_select_matching_places(client, query, expected):
+    assert ids(client, query) == expected
+
+
+def test_filters_are_kept_across_pages(client):
+    assert ids(client, 'category_id=1&limit=1') == [1, 2, 5]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('sort=-rating', [3, 1, 5, 2, 4]),
+    ('sort=default_price', [1, 5, 4, 2]),
+    ('sort=-default_price&city=Baku&limit=1', [4, 1])
+])
+def test_sorting_skips_places_without_the_sort_key(client, query, expected):
+    assert ids(client, query) == expected
+
+
+def test_unknown_sort_is_rejected(client):
+    assert client.get('/places?sort=location').status_code == 400
+
+
+def test_field_selection_applies_to_filtered_places(client):
+    response = client.get('/places?fields=city&min_rating=4')
+    assert response.json['data'] == [{'city': 'Baku'}, {'city': 'Baku'}, {'city': 'Shaki'}]
@@ -0,0 +1,113 @@
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from models import db, Booking, PricingRule, Promotion
+from resources.bookings import BookingsResource, BookingResource
+from services.pricing import PriceEvaluator, compile_rule, compile_promotion, quote
+from conftest import add_place, add_user, auth_headers
+
+NOW = datetime(2027, 1, 1, 9)
+# A Monday
+MONDAY_NOON = datetime(2027, 1, 4, 12)
+
+
+def rule(rule_id, rule_type, modifier, **columns):
+    return compile_rule(PricingRule(id=rule_id, place_id=1, rule_type=rule_type, price_modifier=modifier, **columns))
+
+
+def promotion(code, discount_type, value, **columns):
+    return compile_promotion(Promotion(id=len(code), code=code, discount_type=discount_type, value=value, **columns))
+
+
+def total(evaluator, when=MONDAY_NOON, promotion_code=None):
+    result = evaluator.quote(when, evaluator.promotions.get(promotion_code), NOW)
+    assert Decimal(result['base_price']) + sum(Decimal(adjustment['amount']) for adjustment in result['adjustments']) == Decimal(result['total'])
+    return Decimal(result['total'])
+
+
+def test_multipliers_apply_before_discounts_whatever_their_ids():
+    evaluator = PriceEvaluator(1, 100, [rule(1, 'discount', 10), rule(2, 'seasonal', 1.5), rule(3, 'dynamic', 2)], [])
+    assert total(evaluator) == Decimal('270.00')
+    assert [adjustment['id'] for adjustment in evaluator.quote(MONDAY_NOON, now=NOW)['adjustments']] == [2, 3, 1]
+
+
+def test_rules_apply_only_within_their_dates_and_conditions():
+    evaluator = PriceEvaluator(1, 100, [
+        rule(1, 'seasonal', 2, rule_start=datetime(2027, 1, 3), rule_end=datetime(2027, 1, 5)),
+        rule(2, 'dynamic', 1.1, rule_conditions={'weekdays': [0], 'hours': [10, 14]}),
+        rule(3, 'discount', 50, rule_conditions={'min_days_ahead': 30})
+    ], [])
+    assert total(evaluator) == Decimal('220.00')
+    # After the season, outside the hours, and still less than 30 days ahead
+    assert total(evaluator, datetime(2027, 1, 11, 16)) == Decimal('100.00')
+    assert total(evaluator, datetime(2027, 3, 1, 16)) == Decimal('50.00')
+
+
+def test_promotions_apply_last_within_their_limits():
+    evaluator = PriceEvaluator(1, 100, [rule(1, 'seasonal', 1.5)], [
+        promotion('TEN', 'percentage', 10),
+        promotion('BIG', 'fixed_amount', 500),
+        promotion('MIN', 'fixed_amount', 5, min_purchase_amount=200),
+        promotion('OLD', 'percentage', 10, end_date=date(2026, 12, 31))
+    ])
+    assert total(evaluator, promotion_code='TEN') == Decimal('135.00')
+    assert total(evaluator, promotion_code='BIG') == Decimal('0.00')
+    with pytest.raises(ValueError, match='minimum purchase'):
+        total(evaluator, promotion_code='MIN')
+    with pytest.raises(ValueError, match='not valid for this date'):
+        total(evaluator, promotion_code='OLD')
+
+
+@pytest.mark.parametrize('rule_type, modifier, columns', [
+    ('weekly', 2, {}),
+    ('discount', 150, {}),
+    ('seasonal', 0, {}),
+    ('seasonal', None, {}),
+    ('seasonal', 2, {'rule_start': datetime(2027, 2, 1), 'rule_end': datetime(2027, 1, 1)}),
+    ('seasonal', 2, {'rule_conditions': {'weekdays': [7]}}),
+    ('seasonal', 2, {'rule_conditions': {'moon_phase': 'full'}})
+])
+def test_invalid_rules_are_rejected(rule_type, modifier, columns):
+    with pytest.raises(ValueError):
+        rule(1, rule_type, modifier, **columns)
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((BookingsResource, '/bookings'), (BookingResource, '/bookings/<int:booking_id>'))
+    with app.app_context():
+        add_user()
+        add_place(1, default_price=100)
+        add_place(2, default_price=40)
+        db.session.add(Promotion(id=1, code='TEN', discount_type='percentage', value=10))
+        db.session.add(PricingRule(id=1, place_id=1, rule_type='seasonal', price_modifier=2))
+        # Invalid rules are skipped rather than breaking the place's quotes
+        db.session.add(PricingRule(id=2, place_id=1, rule_type='discount', price_modifier=500))
+        db.session.commit()
+    return app
+
+
+def test_rule_writes_reprice_every_place_they_touch(app):
+    with app.app_context():
+        assert (quote(1, MONDAY_NOON)['total'], quote(2, MONDAY_NOON)['total']) == ('200.00', '40.00')
+        db.session.get(PricingRule, 1).price_modifier = 3
+        db.session.commit()
+        assert quote(1, MONDAY_NOON)['total'] == '300.00'
+        # Moving the rule changes the prices of the place it leaves, too
+        db.session.get(PricingRule, 1).place_id = 2
+        db.session.commit()
+        assert (quote(1, MONDAY_NOON)['total'], quote(2, MONDAY_NOON)['total']) == ('100.00', '120.00')
+        with pytest.raises(LookupError):
+            quote(3, MONDAY_NOON)
+
+
+def test_bookings_are_priced_and_repriced_when_they_move(app):
+    client, headers = app.test_client(), auth_headers(app)
+    response = client.post('/bookings', json={'user_id': 1, 'place_id': 1, 'status': 'pending',
+                                              'booking_date': MONDAY_NOON.isoformat(), 'promotion_code': 'TEN'}, headers=headers)
+    assert response.status_code == 201
+    assert client.put('/bookings/1', json={'place_id': 2}, headers=headers).status_code == 200
+    with app.app_context():
+        booking = db.session.get(Booking, 1)
+        assert booking.total_cost == Decimal('36.00')
+        assert [adjustment['source'] for adjustment in booking.pricing_snapshot['adjustments']] == ['promotion']
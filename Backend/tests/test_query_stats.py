@@ -0,0 +1,65 @@
+import pytest
+from flask_restx import Resource
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+import query_stats
+from models import db, Place
+from query_stats import QueryBudgetExceeded, statement_shape
+from conftest import add_place
+
+
+class PlaceNamesResource(Resource):
+    def get(self):
+        # One query per place, the N+1 the stats should spot
+        return {'names': [db.session.get(Place, place_id).name for place_id in range(1, 7)]}
+
+
+class FailingQueryResource(Resource):
+    def get(self):
+        try:
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        except SQLAlchemyError:
+            db.session.rollback()
+        return {'places': db.session.execute(text('SELECT count(*) FROM places')).scalar()}
+
+
+def make(make_app, **config):
+    app = make_app((PlaceNamesResource, '/names'), (FailingQueryResource, '/failing'), **config)
+    query_stats.init_app(app)
+    with app.app_context():
+        for place_id in range(1, 7):
+            add_place(place_id)
+        db.session.commit()
+    return app
+
+
+def test_statement_shapes_ignore_parameters_and_in_list_lengths():
+    assert statement_shape('SELECT a\n  FROM t WHERE id IN (?, ?, ?)') == statement_shape('SELECT a FROM t WHERE id IN (?, ?)')
+    assert statement_shape('SELECT a FROM t WHERE id = ?') == 'SELECT a FROM t WHERE id = ?'
+
+
+def test_requests_report_their_queries_and_repeated_statements(make_app, caplog):
+    app = make(make_app)
+    with caplog.at_level('WARNING'):
+        response = app.test_client().get('/names')
+    assert response.headers['Server-Timing'].endswith('desc="6 queries"')
+    assert any('statement ran 6 times' in record.getMessage() for record in caplog.records)
+
+
+def test_strict_mode_fails_requests_with_repeated_statements(make_app):
+    app = make(make_app, SQL_STRICT=True)
+    with pytest.raises(QueryBudgetExceeded):
+        app.test_client().get('/names')
+
+
+def test_failed_statements_do_not_skew_later_timings(make_app):
+    app = make(make_app)
+    client = app.test_client()
+    for _ in range(3):
+        response = client.get('/failing')
+        assert response.json == {'places': 6}
+        # Only the statement that completed is counted
+        assert response.headers['Server-Timing'].endswith('desc="1 queries"')
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert 'query_start' not in connection.info
@@ -0,0 +1,86 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from models import db, Place, Review
+from resources.reviews import ReviewsResource, ReviewResource
+from services.ratings import record_review_change, repair_review_aggregates, rating_bucket
+from conftest import add_place, add_user, auth_headers
+
+AGGREGATES = ('rating', 'review_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+              'rating_3_count', 'rating_4_count', 'rating_5_count', 'last_review_at')
+
+
+def aggregates(place_id):
+    db.session.expire_all()
+    place = db.session.get(Place, place_id)
+    return {name: getattr(place, name) for name in AGGREGATES}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((ReviewsResource, '/reviews'), (ReviewResource, '/reviews/<int:review_id>'))
+    with app.app_context():
+        add_user()
+        add_place(1, rating=2.0)
+        add_place(2, rating=4.0)
+        db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize('rating, bucket', [(1, 1), (1.49, 1), (1.5, 2), (3.2, 3), (4.5, 5), (5, 5)])
+def test_rating_bucket_rounds_half_up(rating, bucket):
+    assert rating_bucket(rating) == bucket
+
+
+def test_deltas_match_a_full_recount(app):
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        reviews = []
+        for i in range(60):
+            action = rng.random()
+            if reviews and action < 0.25:
+                review = reviews.pop(rng.randrange(len(reviews)))
+                db.session.delete(review)
+                db.session.flush()
+                record_review_change(review.place_id, old_rating=review.rating)
+            elif reviews and action < 0.5:
+                review = rng.choice(reviews)
+                new_rating = rng.randint(1, 5)
+                record_review_change(review.place_id, old_rating=review.rating, new_rating=new_rating)
+                review.rating = new_rating
+            else:
+                review = Review(place_id=rng.choice([1, 2]), user_id=1, rating=rng.randint(1, 5), comment='c',
+                                publish_date=start + timedelta(days=rng.randint(0, 100)))
+                db.session.add(review)
+                record_review_change(review.place_id, new_rating=review.rating, published_at=review.publish_date)
+                reviews.append(review)
+            db.session.commit()
+
+        incremental = {place_id: aggregates(place_id) for place_id in (1, 2)}
+        db.session.execute(db.update(Place).values(review_count=0, rating_sum=0, rating_3_count=42))
+        db.session.commit()
+        assert repair_review_aggregates(batch_size=1) == 2
+        for place_id in (1, 2):
+            recounted = aggregates(place_id)
+            assert incremental[place_id].pop('rating') == pytest.approx(recounted.pop('rating'))
+            assert incremental[place_id] == recounted
+
+
+def test_endpoints_apply_each_change_once(app):
+    client, headers = app.test_client(), auth_headers(app)
+    for rating in (5, 4, 2):
+        response = client.post('/reviews', json={'place_id': 1, 'user_id': 1, 'rating': rating, 'comment': 'c'}, headers=headers)
+        assert response.status_code == 201
+    assert client.put('/reviews/1', json={'rating': 1}, headers=headers).status_code == 200
+    assert client.delete('/reviews/3', headers=headers).status_code == 200
+    # Deleting or editing a review that is gone changes nothing
+    assert client.delete('/reviews/3', headers=headers).status_code == 404
+    assert client.put('/reviews/3', json={'rating': 5}, headers=headers).status_code == 404
+
+    with app.app_context():
+        place = aggregates(1)
+        assert (place['review_count'], place['rating_sum'], place['rating']) == (2, 5.0, 2.5)
+        assert [place[f'rating_{stars}_count'] for stars in range(1, 6)] == [1, 0, 0, 1, 0]
+        # A place without reviews keeps its assigned rating
+        assert aggregates(2)['rating'] == 4.0
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, Booking, Place, UserPreference
+from resources.users import UserRecommendationsResource
+from services import versions
+from services.recommendations import features_version, recommender
+from conftest import add_place, add_user, auth_headers
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(versions, 'CHECK_INTERVAL', 0)
+    app = make_app((UserRecommendationsResource, '/users/<int:user_id>/recommendations'))
+    with app.app_context():
+        add_user()
+        add_place(1, city='Baku', entertainment_type_id=1, rating=3.0, default_price=10)
+        add_place(2, city='Ganja', entertainment_type_id=2, rating=4.5, default_price=50)
+        add_place(3, city='Baku', entertainment_type_id=2, rating=4.0, default_price=90)
+        add_place(4, city='Baku', entertainment_type_id=1, rating=5.0, default_price=30)
+        db.session.add(UserPreference(user_id=1, preferred_location='baku', preferred_entertainment_type=1))
+        db.session.commit()
+    return app
+
+
+def recommended(app, limit=10):
+    with app.app_context():
+        return [recommendation.place_id for recommendation in recommender.recommend(1, limit)]
+
+
+def test_places_matching_preferences_rank_first(app):
+    assert recommended(app) == [4, 1, 3, 2]
+    assert recommended(app, 2) == [4, 1]
+
+
+def test_places_the_user_knows_are_not_recommended(app):
+    with app.app_context():
+        db.session.add(Booking(id=1, user_id=1, place_id=4))
+        db.session.commit()
+    # Place 1 shares the booked place's type and city, so it stays first among the rest
+    assert recommended(app) == [1, 3, 2]
+
+
+def test_place_writes_rebuild_the_features(app):
+    assert recommended(app)[0] == 4
+    with app.app_context():
+        db.session.get(Place, 4).city = 'Shaki'
+        db.session.commit()
+    assert recommended(app)[0] == 1
+
+
+def test_place_writes_of_other_processes_rebuild_the_features(app):
+    assert recommended(app)[0] == 4
+    with app.app_context():
+        db.session.execute(text("UPDATE places SET city = 'Shaki' WHERE id = 4"))
+        db.session.commit()
+    assert recommended(app)[0] == 4
+    redis_client.incr(features_version.key)
+    assert recommended(app)[0] == 1
+
+
+def test_endpoint_validates_the_user_and_limit(app):
+    client, headers = app.test_client(), auth_headers(app)
+    assert [place['id'] for place in client.get('/users/1/recommendations?limit=2', headers=headers).json['data']] == [4, 1]
+    assert client.get('/users/2/recommendations', headers=headers).status_code == 404
+    assert client.get('/users/1/recommendations?limit=0', headers=headers).status_code == 400
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, Company, Language
+from services.reference import reference_data, UPDATES_CHANNEL, VERSION_KEY
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([Language(id=1, name='English'), Company(id=1, name='Taxi Co')])
+        db.session.commit()
+        yield app
+
+
+def test_snapshot_holds_every_reference_row(app):
+    assert reference_data.get(Language, 1).name == 'English'
+    assert [company.name for company in reference_data.all(Company)] == ['Taxi Co']
+    assert reference_data.get(Language, 2) is None
+    with pytest.raises(TypeError):
+        reference_data.snapshot().tables[Language][2] = None
+
+
+def test_commits_publish_a_new_version_and_reload(app):
+    version = reference_data.snapshot().version
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(UPDATES_CHANNEL)
+    assert pubsub.get_message(timeout=1)['type'] == 'subscribe'
+
+    db.session.add(Language(id=2, name='Azerbaijani'))
+    db.session.commit()
+
+    assert reference_data.snapshot().version == version + 1 == int(redis_client.get(VERSION_KEY))
+    assert reference_data.get(Language, 2).name == 'Azerbaijani'
+    assert int(pubsub.get_message(timeout=1)['data']) == version + 1
+
+
+def test_rows_missing_from_the_snapshot_are_confirmed_in_the_database(app):
+    reference_data.snapshot()
+    # Created by another process that has not announced it yet
+    db.session.execute(text("INSERT INTO languages (id, name) VALUES (3, 'Russian')"))
+    db.session.commit()
+
+    assert reference_data.get(Language, 3) is None
+    assert reference_data.exists(Language, 3)
+    assert reference_data.exists(Language, 1)
+    assert not reference_data.exists(Language, 4)
+    assert not reference_data.exists(Language, None)
+
+
+def test_announced_versions_reload_only_when_newer(app):
+    version = reference_data.snapshot().version
+    db.session.execute(text("INSERT INTO languages (id, name) VALUES (3, 'Russian')"))
+    db.session.commit()
+
+    reference_data._refresh(version)
+    assert reference_data.get(Language, 3) is None
+    reference_data._refresh(version + 1)
+    assert reference_data.get(Language, 3).name == 'Russian'
+
+    # A reload that lost the race to a newer one does not replace it
+    db.session.execute(text('DELETE FROM languages WHERE id = 3'))
+    db.session.commit()
+    reference_data.reload(version)
+    assert reference_data.get(Language, 3) is not None
@@ -0,0 +1,98 @@
+import pytest
+from flask_restx import Resource
+from cache import cached_response
+from db import init_replica_routing, replica_engines, use_primary
+from models import db, Place
+from resources.places import PlacesNearbyResource
+from conftest import add_place
+
+
+def place_names():
+    return [place.name for place in Place.query.order_by(Place.id)]
+
+
+class PlaceNamesResource(Resource):
+    def get(self):
+        return {'names': place_names()}
+
+    def post(self):
+        add_place(3, name='new')
+        db.session.commit()
+        return {'names': place_names()}, 201
+
+
+class PrimaryPlaceNamesResource(Resource):
+    def get(self):
+        replica_names = place_names()
+        with use_primary():
+            primary_names = place_names()
+        return {'replica': replica_names, 'primary': primary_names, 'after': place_names()}
+
+
+class LockedPlaceNamesResource(Resource):
+    def get(self):
+        Place.query.with_for_update().all()
+        return {'names': place_names()}
+
+
+class CachedPlaceNamesResource(Resource):
+    @cached_response('places')
+    def get(self):
+        return {'names': place_names()}, 200
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    app = make_app(
+        (PlaceNamesResource, '/names'), (PrimaryPlaceNamesResource, '/names/primary'),
+        (LockedPlaceNamesResource, '/names/locked'), (CachedPlaceNamesResource, '/names/cached'),
+        (PlacesNearbyResource, '/places/nearby'),
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+        SQLALCHEMY_BINDS={'replica_1': f'sqlite:///{tmp_path / "replica.db"}'}
+    )
+    init_replica_routing(app)
+    with app.app_context():
+        add_place(1, name='primary', latitude=40.37, longitude=49.83)
+        db.session.commit()
+        # The replica lags: it has not seen the place's latest name nor its coordinates
+        replica = replica_engines()['replica_1']
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(Place.__table__.insert(), {'id': 1, 'name': 'replica', 'city': 'Baku', 'rating': 3.0, 'images': [], 'description': 'A place'})
+    return app
+
+
+def test_reads_of_get_requests_go_to_the_replica(app):
+    assert app.test_client().get('/names').json == {'names': ['replica']}
+
+
+def test_writes_go_to_the_primary_and_pin_the_client_to_it(app):
+    client = app.test_client()
+    assert client.post('/names').json == {'names': ['primary', 'new']}
+    assert client.get('/names').json == {'names': ['primary', 'new']}
+    # Other clients still read from the replica
+    other = app.test_client()
+    assert other.get('/names', environ_base={'REMOTE_ADDR': '10.0.0.2'}).json == {'names': ['replica']}
+
+
+def test_use_primary_reads_from_the_primary_only_within_the_block(app):
+    assert app.test_client().get('/names/primary').json == {
+        'replica': ['replica'], 'primary': ['primary'], 'after': ['replica']
+    }
+
+
+def test_locking_reads_keep_the_session_on_the_primary(app):
+    assert app.test_client().get('/names/locked').json == {'names': ['primary']}
+
+
+def test_cached_responses_are_built_from_the_primary(app):
+    client = app.test_client()
+    assert client.get('/names/cached').json == {'names': ['primary']}
+    response = client.get('/names/cached')
+    assert (response.json, response.headers['X-Cache']) == ({'names': ['primary']}, 'HIT')
+
+
+def test_versioned_indexes_are_loaded_from_the_primary(app):
+    # Only the primary knows where the place is
+    response = app.test_client().get('/places/nearby?lat=40.37&lon=49.83&radius_km=1')
+    assert [place['id'] for place in response.json['data']] == [1]
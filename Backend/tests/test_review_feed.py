@@ -0,0 +1,71 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import event, text
+from models import db, Review, ReviewMedia
+from resources.reviews import PlaceReviewsResource
+from conftest import add_place, add_user
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((PlaceReviewsResource, '/places/<int:place_id>/reviews'))
+    with app.app_context():
+        add_user(1)
+        add_user(2)
+        add_place(1)
+        add_place(2)
+        # Reviews 3 and 4 were published at the same moment, so the id breaks the tie
+        dates = {1: datetime(2026, 1, 1), 2: datetime(2026, 3, 1), 3: datetime(2026, 2, 1), 4: datetime(2026, 2, 1),
+                 5: datetime(2026, 4, 1), 6: datetime(2026, 6, 1)}
+        for review_id, publish_date in dates.items():
+            db.session.add(Review(id=review_id, place_id=1, user_id=review_id % 2 + 1, rating=4, comment='Nice',
+                                  publish_date=publish_date))
+        db.session.add(Review(id=7, place_id=2, user_id=1, rating=5, comment='Great', publish_date=datetime(2026, 5, 1)))
+        db.session.add(ReviewMedia(id=1, review_id=2, media_url='https://example.com/2.jpg', media_type='image'))
+        db.session.commit()
+        # Undated reviews cannot be paged by date, so the feed leaves them out
+        db.session.execute(text('UPDATE reviews SET publish_date = NULL WHERE id = 6'))
+        db.session.commit()
+    return app
+
+
+def feed(client, url):
+    """Follow the `next` links of a review feed, returning its reviews in page order."""
+    reviews = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        reviews.extend(response.json['data'])
+        url = response.json['next']
+    return reviews
+
+
+@pytest.mark.parametrize('limit', [1, 2, 50])
+def test_reviews_of_a_place_are_listed_newest_first(app, limit):
+    reviews = feed(app.test_client(), f'/places/1/reviews?limit={limit}')
+    assert [review['id'] for review in reviews] == [5, 2, 4, 3, 1]
+    assert [review['username'] for review in reviews] == ['user2', 'user1', 'user1', 'user2', 'user2']
+
+
+def test_media_is_included_unless_left_out(app):
+    client = app.test_client()
+    media = {review['id']: review['media'] for review in feed(client, '/places/1/reviews')}
+    assert media[2] == [{'id': 1, 'media_type': 'image', 'media_url': 'https://example.com/2.jpg'}]
+    assert all(review['media'] == [] for review in feed(client, '/places/1/reviews?media=false'))
+
+
+def test_pages_take_a_fixed_number_of_queries(app):
+    client = app.test_client()
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    client.get('/places/1/reviews?limit=2')
+    # The place, the reviews with their users, and the media of the page
+    assert len(statements) == 3
+    statements.clear()
+    client.get('/places/1/reviews?limit=2&media=false')
+    assert len(statements) == 2
+
+
+def test_unknown_places_are_not_found(app):
+    assert app.test_client().get('/places/3/reviews').status_code == 404
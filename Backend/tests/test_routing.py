@@ -0,0 +1,144 @@
+import random
+from decimal import Decimal
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, RouteSegment, Transportation
+from resources.routes import RoutePlanResource
+from services import geo, versions
+from services.routing import RouteGraph, routing_version
+from conftest import add_place
+
+
+def transportation(transportation_id, origin, destination, mode, duration, cost):
+    return {'id': transportation_id, 'origin_place_id': origin, 'destination_place_id': destination,
+            'transport_type': mode, 'duration': duration, 'cost': None if cost is None else Decimal(cost)}
+
+
+def segment(segment_id, transportation_id, origin, destination, order, distance, duration, mode='bus'):
+    return {'id': segment_id, 'transportation_id': transportation_id, 'origin_place_id': origin,
+            'destination_place_id': destination, 'segment_order': order,
+            'distance_km': None if distance is None else Decimal(distance), 'duration_minutes': duration,
+            'transport_mode': mode}
+
+
+@pytest.fixture
+def graph():
+    geo.place_geo_index.load([(1, 40.0, 49.0), (2, 40.1, 49.0), (3, 40.2, 49.0), (4, 40.3, 49.0)])
+    graph = RouteGraph()
+    graph.load([
+        transportation(1, 1, 2, 'bus', 30, '5'),
+        transportation(2, 2, 3, 'train', 20, '5'),
+        transportation(3, 1, 3, 'car', 70, '3'),
+        transportation(4, 3, 4, 'bus', None, '4')
+    ], [
+        segment(1, 4, 3, 4, 2, '4', 10),
+        segment(2, 4, 4, 3, 1, '12', 30),
+    ])
+    return graph
+
+
+def legs(itinerary):
+    return [(leg.origin, leg.destination, leg.transportation_id) for leg in itinerary.legs]
+
+
+def test_itineraries_minimise_the_chosen_weight(graph):
+    fastest = graph.shortest_path(1, 3)
+    assert legs(fastest) == [(1, 2, 1), (2, 3, 2)]
+    assert (fastest.duration, fastest.cost) == (50, Decimal(10))
+    assert legs(graph.shortest_path(1, 3, 'cost')) == [(1, 3, 3)]
+    assert legs(graph.shortest_path(1, 3, modes={'car'})) == [(1, 3, 3)]
+    assert graph.shortest_path(1, 3, modes={'boat'}) is None
+    assert graph.shortest_path(3, 1) is None
+
+
+def test_segments_share_their_transportation_cost_by_distance(graph):
+    assert [(edge.segment_id, edge.cost) for edge in graph.edges_of(4)] == [(2, Decimal(3)), (1, Decimal(1))]
+    graph.upsert_segment({'id': 1, 'distance_km': None})
+    assert [edge.cost for edge in graph.edges_of(4)] == [Decimal(2), Decimal(2)]
+
+
+def test_a_moved_segment_rebuilds_both_transportations(graph):
+    graph.upsert_segment({'id': 1, 'transportation_id': 1})
+    assert [edge.segment_id for edge in graph.edges_of(4)] == [2]
+    assert [edge.segment_id for edge in graph.edges_of(1)] == [1]
+    graph.remove_transportation(1)
+    assert graph.shortest_path(3, 4) is None
+
+
+@pytest.mark.parametrize('optimize', ['time', 'cost', 'distance'])
+def test_a_star_finds_the_same_totals_as_dijkstra(optimize):
+    rng = random.Random(3)
+    points = [(place_id, 40 + rng.uniform(0, 1), 49 + rng.uniform(0, 1)) for place_id in range(1, 31)]
+    geo.place_geo_index.load(points)
+    graph = RouteGraph()
+    # Without segments each edge is as long as the great circle between its places
+    graph.load([
+        transportation(i, rng.randint(1, 30), rng.randint(1, 30), 'bus', rng.randint(5, 120), str(rng.randint(1, 20)))
+        for i in range(1, 120)
+    ], [])
+    weight = {'time': 'duration', 'cost': 'cost', 'distance': 'distance'}[optimize]
+    for origin in range(1, 31):
+        best, _ = graph.shortest_paths(origin, optimize)
+        for destination in range(1, 31):
+            itinerary = graph.shortest_path(origin, destination, optimize)
+            if destination not in best:
+                assert itinerary is None
+            elif destination != origin:
+                assert float(getattr(itinerary, weight)) == pytest.approx(best[destination])
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(versions, 'CHECK_INTERVAL', 0)
+    app = make_app((RoutePlanResource, '/routes/plan'))
+    with app.app_context():
+        for place_id in (1, 2, 3):
+            add_place(place_id, latitude=40.0 + place_id / 10, longitude=49.8)
+        db.session.add_all([
+            Transportation(id=1, origin_place_id=1, destination_place_id=2, transport_type='bus', duration=30, cost=2),
+            Transportation(id=2, origin_place_id=2, destination_place_id=3, transport_type='train', duration=20, cost=1),
+            RouteSegment(id=1, transportation_id=2, origin_place_id=2, destination_place_id=3, segment_order=1,
+                         distance_km=11, duration_minutes=20, transport_mode='train')
+        ])
+        db.session.commit()
+    return app
+
+
+def plan(client, **args):
+    return client.get('/routes/plan', query_string={'from': 1, 'to': 3, **args})
+
+
+def test_endpoint_returns_the_legs_and_totals(app):
+    response = plan(app.test_client())
+    assert response.status_code == 200
+    data = response.json['data']
+    assert (data['duration_minutes'], data['cost']) == (50, 3.0)
+    assert [(leg['transportation_id'], leg['segment_id'], leg['transport_mode']) for leg in data['legs']] == [
+        (1, None, 'bus'), (2, 1, 'train')
+    ]
+    assert data['distance_km'] == pytest.approx(data['legs'][0]['distance_km'] + 11)
+
+
+def test_endpoint_rejects_unknown_modes_and_unconnected_places(app):
+    client = app.test_client()
+    assert plan(client, modes='bus,rocket').status_code == 400
+    assert plan(client, modes='bus').status_code == 404
+    assert plan(client, **{'from': 3, 'to': 1}).status_code == 404
+
+
+def test_commits_and_announced_changes_update_the_graph(app):
+    client = app.test_client()
+    assert plan(client, optimize='cost').json['data']['cost'] == 3.0
+    with app.app_context():
+        db.session.add(Transportation(id=3, origin_place_id=1, destination_place_id=3, transport_type='car', duration=60, cost=1))
+        db.session.commit()
+    assert plan(client, optimize='cost').json['data']['cost'] == 1.0
+
+    with app.app_context():
+        # Written without the ORM, as another process's commit looks from here
+        db.session.execute(text('UPDATE transportations SET cost = 5 WHERE id = 3'))
+        db.session.commit()
+    assert plan(client, optimize='cost').json['data']['cost'] == 1.0
+    redis_client.incr(routing_version.key)
+    assert plan(client, optimize='cost').json['data']['cost'] == 3.0
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import text
+from cache import redis_client
+from models import db, Language, Place, PlaceTranslation
+from resources.places import PlacesSearchResource
+from services import versions
+from services.search import PlaceSearchIndex, search_version, tokenize
+from conftest import add_place
+
+
+def test_tokens_are_lowercase_and_accent_folded():
+    assert tokenize('Qız Qalası, İçərişəhər!') == ['qiz', 'qalasi', 'iceriseher']
+    assert tokenize(None) == []
+
+
+@pytest.fixture
+def index():
+    index = PlaceSearchIndex()
+    index.load([
+        (1, 'Maiden Tower', 'A tower in the old city'),
+        (2, 'Old City Museum', 'Carpets and towers'),
+        (3, 'Carpet Museum', 'Woven art'),
+        (4, 'Flame Towers', None)
+    ], [(10, 3, 'Xalça Muzeyi', 'Toxuculuq')])
+    return index
+
+
+def ids(matches):
+    return [place_id for place_id, _ in matches]
+
+
+def test_name_matches_outrank_description_matches(index):
+    # Flame Towers only matches as a prefix, but in its name
+    assert ids(index.search('tower', 10)) == [1, 4, 2]
+    # Equal scores are ordered by id
+    assert ids(index.search('museum', 10)) == [2, 3]
+
+
+def test_every_term_must_match_and_the_last_one_as_a_prefix(index):
+    assert ids(index.search('old tow', 10)) == [1, 2]
+    assert ids(index.search('old carpet zoo', 10)) == []
+    # A whole word outranks the longer words it is a prefix of
+    assert ids(index.search('tower', 10))[0] == 1
+    assert index.search('tower', 1) == index.search('tower', 10)[:1]
+
+
+def test_translations_are_searched_with_their_place(index):
+    assert ids(index.search('xalca', 10)) == [3]
+    index.remove_translation(10)
+    assert index.search('xalca', 10) == []
+    index.set_translation(1, 10, {'translated_name': 'Qız Qalası'})
+    assert ids(index.search('qiz', 10)) == [1]
+
+
+def test_incremental_changes_match_a_full_load(index):
+    index.set_place(4, {'name': 'Flame Towers', 'description': 'Three glass towers'})
+    index.set_place(5, {'name': 'Heydar Aliyev Center', 'description': None})
+    index.remove_place(2)
+    loaded = PlaceSearchIndex()
+    loaded.load([
+        (1, 'Maiden Tower', 'A tower in the old city'),
+        (3, 'Carpet Museum', 'Woven art'),
+        (4, 'Flame Towers', 'Three glass towers'),
+        (5, 'Heydar Aliyev Center', None)
+    ], [(10, 3, 'Xalça Muzeyi', 'Toxuculuq')])
+    assert index._vocabulary == loaded._vocabulary == sorted(loaded._postings)
+    for query in ('tower', 'c', 'museum', 'xal', 'heydar'):
+        assert index.search(query, 10) == loaded.search(query, 10)
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(versions, 'CHECK_INTERVAL', 0)
+    app = make_app((PlacesSearchResource, '/places/search'))
+    with app.app_context():
+        db.session.add(Language(id=1, name='Azerbaijani'))
+        add_place(1, name='Maiden Tower', description='A tower in the old city')
+        add_place(2, name='Carpet Museum', description='Woven art')
+        db.session.add(PlaceTranslation(id=1, place_id=2, language_id=1, translated_name='Xalça Muzeyi'))
+        db.session.commit()
+    return app
+
+
+def search(client, query, **args):
+    response = client.get('/places/search', query_string={'q': query, **args})
+    assert response.status_code == 200
+    return [place['id'] for place in response.json['data']]
+
+
+def test_commits_update_the_index(app):
+    client = app.test_client()
+    assert search(client, 'tower') == [1]
+    with app.app_context():
+        db.session.get(Place, 2).name = 'Carpet Tower'
+        db.session.delete(db.session.get(Place, 1))
+        db.session.commit()
+    assert search(client, 'tower') == [2]
+    assert search(client, 'xalca', lang='Azerbaijani') == [2]
+    with app.app_context():
+        db.session.delete(db.session.get(PlaceTranslation, 1))
+        db.session.commit()
+    assert search(client, 'xalca') == []
+
+
+def test_changes_announced_by_other_processes_reload_the_index(app):
+    client = app.test_client()
+    assert search(client, 'museum') == [2]
+    with app.app_context():
+        # Written without the ORM, as another process's commit looks from here
+        db.session.execute(text("UPDATE places SET name = 'Rug Gallery' WHERE id = 2"))
+        db.session.commit()
+    assert search(client, 'museum') == [2]
+    redis_client.incr(search_version.key)
+    assert search(client, 'museum') == []
+    assert search(client, 'rug') == [2]
+
+
+def test_search_limit_is_validated(app):
+    assert app.test_client().get('/places/search?q=tower&limit=51').status_code == 400
@@ -0,0 +1,188 @@
+import importlib
+import pkgutil
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from flask_restx import Model, Namespace, fields, marshal
+from flask_restx.marshalling import make
+from sqlalchemy import event
+import resources
+from models import db, Language, PlaceTranslation
+from resources.places import PlaceResource
+from resources.users import UserResource, UsersResource
+from serialization import compile_model
+from conftest import add_place, add_user, auth_headers
+
+tag = Model('Tag', {'name': fields.String, 'weight': fields.Float})
+thing = Model('Thing', {
+    'id': fields.Integer,
+    'name': fields.String(attribute='title'),
+    'price': fields.Fixed(decimals=2),
+    'active': fields.Boolean,
+    'created': fields.DateTime(dt_format='iso8601'),
+    'label': fields.String(default='none'),
+    'owner': fields.String(attribute='owner.name'),
+    'tag': fields.Nested(tag, allow_null=True),
+    'tags': fields.List(fields.Nested(tag)),
+    'scores': fields.List(fields.Integer),
+    'extra': fields.Raw
+})
+
+
+class Owner:
+    name = 'ann'
+
+
+class Thing:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+Row = namedtuple('Row', ['id', 'title', 'price'])
+
+SAMPLES = [
+    Thing(id=1, title='lamp', price=Decimal('9.5'), active=True, created=datetime(2027, 1, 1, 12), label='new',
+          owner=Owner(), tag=Thing(name='home', weight=2), tags=[Thing(name='a', weight=1), {'name': 'b'}],
+          scores=[1, '2', None], extra={'any': ['thing']}),
+    Thing(id='2', title=None, price=None, active=0, created=None, owner=None, tag=None, tags=None, scores=None),
+    {'id': 3, 'title': 7, 'tags': [], 'scores': (4, 5), 'tag': {'name': 'x', 'weight': '1.5'}},
+    Row(4, 'row', 1)
+]
+
+
+@pytest.mark.parametrize('sample', SAMPLES)
+def test_compiled_serializer_matches_marshal(sample):
+    assert compile_model(thing)(sample) == marshal(sample, thing)
+
+
+def test_compiled_serializer_marshals_lists():
+    assert compile_model(thing)(SAMPLES) == marshal(SAMPLES, thing)
+    assert compile_model(thing)([SAMPLES[:2], [SAMPLES[2]]]) == marshal([SAMPLES[:2], [SAMPLES[2]]], thing)
+    assert compile_model(thing)([]) == []
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app((UsersResource, '/users'), (UserResource, '/users/<int:user_id>'))
+    with app.app_context():
+        for user_id in (1, 2, 3):
+            add_user(user_id)
+    return app
+
+
+def user_columns(statements):
+    """Return the select lists of the given SQL statements reading the users table."""
+    return [statement.split(' FROM ')[0] for statement in statements if 'FROM users' in statement]
+
+
+def test_fields_select_item_fields_and_their_columns(app):
+    client, headers = app.test_client(), auth_headers(app)
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    response = client.get('/users?fields=username,email&limit=2', headers=headers)
+    assert response.status_code == 200
+    assert response.json['users'] == [{'username': 'user1', 'email': 'user1@example.com'},
+                                      {'username': 'user2', 'email': 'user2@example.com'}]
+    assert response.json['next']
+    selected = [columns for columns in user_columns(statements) if 'users.username' in columns]
+    assert selected and all('password_hash' not in columns for columns in selected)
+
+    statements.clear()
+    assert client.get('/users/2?fields=id', headers=headers).json == {'id': 2}
+    assert any('password_hash' not in columns for columns in user_columns(statements))
+
+
+def test_fields_are_validated(app):
+    client, headers = app.test_client(), auth_headers(app)
+    response = client.get('/users?fields=username,password_hash', headers=headers)
+    assert response.status_code == 400
+    assert 'Unknown fields: password_hash' in response.json['message']
+    assert client.get('/users?fields=,', headers=headers).status_code == 400
+
+
+def test_x_fields_masks_are_applied(app):
+    response = app.test_client().get('/users/1', headers={**auth_headers(app), 'X-Fields': 'username'})
+    assert response.json == {'username': 'user1'}
+
+
+def resource_models():
+    """Yield every model declared by a resource namespace."""
+    for module_info in pkgutil.iter_modules(resources.__path__):
+        namespace = getattr(importlib.import_module(f'resources.{module_info.name}'), 'api', None)
+        if isinstance(namespace, Namespace):
+            yield from namespace.models.values()
+
+
+def sample_value(field, seed):
+    """Return a value of the kind a field is given in responses, varied by seed."""
+    field = make(field)
+    if isinstance(field, fields.Nested):
+        return None if seed % 3 == 2 and field.allow_null else sample_object(field.nested, seed + 1)
+    if isinstance(field, fields.List):
+        return [sample_value(field.container, seed + i) for i in range(seed % 3)]
+    if isinstance(field, fields.Boolean):
+        return seed % 2 == 0
+    if isinstance(field, fields.DateTime):
+        return datetime(2027, 1, 1 + seed % 28, seed % 24)
+    if isinstance(field, (fields.Float, fields.Fixed)):
+        return Decimal(seed) / 4 if seed % 2 else seed + 0.5
+    if isinstance(field, fields.Integer):
+        return seed if seed % 2 else str(seed)
+    if isinstance(field, fields.String):
+        return f'text {seed}' if seed % 2 else seed
+    return {'values': [seed, None], 'label': str(seed)}
+
+
+def sample_object(model, seed, as_dict=False):
+    """Build an object with every attribute a model reads, or a dict of them, some of them None."""
+    values = {}
+    for i, (key, field) in enumerate(model.items()):
+        value = None if (seed + i) % 5 == 0 else sample_value(field, seed + i)
+        # Dotted attributes, such as user.username, are read through a related object
+        parent, _, name = (make(field).attribute or key).rpartition('.')
+        if parent:
+            setattr(values.setdefault(parent, SimpleNamespace()), name, value)
+        else:
+            values[name] = value
+    return values if as_dict else SimpleNamespace(**values)
+
+
+@pytest.mark.parametrize('model', list(resource_models()), ids=lambda model: model.name)
+def test_compiled_serializer_matches_marshal_for_every_resource_model(model):
+    serialize = compile_model(model)
+    for seed in range(6):
+        for data in (sample_object(model, seed), sample_object(model, seed, as_dict=True)):
+            assert serialize(data) == marshal(data, model)
+    rows = [sample_object(model, seed) for seed in range(4)]
+    assert serialize(rows) == marshal(rows, model)
+    assert serialize(SimpleNamespace()) == marshal(SimpleNamespace(), model)
+    assert serialize({}) == marshal({}, model)
+
+
+@pytest.fixture
+def place_app(make_app):
+    app = make_app((PlaceResource, '/places/<int:place_id>'))
+    with app.app_context():
+        db.session.add(Language(id=1, name='Azerbaijani'))
+        add_place(1, name='Maiden Tower')
+        db.session.add(PlaceTranslation(id=1, place_id=1, language_id=1, translated_name='Qız Qalası'))
+        db.session.commit()
+    return app
+
+
+def test_fields_drop_the_load_profile_loaders_they_do_not_select(place_app):
+    client = place_app.test_client()
+    statements = []
+    with place_app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    assert client.get('/places/1?fields=id,name').json == {'data': {'id': 1, 'name': 'Maiden Tower'}}
+    assert len(statements) == 1
+
+    statements.clear()
+    response = client.get('/places/1?fields=name,translations')
+    assert response.json['data']['translations'][0]['translated_name'] == 'Qız Qalası'
+    assert len(statements) == 2
+    assert not any('place_categories' in statement for statement in statements)
@@ -0,0 +1,92 @@
+import threading
+import pytest
+from cache import redis_client
+from models import db, Place, RouteSegment, Transportation
+from services import travel_matrix
+from services.travel_matrix import LOCK_KEY, MatrixBuilder
+from conftest import add_place
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    builder = MatrixBuilder()
+    monkeypatch.setattr(travel_matrix, 'matrix_builder', builder)
+    return builder
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        for place_id in (1, 2, 3):
+            add_place(place_id, latitude=40.0 + place_id / 10, longitude=49.8)
+        db.session.add_all([
+            Transportation(id=1, origin_place_id=1, destination_place_id=2, transport_type='bus', duration=30, cost=2),
+            Transportation(id=2, origin_place_id=2, destination_place_id=3, transport_type='bus', duration=20, cost=1),
+            RouteSegment(id=1, transportation_id=1, origin_place_id=1, destination_place_id=2, segment_order=1,
+                         duration_minutes=30, transport_mode='bus')
+        ])
+        db.session.commit()
+    return app
+
+
+def test_builds_the_matrix_of_the_places(app, builder):
+    with app.app_context():
+        assert builder.build()
+        matrix, missing = travel_matrix.TravelMatrix().lookup([1, 2, 3, 4])
+        assert matrix == [[0.0, 30.0, 50.0, None], [None, 0.0, 20.0, None], [None, None, 0.0, None], [None] * 4]
+        assert missing == [4]
+        assert redis_client.get(LOCK_KEY) is None
+
+
+def test_commits_update_only_the_rows_using_the_changed_routes(app, builder):
+    with app.app_context():
+        builder.build()
+        db.session.get(Transportation, 2).duration = 5
+        db.session.commit()
+        assert builder._dirty == {2}
+        assert builder.build(full=False)
+        matrix, _ = travel_matrix.TravelMatrix().lookup([1, 2, 3])
+        assert matrix[0] == [0.0, 30.0, 35.0]
+
+
+def test_a_moved_segment_marks_both_transportations_dirty(app, builder):
+    with app.app_context():
+        db.session.get(RouteSegment, 1).transportation_id = 2
+        db.session.commit()
+        assert builder._dirty == {1, 2}
+
+
+def test_builds_wait_for_the_process_holding_the_lock(app, builder):
+    with app.app_context():
+        redis_client.set(LOCK_KEY, 'another process')
+        assert builder.build() is False
+        assert redis_client.get(LOCK_KEY) == b'another process'
+
+
+def test_an_expired_lock_taken_meanwhile_is_left_alone(app, builder, monkeypatch):
+    full_build = builder._full_build
+
+    def build_while_the_lock_expires():
+        redis_client.set(LOCK_KEY, 'another process')
+        return full_build()
+    monkeypatch.setattr(builder, '_full_build', build_while_the_lock_expires)
+    with app.app_context():
+        assert builder.build()
+    assert redis_client.get(LOCK_KEY) == b'another process'
+
+
+def test_the_builder_thread_survives_failed_builds(app, builder, monkeypatch):
+    monkeypatch.setattr(travel_matrix, 'REBUILD_INTERVAL', 0.01)
+    calls, retried, never = [], threading.Event(), threading.Event()
+
+    def build(full=True):
+        calls.append(full)
+        if len(calls) == 1:
+            raise ValueError('broken matrix')
+        retried.set()
+        never.wait()
+    monkeypatch.setattr(builder, 'build', build)
+    builder.start(app)
+    assert retried.wait(5)
+    assert calls == [True, True]
@@ -1,6 +1,8 @@
 from functools import wraps
+from flask import g
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from models import UserAudit, db
+from models import LOAD_PROFILES
+from services.audit import audit_writer
 
 def log_user_activity(action):
     def decorator(func):
@@ -11,11 +13,20 @@ def log_user_activity(action):
                 user_id = get_jwt_identity()
             except:
                 user_id = None
-            
+
             if user_id:
-                audit_log = UserAudit(user_id=user_id, action=action, action_timestamp=db.func.current_timestamp())
-                db.session.add(audit_log)
-                db.session.commit()
+                audit_writer.record(user_id, action)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def load_profile(name):
+    """Eager-load the relationships of the named profile in LOAD_PROFILES for this endpoint."""
+    profile = LOAD_PROFILES[name]
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            g.load_profile = profile
             return func(*args, **kwargs)
         return wrapper
     return decorator
@@ -16,30 +16,36 @@ function NavBar() {
   const { id, username, token, role, logout } = useUser();
   const navigate = useNavigate();
   const [searchQuery, setSearchQuery] = useState('');
-  const [allPlaces, setAllPlaces] = useState<Place[]>([]);
   const [filteredPlaces, setFilteredPlaces] = useState<Place[]>([]);
   const [showSearchBar, setShowSearchBar] = useState(false);
   const searchInputRef = useRef<HTMLInputElement>(null);
+  const latestSearchRef = useRef(0);
 
   useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setFilteredPlaces([]);
+      return;
+    }
+    // Ignore responses that arrive after a newer keystroke has been sent
+    const searchId = ++latestSearchRef.current;
     const fetchPlaces = async () => {
       try {
-        const response = await axios.get(`${import.meta.env.VITE_API_URL}/places`);
-        setAllPlaces(response.data.data);
-        console.log(username)
+        const response = await axios.get(`${import.meta.env.VITE_API_URL}/places/search`, {
+          params: { q: query, limit: 8 },
+        });
+        if (searchId === latestSearchRef.current) {
+          setFilteredPlaces(response.data.data);
+        }
       } catch (error) {
-        console.error('Error fetching places:', error);
+        console.error('Error searching places:', error);
       }
     };
     fetchPlaces();
-  }, []);
+  }, [searchQuery]);
 
   const handleSearchChange = (e: React.ChangeEvent<HTMLInputElement>) => {
-    const query = e.target.value;
-    setSearchQuery(query);
-    setFilteredPlaces(
-      query.trim() ? allPlaces.filter((place) => place.name.toLowerCase().includes(query.toLowerCase())) : []
-    );
+    setSearchQuery(e.target.value);
   };
 
   const handlePlaceSelect = (placeId: number) => {
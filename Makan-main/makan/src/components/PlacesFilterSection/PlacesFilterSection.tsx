@@ -3,8 +3,8 @@ import { Select, Slider, Radio } from 'antd';
 import { StarFilled, StarOutlined } from '@ant-design/icons';
 import { FaSearch } from 'react-icons/fa';
 import './PlacesFilterSection.css';
-import axios from 'axios';
 import { Place } from '../../models/Place';
+import { fetchAllPages } from '../../utils/fetchAllPages';
 
 interface Category {
   id: number;
@@ -40,20 +40,12 @@ const PlacesFilterSection: React.FC<PlacesFilterSectionProps> = ({ onFilterChang
   useEffect(() => {
     const fetchOptions = async () => {
       try {
-        const categoriesResponse = await axios.get<{ data: Category[] }>(
-          `${import.meta.env.VITE_API_URL}/place_categories`
-        );
-        setCategories(categoriesResponse.data.data);
+        setCategories(await fetchAllPages<Category>('/place_categories'));
 
-        const entertainmentTypesResponse = await axios.get<{ data: EntertainmentType[] }>(
-          `${import.meta.env.VITE_API_URL}/entertainment_types`
-        );
-        setEntertainmentTypes(entertainmentTypesResponse.data.data);
+        setEntertainmentTypes(await fetchAllPages<EntertainmentType>('/entertainment_types'));
 
-        const placesResponse = await axios.get<{ data: Place[] }>(
-          `${import.meta.env.VITE_API_URL}/places`
-        );
-        const allPlaces = placesResponse.data.data;
+        // Only the cities are needed to list the options
+        const allPlaces = await fetchAllPages<Pick<Place, 'city'>>('/places?fields=city');
         const uniqueCities = Array.from(new Set(allPlaces.map((place) => place.city)));
         setCities(uniqueCities);
       } catch (error) {
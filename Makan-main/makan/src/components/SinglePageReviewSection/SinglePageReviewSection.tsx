@@ -5,28 +5,28 @@ import axios from 'axios';
 import { useUser } from '../../contexts/UserContext';
 
 interface Review {
+  id: number;
   place_id: number;
   user_id: number;
+  username: string | null;
   date: string;
   rating: number;
   comment: string;
   publish_date: string;
 }
 
-interface User {
-  id: number;
-  username: string;
-}
-
 interface SinglePageReviewSectionProps {
   place_id: number;
   rating: number;
+  review_count?: number;
 }
 
-const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place_id, rating }) => {
+const REVIEWS_PAGE_SIZE = 20;
+
+const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place_id, rating, review_count }) => {
   const { id: userId, token } = useUser();
   const [reviews, setReviews] = useState<Review[]>([]);
-  const [usernames, setUsernames] = useState<{ [key: number]: string }>({});
+  const [nextPage, setNextPage] = useState<string | null>(null);
   const [userRating, setUserRating] = useState(0);
   const [userComment, setUserComment] = useState('');
   const [isSubmitting, setIsSubmitting] = useState(false);
@@ -39,29 +39,21 @@ const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place
     }
   }, [userComment]);
 
-  const fetchReviews = async () => {
+  // Loads the newest reviews, or the page after the ones already shown when `pageUrl` is given
+  const fetchReviews = async (pageUrl?: string) => {
     try {
-      const response = await axios.get(`${import.meta.env.VITE_API_URL}/reviews`);
+      const response = await axios.get(
+        `${import.meta.env.VITE_API_URL}${pageUrl ?? `/places/${place_id}/reviews?limit=${REVIEWS_PAGE_SIZE}`}`
+      );
       const reviewsData = response.data.data;
       if (Array.isArray(reviewsData)) {
-        const placeReviews = reviewsData.filter((review: Review) => review.place_id === place_id);
-        setReviews(placeReviews);
-
-        const userIds = Array.from(new Set(placeReviews.map((review) => review.user_id)));
-        const userPromises = userIds.map((id) => axios.get(`${import.meta.env.VITE_API_URL}/users/${id}`));
-        const userResponses = await Promise.all(userPromises);
-
-        const users: User[] = userResponses.map((res) => res.data);
-        const usernamesMap = users.reduce((acc, user) => {
-          acc[user.id] = user.username;
-          return acc;
-        }, {} as { [key: number]: string });
-        setUsernames(usernamesMap);
+        setReviews((current) => (pageUrl ? [...current, ...reviewsData] : reviewsData));
+        setNextPage(response.data.next);
       } else {
         console.error('Expected reviews data to be an array, but got:', reviewsData);
       }
     } catch (error) {
-      console.error('Error fetching reviews or usernames:', error);
+      console.error('Error fetching reviews:', error);
     }
   };
 
@@ -117,7 +109,7 @@ const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place
           <h2>{rating}</h2>
           <p className="gray-p">/5</p>
         </div>
-        <p className="gray-p">{reviews.length} Verified review(s)</p>
+        <p className="gray-p">{review_count ?? reviews.length} Verified review(s)</p>
       </div>
       <p className='reviews-title'>Comments</p>
       
@@ -170,8 +162,8 @@ const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place
         <>
           <div className="review-comments-sec">
             {reviews.map((review, index) => (
-              <div key={index} className="review">
-                <p className="review-username">{usernames[review.user_id] || `User ${review.user_id}`}</p>
+              <div key={review.id} className="review">
+                <p className="review-username">{review.username || `User ${review.user_id}`}</p>
                 <p className="review-date gray-p">{review.date}</p>
                 <div>
                   {[...Array(5)].map((_, i) => (
@@ -186,6 +178,11 @@ const SinglePageReviewSection: React.FC<SinglePageReviewSectionProps> = ({ place
               </div>
             ))}
           </div>
+          {nextPage && (
+            <button onClick={() => fetchReviews(nextPage)} className="submit-button">
+              Load more reviews
+            </button>
+          )}
         </>
       )}
     </div>
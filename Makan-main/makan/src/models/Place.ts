@@ -5,6 +5,7 @@ export interface Place {
   latitude?: number;
   longitude?: number;
   rating: number;
+  review_count?: number;
   description: string;
   entertainment_type_id: number;
   category_id?: number; 
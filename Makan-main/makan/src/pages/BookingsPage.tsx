@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Table, message, Spin } from "antd";
-import axios from "axios";
 import { useNavigate } from "react-router-dom";
+import { fetchAllPages } from "../utils/fetchAllPages";
 
 interface Booking {
   id: number;
@@ -30,12 +30,9 @@ const BookingsPage: React.FC = () => {
       }
 
       try {
-        const response = await axios.get(`${import.meta.env.VITE_API_URL}/bookings`, {
+        const userBookings = await fetchAllPages<Booking>(`/bookings?user_id=${userId}`, {
           headers: { Authorization: `Bearer ${token}` },
         });
-
-        const allBookings = response.data.data;
-        const userBookings = allBookings.filter((booking: Booking) => booking.user_id === Number(userId));
         setBookings(userBookings);
       } catch (error) {
         console.error("Error fetching bookings:", error);
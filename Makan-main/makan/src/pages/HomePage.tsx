@@ -8,7 +8,7 @@ import 'swiper/css';
 import 'swiper/css/navigation';
 import 'swiper/css/pagination';
 import 'swiper/css/scrollbar';
-import axios from 'axios';
+import { fetchAllPages } from '../utils/fetchAllPages';
 import '../styles/HomepageStyles.css';
 
 interface Place {
@@ -32,9 +32,7 @@ const HomePage: React.FC = () => {
   useEffect(() => {
     const fetchPlaces = async () => {
       try {
-    const response = await axios.get(`${import.meta.env.VITE_API_URL}/places`);
-    console.log('Places:', response.data);
-        setPlaces(response.data.data);
+        setPlaces(await fetchAllPages<Place>('/places'));
       } catch (error) {
         console.error('Error fetching places:', error);
       }
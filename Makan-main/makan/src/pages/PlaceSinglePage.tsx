@@ -9,6 +9,7 @@ import '../styles/PlaceSinglePageStyles.css';
 import { useEffect, useState } from "react";
 import axios from "axios";
 import { Place } from "../models/Place";
+import { fetchAllPages } from "../utils/fetchAllPages";
 
 interface EntertainmentType {
   id: number;
@@ -35,8 +36,7 @@ const PlaceSinglePage: React.FC = () => {
 
     const fetchEntertainmentTypes = async () => {
       try {
-        const response = await axios.get(`${import.meta.env.VITE_API_URL}/entertainment_types`);
-        setEntertainmentTypes(response.data.data);
+        setEntertainmentTypes(await fetchAllPages<EntertainmentType>('/entertainment_types'));
       } catch (err) {
         console.error("Error fetching entertainment types:", err);
       }
@@ -74,7 +74,7 @@ const PlaceSinglePage: React.FC = () => {
               category={place.category_id}/>}
           </div>
           {place && (
-            <SinglePageReviewSection place_id={place.id} rating={place.rating} />
+            <SinglePageReviewSection place_id={place.id} rating={place.rating} review_count={place.review_count} />
           )}
         </div>
       </div>
@@ -1,23 +1,20 @@
 import { useState, useEffect } from 'react';
-import axios from 'axios';
 import PlaceResultsFilterSection from '../components/PlaceResultsFilterSection/PlaceResultsFilterSection';
 import PlaceResultsSection from '../components/PlaceResultsSection/PlaceResultsSection';
 import PlacesFilterSection from '../components/PlacesFilterSection/PlacesFilterSection';
 import PlacesTopSection from '../components/PlacesTopSection/PlacesTopSection';
+import { fetchAllPages } from '../utils/fetchAllPages';
 import '../styles/PlacesPageStyles.css';
 
 const PlacesPage: React.FC = () => {
-  const [places, setPlaces] = useState([]);  
-  const [filteredPlaces, setFilteredPlaces] = useState([]);
+  const [filteredPlaces, setFilteredPlaces] = useState<any[]>([]);
   const [sortOption, setSortOption] = useState<string>('rating');
   const [isAscending, setIsAscending] = useState<boolean>(false);
 
   useEffect(() => {
     const fetchPlaces = async () => {
       try {
-        const response = await axios.get(`${import.meta.env.VITE_API_URL}/places`);
-        setPlaces(response.data.data);
-        setFilteredPlaces(response.data.data); 
+        setFilteredPlaces(await fetchAllPages<any>('/places'));
       } catch (error) {
         console.error('Error fetching places:', error);
       }
@@ -26,11 +23,8 @@ const PlacesPage: React.FC = () => {
   }, []);
 
 
-  // sorting
-  const handleSortChange = (option: string, order: boolean) => {
-    setSortOption(option);
-    setIsAscending(order);
-    const sorted = [...filteredPlaces].sort((a, b) => {
+  const sortPlaces = (places: any[], option: string, order: boolean) =>
+    [...places].sort((a, b) => {
       if (option === 'price') {
         return order ? a.default_price - b.default_price : b.default_price - a.default_price;
       } else if (option === 'rating') {
@@ -42,32 +36,34 @@ const PlacesPage: React.FC = () => {
       }
       return 0;
     });
-    setFilteredPlaces(sorted);
+
+  // sorting
+  const handleSortChange = (option: string, order: boolean) => {
+    setSortOption(option);
+    setIsAscending(order);
+    setFilteredPlaces(sortPlaces(filteredPlaces, option, order));
   };
 
 
 
   //filters filter sectiondan qebul edilir
-  const handleFilterChange = (filters: any) => {
-    const filtered = places.filter((place) => {
-      const matchCategory =
-        !filters.category || place.category_id === parseInt(filters.category);
-
-      const matchEntertainmentType =
-        !filters.adventureType || place.entertainment_type_id === parseInt(filters.adventureType);
-
-      const matchPrice =
-        place.default_price >= filters.priceRange[0] &&
-        place.default_price <= filters.priceRange[1];
-
-      const matchRating = !filters.rating || place.rating >= filters.rating;
-
-      const matchCity = !filters.city || place.city == filters.city;
-
-
-      return matchCategory && matchEntertainmentType && matchPrice && matchRating && matchCity;
+  // The API applies them, so only the matching places are fetched
+  const handleFilterChange = async (filters: any) => {
+    const params = new URLSearchParams({
+      min_price: String(filters.priceRange[0]),
+      max_price: String(filters.priceRange[1]),
     });
-    setFilteredPlaces(filtered);
+    if (filters.category) params.set('category_id', filters.category);
+    if (filters.adventureType) params.set('entertainment_type_id', filters.adventureType);
+    if (filters.rating) params.set('min_rating', String(filters.rating));
+    if (filters.city) params.set('city', filters.city);
+
+    try {
+      const places = await fetchAllPages<any>(`/places?${params}`);
+      setFilteredPlaces(sortPlaces(places, sortOption, isAscending));
+    } catch (error) {
+      console.error('Error filtering places:', error);
+    }
   };
 
   return (
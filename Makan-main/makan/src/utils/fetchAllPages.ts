@@ -0,0 +1,18 @@
+import axios, { AxiosRequestConfig } from 'axios';
+
+interface Page<T> {
+  data: T[];
+  next: string | null;
+}
+
+// Collection endpoints return one page at a time; follow the `next` links to get every item
+export const fetchAllPages = async <T>(path: string, config?: AxiosRequestConfig): Promise<T[]> => {
+  const items: T[] = [];
+  let url: string | null = path;
+  while (url) {
+    const response = await axios.get<Page<T>>(`${import.meta.env.VITE_API_URL}${url}`, config);
+    items.push(...response.data.data);
+    url = response.data.next;
+  }
+  return items;
+};